@@ -0,0 +1,39 @@
+"""
+Haversine benchmark
+===================
+Compares scalar `haversine.haversine` loop with vectorized `haversine_distance`.
+Usage: python -m benchmarks.distance [points count]
+"""
+
+import sys
+import time
+
+import haversine
+import numpy as np
+
+from splyne.mapping.common.distance import haversine_distance
+
+DEFAULT_POINTS_COUNT = 1_000_000
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS_COUNT
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(-90.0, 90.0, (2, count))
+    lon1, lon2 = rng.uniform(-180.0, 180.0, (2, count))
+
+    start = time.perf_counter()
+    expected = [
+        haversine.haversine((a, b), (c, d))
+        for a, b, c, d in zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist())
+    ]
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = haversine_distance(lat1, lon1, lat2, lon2)
+    vector_elapsed = time.perf_counter() - start
+
+    print(f'{count} pairs')
+    print(f'haversine loop      time: {scalar_elapsed:8.3f} s')
+    print(f'haversine_distance  time: {vector_elapsed:8.3f} s')
+    print(f'max abs difference: {np.max(np.abs(result - expected)):.3e} km')
@@ -0,0 +1,41 @@
+"""
+GeoPoint memory benchmark
+=========================
+Compares time, allocated memory and logger handlers count
+for a list of `GeoPoint` objects and a single `GeoPointArray`.
+Usage: python -m benchmarks.geopoint [points count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.common import GeoPoint, GeoPointArray
+
+DEFAULT_POINTS_COUNT = 1_000_000
+
+
+def measure(name, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<24} time: {elapsed:8.3f} s   peak memory: {peak / 2 ** 20:8.1f} MiB')
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS_COUNT
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-90.0, 90.0, count)
+    lon = rng.uniform(-180.0, 180.0, count)
+
+    print(f'{count} points')
+    measure('list of GeoPoint', lambda: [GeoPoint(x, y) for x, y in zip(lat.tolist(), lon.tolist())])
+    measure('GeoPointArray', lambda: GeoPointArray(lat, lon))
+    print(f'logger handlers: {len(SplyneObject.logger.handlers)}')
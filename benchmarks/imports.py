@@ -0,0 +1,92 @@
+"""
+Import time benchmark
+=====================
+Measures time of importing splyne modules in fresh interpreters, and heavy dependencies they load.
+Geometry utilities and `import splyne` itself must not load pandas and pydeck: pandas is loaded with `Map`,
+and pydeck, with its widgets and templates stack, when layers are rendered into pydeck ones.
+Usage: python -m benchmarks.imports [--repeat 5] [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ('numpy', 'pandas', 'pydeck', 'haversine')
+
+TARGETS = {
+    'splyne': 'import splyne',
+    'geometry': 'import splyne.mapping.common.common, splyne.mapping.common.distance, splyne.mapping.common.spatial_index',
+    'transformers': 'import splyne.utils.transformers',
+    'map': 'from splyne import Map',
+    'layer': "from splyne import Map; Map().add_scatterplot_layer([{'lat': 55.7, 'lon': 37.6}])",
+}
+DEFAULT_TOLERANCE = 1.25
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def measure(statement: str, repeat: int):
+    """
+    Get best time of `repeat` imports, every one in a new interpreter, and heavy modules loaded by them.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {'seconds': min(run['seconds'] for run in runs), 'loaded': runs[0]['loaded']}
+
+
+def run(repeat: int):
+    results = {}
+    for name, statement in TARGETS.items():
+        results[name] = measure(statement, repeat)
+        print(f'{name:<15} time: {results[name]["seconds"]:7.4f} s   loaded: {", ".join(results[name]["loaded"]) or "-"}')
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Get targets, which import slower than `tolerance` times baseline, or load heavy modules they did not load.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        if result['seconds'] > tolerance * baseline[name]['seconds']:
+            regressions.append(name)
+            print(f'REGRESSION {name}: seconds {baseline[name]["seconds"]:.4g} -> {result["seconds"]:.4g}')
+        added = sorted(set(result['loaded']) - set(baseline[name]['loaded']))
+        if added:
+            regressions.append(name)
+            print(f'REGRESSION {name}: loads {", ".join(added)}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed imports, best one is reported')
+    parser.add_argument('--output', help='save results to json file')
+    parser.add_argument('--baseline', help='compare results with json file, saved by previous run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='ratio to baseline, considered a regression')
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,46 @@
+"""
+Scatterplot memory benchmark
+============================
+Measures peak memory allocated by `scatterplot` pipeline relative to the input size,
+with zero-copy (default) and deep-copying (`copy=True`) modes.
+Usage: python -m benchmarks.memory [points count]
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from splyne.mapping.api.scatterplot import transform_with_format_detection
+from splyne.mapping.map_class.map import Map
+
+DEFAULT_POINTS_COUNT = 1_000_000
+
+
+def run_pipeline(df: pd.DataFrame, copy: bool):
+    map = Map()
+    map.add_scatterplot_layer(transform_with_format_detection(data=df, color='key', size='size'), binary=True, copy=copy)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS_COUNT
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'lat': rng.normal(55.7, 0.1, count),
+        'lon': rng.normal(37.6, 0.2, count),
+        'key': rng.integers(0, 10, count),
+        'size': rng.uniform(1.0, 10.0, count),
+    })
+    input_bytes = df.memory_usage(index=False, deep=True).sum()
+    print(f'{count} points, input size: {input_bytes / 2 ** 20:.1f} MiB')
+
+    os.chdir(tempfile.mkdtemp())
+    for copy in (False, True):
+        tracemalloc.start()
+        run_pipeline(df, copy=copy)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'copy={copy!s:<5}  peak memory: {peak / 2 ** 20:8.1f} MiB  ({peak / input_bytes:.2f} x input)')
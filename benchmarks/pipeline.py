@@ -0,0 +1,184 @@
+"""
+Scatterplot pipeline benchmark
+==============================
+Measures time, peak memory and output bytes per point of every stage of scatterplot pipeline:
+`transform_with_format_detection`, `ViewState` fitting, `ScatterplotLayer` construction and `Map.display`,
+on synthetic points given as DataFrame, list of dicts and separate arrays, with and without color and size.
+Results may be saved and compared with a baseline, to catch regressions.
+Usage: python -m benchmarks.pipeline [--sizes 1000 100000] [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from splyne.mapping.api.scatterplot import transform_with_format_detection
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import GeoPoint
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.scatterplot import ScatterplotLayer
+from splyne.mapping.map_class.map import Map
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+INPUT_FORMATS = ('dataframe', 'records', 'arrays')
+# Inputs and outputs, made of dicts and json, are too slow and large above this size
+DEFAULT_MAX_JSON_POINTS = 1_000_000
+DEFAULT_TOLERANCE = 1.25
+
+
+def make_input(input_format: str, count: int, styled: bool, seed: int = 0):
+    """
+    Make synthetic points around Moscow, with categorical `key` and numeric `size` fields,
+    and arguments of `transform_with_format_detection` for them.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'lat': rng.normal(55.7, 0.1, count),
+        'lon': rng.normal(37.6, 0.2, count),
+        'key': rng.integers(0, 10, count),
+        'size': rng.uniform(1.0, 10.0, count),
+    })
+    if input_format == 'dataframe':
+        return {'data': df, 'color': 'key' if styled else None, 'size': 'size' if styled else None}
+    if input_format == 'records':
+        return {'data': df.to_dict('records'), 'color': 'key' if styled else None, 'size': 'size' if styled else None}
+    palette = rng.integers(0, 256, (10, 3), dtype=np.uint8)
+    return {
+        'lat': df['lat'].to_numpy(), 'lon': df['lon'].to_numpy(),
+        'color': palette[df['key'].to_numpy()] if styled else None,
+        'size': df['size'].to_numpy() if styled else None,
+    }
+
+
+def materialize(data):
+    return data if isinstance(data, PointColumns) else list(data)
+
+
+def fit_view_state(data) -> ViewState:
+    view_state = ViewState()
+    if isinstance(data, PointColumns):
+        view_state.update_with_arrays(data.lat, data.lon)
+    else:
+        view_state.update_multiple(GeoPoint(item['lat'], item['lon']) for item in data)
+    return view_state
+
+
+def build_layer(data, binary: bool) -> ScatterplotLayer:
+    layer = ScatterplotLayer(data, ViewState(), binary=binary)
+    layer.payload()
+    return layer
+
+
+def display(data, binary: bool) -> int:
+    """
+    Display map and get size of written html page.
+    """
+    map = Map()
+    map.add_scatterplot_layer(data, binary=binary)
+    map.display()
+    return os.path.getsize(Map.HTML_FILENAME)
+
+
+def measure(func, repeat: int):
+    """
+    Get best time of `repeat` runs and peak memory of a separate traced run.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(times), peak
+
+
+def run(sizes, repeat: int, max_json_points: int):
+    results = {}
+    for count in sizes:
+        for input_format in INPUT_FORMATS:
+            if input_format == 'records' and count > max_json_points:
+                continue
+            for styled in (False, True):
+                kwargs = make_input(input_format, count, styled)
+                name = f'{input_format}/{count}/{"styled" if styled else "plain"}'
+
+                stages = {'transform': lambda: materialize(transform_with_format_detection(**kwargs))}
+                data = stages['transform']()
+                stages['view_state'] = lambda: fit_view_state(data)
+                for binary in (False, True):
+                    if not binary and count > max_json_points:
+                        continue
+                    mode = 'binary' if binary else 'json'
+                    stages[f'layer_{mode}'] = lambda binary=binary: build_layer(data, binary)
+                    stages[f'display_{mode}'] = lambda binary=binary: display(data, binary)
+
+                for stage, func in stages.items():
+                    result, elapsed, peak = measure(func, repeat)
+                    results[f'{stage}/{name}'] = {
+                        'seconds': elapsed,
+                        'peak_bytes': peak,
+                        'output_bytes_per_point': result / count if stage.startswith('display') else None,
+                    }
+                    report(f'{stage}/{name}', results[f'{stage}/{name}'])
+    return results
+
+
+def report(key, result):
+    line = f'{key:<40} time: {result["seconds"]:9.4f} s   peak memory: {result["peak_bytes"] / 2 ** 20:9.1f} MiB'
+    if result['output_bytes_per_point'] is not None:
+        line += f'   output: {result["output_bytes_per_point"]:7.1f} B/point'
+    print(line)
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Get keys of benchmarks, which became slower or take more memory than `tolerance` times baseline.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if result[metric] > tolerance * baseline[key][metric]:
+                regressions.append(key)
+                print(f'REGRESSION {key}: {metric} {baseline[key][metric]:.4g} -> {result[metric]:.4g}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='points counts, up to 1e7')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs, best one is reported')
+    parser.add_argument('--max-json-points', type=int, default=DEFAULT_MAX_JSON_POINTS,
+                        help='skip list of dicts inputs and json outputs above this size')
+    parser.add_argument('--output', help='save results to json file')
+    parser.add_argument('--baseline', help='compare results with json file, saved by previous run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='ratio to baseline, considered a regression')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    # Map.display writes html file into working directory
+    os.chdir(tempfile.mkdtemp())
+    results = run(args.sizes, args.repeat, args.max_json_points)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if baseline is not None and compare(results, baseline, args.tolerance):
+        sys.exit(1)
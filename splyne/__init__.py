@@ -1,9 +1,38 @@
 # flake8: noqa
 
-from splyne.mapping.api import (
-    scatterplot
-)
+# Public API is imported lazily, on first access, so `import splyne` and imports of geometry utilities,
+# e.g. `splyne.mapping.common.common`, do not load pandas and pydeck
 
-from splyne.mapping.map_class.map import (
-    Map
-)
+import importlib
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from splyne.mapping.api import (
+        scatterplot,
+        scatterplot_chunks,
+    )
+
+    from splyne.mapping.map_class.map import (
+        Map
+    )
+
+_LAZY_ATTRIBUTES = {
+    'scatterplot': 'splyne.mapping.api.scatterplot',
+    'scatterplot_chunks': 'splyne.mapping.api.scatterplot',
+    'Map': 'splyne.mapping.map_class.map',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,19 +3,27 @@ import logging
 import warnings
 
 
+formatter = logging.Formatter(u'%(filename)s[LINE:%(lineno)d]# %(levelname)-8s [%(asctime)s]  %(message)s')
+handler = logging.StreamHandler()
+handler.setFormatter(formatter)
+handler.setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(handler)
+
+
 class SplyneObject(object):
     """
     Base Class for all splyne classes
+    Logger is configured once on module import and shared by all objects.
+    >>> len(SplyneObject().logger.handlers) == len(SplyneObject().logger.handlers) == 1
+    True
     """
     __metaclass__ = abc.ABCMeta
+    __slots__ = ()
 
-    def __init__(self):
-
-        formatter = logging.Formatter(u'%(filename)s[LINE:%(lineno)d]# %(levelname)-8s [%(asctime)s]  %(message)s')
-        handler = logging.StreamHandler()
-        handler.setFormatter(formatter)
-        handler.setLevel(logging.WARNING)
+    logger = logger
+    warner = warnings
 
-        self.logger = logging.getLogger(__name__)
-        self.logger.addHandler(handler)
-        self.warner = warnings
+    def __init__(self):
+        pass
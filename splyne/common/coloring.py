@@ -1,6 +1,11 @@
 import copy
 import itertools
 
+import numpy as np
+import pandas as pd
+
+from typing import Iterable, Optional, Tuple
+
 from splyne.common.base import SplyneObject
 
 
@@ -23,6 +28,18 @@ COLOR_SCHEMAS = {
     }
 }
 
+# Continuous colormaps, given by evenly spaced anchor colors, which are linearly interpolated
+COLORMAPS = {
+    'viridis': [[68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]],
+    'plasma': [[13, 8, 135], [126, 3, 168], [204, 71, 120], [248, 149, 64], [240, 249, 33]],
+    'blue_red': [[0, 0, 255], [255, 0, 0]],
+    'green_red': [[0, 255, 0], [255, 255, 0], [255, 0, 0]],
+    'greys': [[230, 230, 230], [0, 0, 0]],
+}
+
+# Color of missing values in continuous colormaps
+MISSING_COLOR = COLORS['grey']
+
 
 class ColorGenerator(SplyneObject):
 
@@ -51,3 +68,72 @@ class ColorGenerator(SplyneObject):
         color = self.next_color()
         self.mapping[key] = color
         return color
+
+    def factorize(self, keys: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get compact palette index of every key and palette of colors, so that `palette[codes]` are colors of keys.
+        Colors are the same, as `get_color` gives for every key in order of their appearance.
+        >>> codes, palette = ColorGenerator().factorize(['red', 'blue', 'red'])
+        >>> codes
+        array([0, 1, 0], dtype=uint8)
+        >>> palette
+        array([[255,   0,   0],
+               [  0,   0, 255]], dtype=uint8)
+        """
+        if not isinstance(keys, (np.ndarray, pd.Series)):
+            keys = pd.Series(list(keys))
+        codes, uniques = pd.factorize(keys)
+        uniques = list(uniques)
+        missing = codes < 0
+        if missing.any():
+            codes[missing] = len(uniques)
+            uniques.append(np.nan)
+        palette = np.array([self.get_color(key) for key in uniques], dtype=np.uint8).reshape(len(uniques), -1)
+        codes_dtype = np.uint8 if len(uniques) <= 2 ** 8 else np.uint16 if len(uniques) <= 2 ** 16 else np.uint32
+        return codes.astype(codes_dtype), palette
+
+    def get_colors(self, keys: Iterable) -> np.ndarray:
+        """
+        Vectorized `get_color`: get array of colors of all keys with shape (N, 3).
+        >>> ColorGenerator().get_colors(['red', 'blue', 'red'])
+        array([[255,   0,   0],
+               [  0,   0, 255],
+               [255,   0,   0]], dtype=uint8)
+        """
+        codes, palette = self.factorize(keys)
+        return palette[codes]
+
+    @staticmethod
+    def get_continuous_colors(
+        values: Iterable[float],
+        colormap: str = 'viridis',
+        vmin: Optional[float] = None,
+        vmax: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Map numeric values to colors of continuous colormap, array of shape (N, 3) is returned.
+        Values are scaled from `vmin` to `vmax`, by default from minimum to maximum of values.
+        Missing values get grey color.
+        >>> ColorGenerator.get_continuous_colors([0.0, 5.0, 10.0, np.nan], colormap='blue_red')
+        array([[  0,   0, 255],
+               [128,   0, 128],
+               [255,   0,   0],
+               [200, 200, 200]], dtype=uint8)
+        """
+        if colormap not in COLORMAPS:
+            raise ValueError(f"Unknown colormap `{colormap}`, expected one of {list(COLORMAPS)}")
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        if vmin is None:
+            vmin = values[finite].min() if finite.any() else 0.0
+        if vmax is None:
+            vmax = values[finite].max() if finite.any() else 1.0
+        scaled = np.clip((values - vmin) / (vmax - vmin), 0.0, 1.0) if vmax > vmin else np.zeros_like(values)
+        scaled[~finite] = 0.0
+        anchors = np.asarray(COLORMAPS[colormap], dtype=np.float64)
+        positions = np.linspace(0.0, 1.0, len(anchors))
+        colors = np.empty((len(values), anchors.shape[1]), dtype=np.uint8)
+        for channel in range(anchors.shape[1]):
+            colors[:, channel] = np.rint(np.interp(scaled, positions, anchors[:, channel]))
+        colors[~finite] = MISSING_COLOR
+        return colors
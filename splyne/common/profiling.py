@@ -0,0 +1,168 @@
+import contextlib
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from splyne.common.base import SplyneObject
+
+
+class _PeakFrame(object):
+    """
+    Traced memory at start of running stage and peak of it, seen before nested stages reset the peak.
+    """
+    __slots__ = ('start_bytes', 'peak_bytes')
+
+    def __init__(self, start_bytes: int):
+        self.start_bytes = start_bytes
+        self.peak_bytes = start_bytes
+
+
+# Running stages of all profilers, outermost first. Peak of `tracemalloc` is global, so nested stages
+# keep peaks of enclosing ones here, before resetting it
+_peak_frames: List[_PeakFrame] = []
+# Tracing, started by profilers, is stopped, when the last running stage ends, even if stages run in several threads.
+# Lock guards frames, counter and start and stop of tracing
+_tracing_lock = threading.Lock()
+_traced_stages = 0
+_started_tracing = False
+
+
+def _enter_traced_stage() -> _PeakFrame:
+    global _traced_stages, _started_tracing
+    with _tracing_lock:
+        if _traced_stages == 0:
+            _started_tracing = not tracemalloc.is_tracing()
+            if _started_tracing:
+                tracemalloc.start()
+        _traced_stages += 1
+        start_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        if _peak_frames:
+            _peak_frames[-1].peak_bytes = max(_peak_frames[-1].peak_bytes, peak_bytes)
+        tracemalloc.reset_peak()
+        frame = _PeakFrame(start_bytes)
+        _peak_frames.append(frame)
+        return frame
+
+
+def _exit_traced_stage(frame: _PeakFrame) -> int:
+    """
+    Get bytes, allocated since `frame` was entered.
+    """
+    global _traced_stages
+    with _tracing_lock:
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        peak_bytes = max(frame.peak_bytes, peak_bytes)
+        _peak_frames.pop(next(index for index, running in enumerate(_peak_frames) if running is frame))
+        if _peak_frames:
+            _peak_frames[-1].peak_bytes = max(_peak_frames[-1].peak_bytes, peak_bytes)
+        _traced_stages -= 1
+        if _traced_stages == 0 and _started_tracing:
+            tracemalloc.stop()
+        return peak_bytes - frame.start_bytes
+
+
+class Profiler(SplyneObject):
+
+    FIELDS = ('stage', 'layer', 'rows', 'seconds', 'allocated_bytes')
+
+    def __init__(
+        self,
+        trace_memory: bool = False,
+        callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        """
+        Records wall time, rows count and allocated memory of pipeline stages.
+        Every record is a dict with `FIELDS` keys, kept in `records`, logged with `logger` at INFO level
+        and passed to `callback`, if it is set.
+        :param trace_memory: measure peak memory, allocated by every stage, with `tracemalloc`.
+            Tracing makes allocations several times slower, so it is disabled by default.
+        :param callback: function to call with every record
+        """
+        super().__init__()
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.records = []
+
+    def __repr__(self):
+        return 'Profiler({} records)'.format(len(self.records))
+
+    @contextlib.contextmanager
+    def stage(self, name: str, layer: Optional[str] = None, rows: Optional[int] = None) -> Iterator[None]:
+        """
+        Measure code inside of `with` block as stage `name`. Stages may be nested, and memory,
+        allocated by nested stages, is counted in enclosing ones. Peak of tracing, started by the caller,
+        is reset by every stage, since `tracemalloc` can not restore it. Stages may run in several threads,
+        but memory is traced for the whole process, so allocations of concurrent stages are counted in each other.
+        >>> profiler = Profiler()
+        >>> with profiler.stage('encode', layer='points', rows=10):
+        ...     pass
+        >>> [(record['stage'], record['layer'], record['rows']) for record in profiler.records]
+        [('encode', 'points', 10)]
+        >>> profiler = Profiler(trace_memory=True)
+        >>> with profiler.stage('outer'):
+        ...     data = bytearray(2 * 10 ** 6)
+        ...     del data
+        ...     with profiler.stage('inner'):
+        ...         pass
+        >>> profiler.records[1]['stage'], profiler.records[1]['allocated_bytes'] >= 2 * 10 ** 6
+        ('outer', True)
+        """
+        frame = _enter_traced_stage() if self.trace_memory else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated_bytes = _exit_traced_stage(frame) if frame is not None else None
+            self.add_record(name, layer=layer, rows=rows, seconds=seconds, allocated_bytes=allocated_bytes)
+
+    def add_record(
+        self,
+        name: str,
+        layer: Optional[str] = None,
+        rows: Optional[int] = None,
+        seconds: float = 0.0,
+        allocated_bytes: Optional[int] = None,
+    ):
+        record = dict(zip(Profiler.FIELDS, (name, layer, rows, seconds, allocated_bytes)))
+        self.records.append(record)
+        message = f'Stage `{name}`' + (f' of layer `{layer}`' if layer is not None else '') + f': {seconds:.4f} s'
+        if rows is not None:
+            message += f', {rows} rows'
+        if allocated_bytes is not None:
+            message += f', {allocated_bytes / 2 ** 20:.1f} MiB allocated'
+        self.logger.info(message)
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Get records as DataFrame, one row per stage.
+        >>> profiler = Profiler()
+        >>> profiler.add_record('encode', rows=10, seconds=0.5)
+        >>> profiler.to_frame()[['stage', 'rows', 'seconds']]
+            stage  rows  seconds
+        0  encode    10      0.5
+        """
+        return pd.DataFrame(self.records, columns=list(Profiler.FIELDS))
+
+    def clear(self):
+        self.records = []
+
+
+def profile_stage(
+    profiler: Optional[Profiler],
+    name: str,
+    layer: Optional[str] = None,
+    rows: Optional[int] = None,
+) -> contextlib.AbstractContextManager:
+    """
+    Stage of `profiler`, or no-op context, if profiling is disabled.
+    """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name, layer=layer, rows=rows)
@@ -1,3 +1,3 @@
 # flake8: noqa
 
-from .scatterplot import scatterplot
+from .scatterplot import scatterplot, scatterplot_chunks
@@ -4,25 +4,47 @@ Used for bref overview of data.
 Supports different input formats.
 """
 
-import copy
+import operator
+import os
 
+from copy import deepcopy
+
+import numpy as np
 import pandas as pd
 
-from typing import Iterable, Dict, Any, Union, Optional
+from collections.abc import Mapping
+from typing import Iterable, Iterator, Dict, Any, Union, Optional
 
 from splyne.common.coloring import ColorGenerator
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.lod import LevelOfDetail
+from splyne.mapping.common.sources import ColumnSource, MappedColumns
 from splyne.mapping.map_class.map import Map
 from splyne.utils import transformers
 
 
+def is_on_disk(values: Any) -> bool:
+    """
+    Check, if column is memory-mapped array or path of `.npy` file.
+    """
+    return isinstance(values, (np.memmap, str, os.PathLike))
+
+
 def transform_with_format_detection(
     data: Optional[Any] = None,
     lat: Optional[Union[str, Iterable]] = None,
     lon: Optional[Union[str, Iterable]] = None,
     color: Optional[Union[str, Iterable]] = None,
     size: Optional[Union[str, Iterable]] = None,
-) -> Iterable[Dict[str, Any]]:
+    colormap: Optional[str] = None,
+) -> Union[PointColumns, ColumnSource, Iterable[Dict[str, Any]]]:
     """
+    DataFrames and separate `lat`, `lon` sequences are transformed into `PointColumns`,
+    memory-mapped `lat`, `lon` arrays or paths of `.npy` files, into `MappedColumns`,
+    so coordinates, colors and sizes stay numpy arrays. Other iterables are processed row by row.
+    Input is never modified: columns only reference it, and dicts are shallow-copied once, if they are changed.
+    Continuous `colormap` needs all values at once, so iterables are converted to columns in this case.
     >>> data = [{'lat': 55.7, 'lon': 37.8}, {'lat': 55.8, 'lon': 37.9}]
     >>> list(transform_with_format_detection(data=data))
     [{'lat': 55.7, 'lon': 37.8}, {'lat': 55.8, 'lon': 37.9}]
@@ -31,11 +53,32 @@ def transform_with_format_detection(
     [{'lat': 55.7, 'lon': 37.8}, {'lat': 55.8, 'lon': 37.9}]
     >>> list(transform_with_format_detection(lat=[55.7, 55.8], lon=[37.8, 37.9]))
     [{'lat': 55.7, 'lon': 37.8}, {'lat': 55.8, 'lon': 37.9}]
+    >>> df = pd.DataFrame({'a': [55.7, 55.8], 'b': [37.8, 37.9], 'key': [1, 2]})
+    >>> transform_with_format_detection(data=df, lat='a', lon='b', size='key').to_records()
+    [{'key': 1, 'lat': 55.7, 'lon': 37.8, 'size': 1}, {'key': 2, 'lat': 55.8, 'lon': 37.9, 'size': 2}]
     """
+    if data is None and is_on_disk(lat) and is_on_disk(lon):
+        if colormap is not None:
+            raise ValueError("`colormap` is not supported for memory-mapped columns")
+        return MappedColumns(lat, lon, color=color, size=size)
+    if isinstance(data, ColumnSource):
+        if any(value is not None for value in (lat, lon, color, size, colormap)):
+            raise ValueError("Columns of on-disk data are set by its source")
+        return data
     if data is None:
-        data = transformers.merge(lat=lat, lon=lon)
+        data = PointColumns(lat, lon)
     elif isinstance(data, pd.DataFrame):
-        data = data.to_dict('records')
+        data = PointColumns.from_dataframe(
+            data,
+            lat=lat if isinstance(lat, str) else 'lat',
+            lon=lon if isinstance(lon, str) else 'lon',
+        )
+    elif colormap is not None and not isinstance(data, PointColumns):
+        data = PointColumns.from_records(transform_with_format_detection(data=data, lat=lat, lon=lon))
+    if isinstance(data, PointColumns):
+        return transform_columns(data, color=color, size=size, colormap=colormap)
+    if any(isinstance(value, str) for value in (lat, lon)) or color is not None or size is not None:
+        data = transformers.copy_items(data)
     if isinstance(lat, str):
         data = transformers.rename(data, lat, 'lat')
     if isinstance(lon, str):
@@ -44,13 +87,50 @@ def transform_with_format_detection(
         if isinstance(color, str):
             color_key = color
             cgen = ColorGenerator()
-            color = (cgen.get_color(item[color_key]) for item in data)
-        data = transformers.zip_into(data, "color", color)
+            data = transformers.apply_into(data, "color", lambda item: cgen.get_color(item[color_key]))
+        else:
+            data = transformers.zip_into(data, "color", color)
+    if size is not None:
+        if isinstance(size, str):
+            data = transformers.apply_into(data, "size", operator.itemgetter(size))
+        else:
+            data = transformers.zip_into(data, "size", size)
+    return data
+
+
+def transform_columns(
+    data: PointColumns,
+    color: Optional[Union[str, Iterable]] = None,
+    size: Optional[Union[str, Iterable]] = None,
+    colormap: Optional[str] = None,
+) -> PointColumns:
+    """
+    Columnar version of `transform_with_format_detection`.
+    Categorical colors are assigned once per unique value and then broadcasted to all points.
+    If `colormap` is set, `color` column is treated as numeric and mapped to continuous colormap.
+    >>> data = PointColumns([55.7, 55.8, 55.9], [37.8, 37.9, 38.0], attributes=pd.DataFrame({'key': ['red', 'blue', 'red']}))
+    >>> transform_columns(data, color='key').color.tolist()
+    [[255, 0, 0], [0, 0, 255], [255, 0, 0]]
+    >>> transform_columns(data, color='lat', colormap='blue_red').color.tolist()
+    [[0, 0, 255], [127, 0, 128], [255, 0, 0]]
+    >>> data.color is None
+    True
+    """
+    if color is not None or size is not None:
+        # View shares arrays with input, so input keeps its own colors and sizes
+        data = data.view()
+    if color is not None:
+        if isinstance(color, str):
+            color = data.column(color)
+            if colormap is None:
+                color = ColorGenerator().get_colors(color)
+        if colormap is not None:
+            color = ColorGenerator.get_continuous_colors(color, colormap=colormap)
+        data.set_color(color)
     if size is not None:
         if isinstance(size, str):
-            size_key = size
-            size = (item[size_key] for item in data)
-        data = transformers.zip_into(data, "size", size)
+            size = data.column(size)
+        data.set_size(size)
     return data
 
 
@@ -60,6 +140,13 @@ def scatterplot(
     lon: Optional[Union[str, Iterable]] = None,
     color: Optional[Union[str, Iterable]] = None,
     size: Optional[Union[str, Iterable]] = None,
+    binary: bool = False,
+    lod: Optional[LevelOfDetail] = None,
+    copy: bool = False,
+    colormap: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    validate: Optional[str] = None,
+    precision: Optional[Union[float, str]] = None,
 ):
     """
     Possible input formats:
@@ -74,17 +161,97 @@ def scatterplot(
 
     2) `lat`, `lon` = Iterable of float.
     `>>> scatterplot(lon=[37.8, 37.9], lat=[55.7, 55.8])
+
+    3) `data` = on-disk columns, e.g. `MappedColumns` or `ArrowColumns`, or `lat`, `lon` = `np.memmap` arrays
+    or paths of `.npy` files. Points are processed chunk by chunk, see `ScatterplotLayer.from_source`.
+    `>>> scatterplot(lat='lat.npy', lon='lon.npy', lod=LevelOfDetail(max_points=1_000_000))
+
+    With `binary=True` points are shipped as typed binary buffers instead of json,
+    which is much more compact for large inputs, but drops all fields except coordinates, color and size.
+    With `lod`, e.g. `LevelOfDetail(max_points=100_000)`, points, which can not be distinguished
+    at initial zoom level, are dropped, so the output size stays bounded.
+    With `colormap`, e.g. `viridis`, numeric `color` column is mapped to continuous colormap.
+    Input is never modified. With `copy=True` it is deep-copied first, which is only needed,
+    if it may be modified concurrently.
+    With `profiler`, time of every stage is recorded in it, see `Map.profile`.
+    With `validate` policy, e.g. `drop` or `clip`, coordinates are validated at once, see `CoordinateValidator`.
+    With `precision`, e.g. `1.0` meter, positions are quantized relative to bounding box of points,
+    which, with `binary=True`, makes city-scale data several times more compact, see `Quantization`.
     """
     if data is None and (lat is None and lon is None):
         raise ValueError("No data provided.")
     elif data is None and (lat is None or lon is None):
         raise ValueError("Both `lon` and lat` must be provided (or None of them)")
 
+    map = Map(profiler=profiler)
+    with profile_stage(profiler, 'transform'):
+        if copy and not isinstance(data, ColumnSource):
+            data = deepcopy(data)
+        data = transform_with_format_detection(
+            data=data, lat=lat, lon=lon,
+            color=color, size=size, colormap=colormap,
+        )
+    map.add_scatterplot_layer(data, binary=binary, lod=lod, validate=validate, precision=precision)
+    return map.display()
+
+
+def transform_chunks(
+    chunks: Iterable[Any],
+    lat: Optional[str] = None,
+    lon: Optional[str] = None,
+    color: Optional[str] = None,
+    size: Optional[str] = None,
+) -> Iterator[PointColumns]:
+    """
+    Lazily transform every chunk of stream into `PointColumns`.
+    Chunks may be DataFrames (e.g. from `pd.read_csv(..., chunksize=...)`), objects with `to_pandas` method
+    (e.g. pyarrow record batches of parquet row groups), mappings of column name to array,
+    `(lat, lon)` tuples of arrays, or `PointColumns`.
+    Since chunks are transformed independently, `color` and `size` may only be column names.
+    Colors of the same keys are the same across chunks.
+    >>> chunks = [{'lat': [55.7], 'lon': [37.8], 'key': ['red']}, {'lat': [55.8], 'lon': [37.9], 'key': ['blue']}]
+    >>> [part.color.tolist() for part in transform_chunks(chunks, color='key')]
+    [[[255, 0, 0]], [[0, 0, 255]]]
+    >>> [len(part) for part in transform_chunks([([0.0] * 3, [0.0] * 3), ([0.0] * 2, [0.0] * 2)])]
+    [3, 2]
+    """
+    for name, value in (('lat', lat), ('lon', lon), ('color', color), ('size', size)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"`{name}` must be a column name for chunked data")
+    for chunk in chunks:
+        if hasattr(chunk, 'to_pandas'):
+            chunk = chunk.to_pandas()
+        elif isinstance(chunk, Mapping):
+            chunk = pd.DataFrame(chunk)
+        elif isinstance(chunk, tuple):
+            chunk = PointColumns(*chunk)
+        if not isinstance(chunk, (pd.DataFrame, PointColumns)):
+            raise TypeError(f"Unsupported chunk type `{type(chunk)}`")
+        yield transform_with_format_detection(data=chunk, lat=lat, lon=lon, color=color, size=size)
+
+
+def scatterplot_chunks(
+    chunks: Iterable[Any],
+    lat: Optional[str] = None,
+    lon: Optional[str] = None,
+    color: Optional[str] = None,
+    size: Optional[str] = None,
+    binary: bool = False,
+    lod: Optional[LevelOfDetail] = None,
+    validate: Optional[str] = None,
+):
+    """
+    Version of `scatterplot` for data, which does not fit into memory at once.
+    Chunks are processed one by one, see `transform_chunks` for supported formats.
+    With `lod` set, only decimated points are kept in memory between chunks,
+    so memory stays bounded regardless of input size. Without `lod` all points are shipped,
+    so memory grows with their number, and in binary mode only their coordinates, colors and sizes are kept.
+    With `validate` policy, every chunk is validated, see `CoordinateValidator`.
+    `>>> scatterplot_chunks(pd.read_csv('points.csv', chunksize=1_000_000), color='city', lod=LevelOfDetail())
+    """
     map = Map()
-    data = copy.deepcopy(data)
-    data = transform_with_format_detection(
-        data=data, lat=lat, lon=lon,
-        color=color, size=size
+    map.add_scatterplot_layer_from_chunks(
+        transform_chunks(chunks, lat=lat, lon=lon, color=color, size=size),
+        binary=binary, lod=lod, validate=validate,
     )
-    map.add_scatterplot_layer(data)
     return map.display()
@@ -0,0 +1,156 @@
+"""
+Vectorized binning of points into square and hexagonal cells.
+Binning is made in web mercator plane, with coordinates in degrees of longitude,
+so cells of the same size look equal on the map at any latitude.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import List, Optional, Tuple
+
+from splyne.mapping.common.lod import pack_columns
+
+# Latitude, where web mercator projection is cut
+MAX_MERCATOR_LAT = 85.051129
+
+AGGREGATIONS = ('count', 'sum', 'mean')
+
+SQRT_3 = np.sqrt(3.0)
+
+
+def mercator_y(lat: np.ndarray) -> np.ndarray:
+    """
+    Web mercator ordinate of latitude, in degrees of longitude.
+    >>> mercator_y(np.array([45.0, 90.0])).round(3)
+    array([ 50.499, 180.   ])
+    """
+    lat = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    return np.degrees(np.log(np.tan(np.pi / 4 + lat / 2)))
+
+
+def mercator_lat(y: np.ndarray) -> np.ndarray:
+    """
+    Inverse of `mercator_y`.
+    >>> mercator_lat(mercator_y(np.array([-60.0, 55.7]))).round(6)
+    array([-60. ,  55.7])
+    """
+    return np.degrees(2 * np.arctan(np.exp(np.radians(y))) - np.pi / 2)
+
+
+def factorize_columns(columns: List[np.ndarray]) -> Tuple[np.ndarray, int]:
+    """
+    Get code of every row of integer columns, equal rows get equal codes, and count of distinct rows.
+    >>> factorize_columns([np.array([0, 1, 0]), np.array([5, 5, 5])])
+    (array([0, 1, 0]), 2)
+    """
+    if len(columns[0]) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    packed = pack_columns(columns)
+    if packed is not None:
+        codes, uniques = pd.factorize(packed)
+    else:
+        codes, uniques = pd.MultiIndex.from_arrays(columns).factorize()
+    return codes, len(uniques)
+
+
+def _cell_values(codes: np.ndarray, count: int, *values: np.ndarray) -> List[np.ndarray]:
+    # All points of a cell have the same values, so any of them may be written
+    result = []
+    for column in values:
+        cells = np.empty(count, dtype=column.dtype)
+        cells[codes] = column
+        result.append(cells)
+    return result
+
+
+def grid_cells(x: np.ndarray, y: np.ndarray, size: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bin points of plane into square cells of given size.
+    Returns code of cell of every point and centers of cells.
+    >>> codes, center_x, center_y = grid_cells(np.array([0.2, 0.7, 1.5]), np.array([0.1, 0.9, 0.1]), 1.0)
+    >>> codes, center_x, center_y
+    (array([0, 0, 1]), array([0.5, 1.5]), array([0.5, 0.5]))
+    """
+    cols = np.floor(x / size).astype(np.int64)
+    rows = np.floor(y / size).astype(np.int64)
+    codes, count = factorize_columns([cols, rows])
+    cols, rows = _cell_values(codes, count, cols, rows)
+    return codes, (cols + 0.5) * size, (rows + 0.5) * size
+
+
+def hexagon_cells(x: np.ndarray, y: np.ndarray, size: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bin points of plane into flat-topped hexagons with given circumradius.
+    Returns code of cell of every point and centers of cells.
+    >>> codes, center_x, center_y = hexagon_cells(np.array([0.1, -0.1, 1.5]), np.array([0.1, 0.0, 0.9]), 1.0)
+    >>> codes, center_x.round(3), center_y.round(3)
+    (array([0, 0, 1]), array([0. , 1.5]), array([0.   , 0.866]))
+    """
+    q = (2.0 / 3.0) * x / size
+    r = (-x / 3.0 + SQRT_3 / 3.0 * y) / size
+    # Round cube coordinates and fix the one, which was rounded most, so they still sum to zero
+    s = -q - r
+    rounded_q, rounded_r, rounded_s = np.rint(q), np.rint(r), np.rint(s)
+    diff_q, diff_r, diff_s = np.abs(rounded_q - q), np.abs(rounded_r - r), np.abs(rounded_s - s)
+    fix_q = (diff_q > diff_r) & (diff_q > diff_s)
+    fix_r = ~fix_q & (diff_r > diff_s)
+    rounded_q = np.where(fix_q, -rounded_r - rounded_s, rounded_q)
+    rounded_r = np.where(fix_r, -rounded_q - rounded_s, rounded_r)
+
+    q, r = rounded_q.astype(np.int64), rounded_r.astype(np.int64)
+    codes, count = factorize_columns([q, r])
+    q, r = _cell_values(codes, count, q, r)
+    return codes, size * 1.5 * q, size * SQRT_3 * (r + q / 2.0)
+
+
+def aggregate_cells(
+    codes: np.ndarray,
+    count: int,
+    weights: Optional[np.ndarray] = None,
+    aggregation: str = 'count',
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get number of points and aggregated weight of every cell.
+    >>> aggregate_cells(np.array([0, 0, 1]), 2, weights=np.array([1.0, 3.0, 5.0]), aggregation='mean')
+    (array([2, 1]), array([2., 5.]))
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation `{aggregation}`, expected one of {AGGREGATIONS}")
+    if aggregation != 'count' and weights is None:
+        raise ValueError(f"Weights must be provided for `{aggregation}` aggregation")
+    counts = np.bincount(codes, minlength=count)
+    if aggregation == 'count':
+        return counts, counts.astype(np.float64)
+    sums = np.bincount(codes, weights=np.asarray(weights, dtype=np.float64), minlength=count)
+    if aggregation == 'sum':
+        return counts, sums
+    return counts, sums / np.maximum(counts, 1)
+
+
+def grid_polygons(center_x: np.ndarray, center_y: np.ndarray, size: float) -> np.ndarray:
+    """
+    Get corners of square cells as array of shape (N, 4, 2) of `[lon, lat]`.
+    >>> grid_polygons(np.array([0.5]), np.array([0.5]), 1.0).round(3).tolist()
+    [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]]]
+    """
+    offsets = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]]) * size
+    return _plane_polygons(center_x, center_y, offsets)
+
+
+def hexagon_polygons(center_x: np.ndarray, center_y: np.ndarray, size: float) -> np.ndarray:
+    """
+    Get corners of flat-topped hexagons as array of shape (N, 6, 2) of `[lon, lat]`.
+    >>> hexagon_polygons(np.array([0.0]), np.array([0.0]), 1.0).shape
+    (1, 6, 2)
+    """
+    angles = np.radians(np.arange(6) * 60.0)
+    offsets = np.column_stack([np.cos(angles), np.sin(angles)]) * size
+    return _plane_polygons(center_x, center_y, offsets)
+
+
+def _plane_polygons(center_x: np.ndarray, center_y: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    polygons = np.empty((len(center_x), len(offsets), 2), dtype=np.float64)
+    polygons[:, :, 0] = center_x[:, None] + offsets[None, :, 0]
+    polygons[:, :, 1] = mercator_lat(center_y[:, None] + offsets[None, :, 1])
+    return polygons
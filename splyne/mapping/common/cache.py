@@ -0,0 +1,141 @@
+"""
+On-disk cache of encoded layers.
+Entries are addressed by hash of input data and layer parameters, so unchanged layers,
+rendered again and again, are loaded instead of being processed and encoded again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, Iterable, Optional, Union
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox, GeoPoint
+
+
+class LayerCache(SplyneObject):
+
+    DEFAULT_MAX_BYTES = 256 * 2 ** 20
+    ENTRY_SUFFIX = '.json'
+
+    # Changed whenever format of entries or encoding of layers changes, so old entries are not reused
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Content-addressed cache of encoded layer payloads and their bounding boxes.
+        Total size of entries is bounded by `max_bytes`, least recently used entries are evicted first.
+        Entries are written atomically, so cache directory may be shared by several processes.
+        :param directory: directory to keep entries in, created if it does not exist
+        :param max_bytes: maximal total size of entries
+        """
+        super().__init__()
+        if max_bytes <= 0:
+            raise ValueError("`max_bytes` must be positive")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return 'LayerCache({!r}, max_bytes={})'.format(self.directory, self.max_bytes)
+
+    @staticmethod
+    def make_key(data: Union[PointColumns, Iterable[Dict[str, Any]]], params: Dict[str, Any]) -> str:
+        """
+        Hash of data and parameters of layer.
+        >>> LayerCache.make_key(PointColumns([55.7], [37.8]), {'binary': True}) == LayerCache.make_key(PointColumns([55.7], [37.8]), {'binary': True})
+        True
+        >>> LayerCache.make_key(PointColumns([55.7], [37.8]), {}) == LayerCache.make_key(PointColumns([55.7], [37.9]), {})
+        False
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([LayerCache.FORMAT_VERSION, params], sort_keys=True, default=repr).encode())
+        if not isinstance(data, PointColumns):
+            digest.update(json.dumps(list(data), sort_keys=True, default=repr).encode())
+            return digest.hexdigest()
+        for values in (data.lat, data.lon, data.color, data.size):
+            if values is None:
+                digest.update(b'none')
+                continue
+            values = np.ascontiguousarray(values)
+            digest.update(f'{values.dtype.str}{values.shape}'.encode())
+            digest.update(values.tobytes() if values.dtype != object else json.dumps(values.tolist(), default=repr).encode())
+        digest.update(json.dumps(data.attribute_names).encode())
+        if data.attribute_names:
+            attributes = data.attributes[data.attribute_names]
+            try:
+                digest.update(pd.util.hash_pandas_object(attributes, index=False).to_numpy().tobytes())
+            except TypeError:
+                # Unhashable values, e.g. lists
+                digest.update(json.dumps(attributes.to_dict('list'), default=repr).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + LayerCache.ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get entry with `payload`, `bbox` and `kwargs` of layer, or None if there is no such entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Modification time is used as time of last access for eviction
+        os.utime(path)
+        bbox = BBox()
+        if entry['bbox'] is not None:
+            ll_lat, ll_lon, ur_lat, ur_lon = entry['bbox']
+            bbox = BBox(GeoPoint(ll_lat, ll_lon), GeoPoint(ur_lat, ur_lon))
+        entry['bbox'] = bbox
+        return entry
+
+    def put(self, key: str, payload: Any, bbox: BBox, kwargs: Dict[str, Any]):
+        """
+        Store encoded layer and evict least recently used entries, if cache is full.
+        Layers with parameters, which can not be stored as json, are not cached.
+        """
+        entry = {
+            'payload': payload,
+            'bbox': list(bbox.ll_point) + list(bbox.ur_point) if bbox.initialized else None,
+            'kwargs': kwargs,
+        }
+        try:
+            content = json.dumps(entry)
+        except TypeError as error:
+            self.logger.warning(f'Layer is not cached: {error}')
+            return
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(temporary_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(LayerCache.ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(LayerCache.ENTRY_SUFFIX):
+                os.remove(entry.path)
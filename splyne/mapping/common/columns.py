@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.common import GeoPointArray
+
+
+def as_array(values: Iterable[Any], dtype: Optional[Any] = None) -> np.ndarray:
+    """
+    Convert column-like input into numpy array, without copying it if possible.
+    >>> as_array([1.0, 2.0])
+    array([1., 2.])
+    >>> as_array(x * 2 for x in range(3))
+    array([0, 2, 4])
+    >>> as_array(pd.Series([1, 2]), dtype=np.float64)
+    array([1., 2.])
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values.to_numpy(dtype=dtype)
+    if not hasattr(values, '__len__'):
+        values = list(values)
+    return np.asarray(values, dtype=dtype)
+
+
+class PointColumns(SplyneObject):
+
+    def __init__(
+        self,
+        lat: Iterable[float],
+        lon: Iterable[float],
+        color: Optional[Iterable[Any]] = None,
+        size: Optional[Iterable[Any]] = None,
+        attributes: Optional[pd.DataFrame] = None,
+        attribute_names: Optional[List[str]] = None,
+    ):
+        """
+        Columnar storage of points.
+        Coordinates, colors and sizes are kept as numpy arrays, while all other fields of input
+        are kept in `attributes` frame, and are materialized only when records are requested.
+        :param lat: latitudes of points
+        :param lon: longitudes of points
+        :param color: optional colors of points, array of shape (N, 3) or (N, 4)
+        :param size: optional sizes of points
+        :param attributes: optional frame with extra fields, aligned with points
+        :param attribute_names: columns of `attributes` to keep, by default all of them
+        """
+        super().__init__()
+        self.lat = as_array(lat, dtype=np.float64)
+        self.lon = as_array(lon, dtype=np.float64)
+        if self.lat.ndim != 1 or self.lat.shape != self.lon.shape:
+            raise ValueError("`lat` and `lon` must be one-dimensional and of equal lengths")
+        self.color = None
+        self.size = None
+        if color is not None:
+            self.set_color(color)
+        if size is not None:
+            self.set_size(size)
+        if attributes is not None and len(attributes) != len(self.lat):
+            raise ValueError("Attributes and points must be of equal lengths")
+        self.attributes = attributes
+        if attribute_names is None:
+            attribute_names = [] if attributes is None else list(attributes.columns)
+        self.attribute_names = attribute_names
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_records())
+
+    def __repr__(self):
+        return 'PointColumns({} points)'.format(len(self))
+
+    @staticmethod
+    def from_dataframe(data: pd.DataFrame, lat: str = 'lat', lon: str = 'lon') -> 'PointColumns':
+        """
+        Make columns from DataFrame, without copying it.
+        Columns `lat` and `lon` are used as coordinates, all other columns are kept as attributes.
+        >>> df = pd.DataFrame({'a': [55.7, 55.8], 'b': [37.8, 37.9], 'key': [1, 2]})
+        >>> columns = PointColumns.from_dataframe(df, lat='a', lon='b')
+        >>> columns.to_records()
+        [{'key': 1, 'lat': 55.7, 'lon': 37.8}, {'key': 2, 'lat': 55.8, 'lon': 37.9}]
+        >>> PointColumns.from_dataframe(df)
+        Traceback (most recent call last):
+         ...
+        ValueError: Key `lat` does not exist
+        """
+        for name in (lat, lon):
+            if name not in data.columns:
+                raise ValueError(f"Key `{name}` does not exist")
+        return PointColumns(
+            data[lat], data[lon],
+            attributes=data,
+            attribute_names=[name for name in data.columns if name not in (lat, lon)],
+        )
+
+    @staticmethod
+    def from_records(records: Iterable[Dict[str, Any]]) -> 'PointColumns':
+        """
+        Make columns from iterable of dicts, with `lat`, `lon` and optional `color` and `size` keys.
+        >>> columns = PointColumns.from_records([{'lat': 55.7, 'lon': 37.8, 'color': [255, 0, 0], 'key': 1}])
+        >>> columns.color
+        array([[255,   0,   0]])
+        >>> columns.attribute_names
+        ['key']
+        """
+        frame = pd.DataFrame.from_records(list(records))
+        columns = PointColumns.from_dataframe(frame)
+        for name in ('color', 'size'):
+            if name in frame.columns:
+                getattr(columns, f'set_{name}')(np.array(frame[name].tolist()))
+                columns.attribute_names.remove(name)
+        return columns
+
+    @staticmethod
+    def concat(parts: List['PointColumns']) -> 'PointColumns':
+        """
+        Concatenate columns of several parts into one.
+        All parts must have the same fields.
+        >>> first = PointColumns([55.7], [37.8], size=[1], attributes=pd.DataFrame({'key': ['a']}))
+        >>> second = PointColumns([55.8], [37.9], size=[2], attributes=pd.DataFrame({'key': ['b']}))
+        >>> PointColumns.concat([first, second]).to_records()
+        [{'key': 'a', 'lat': 55.7, 'lon': 37.8, 'size': 1}, {'key': 'b', 'lat': 55.8, 'lon': 37.9, 'size': 2}]
+        """
+        if not parts:
+            return PointColumns([], [])
+        first = parts[0]
+        for part in parts[1:]:
+            if (
+                (part.color is None) != (first.color is None)
+                or (part.size is None) != (first.size is None)
+                or part.attribute_names != first.attribute_names
+            ):
+                raise ValueError("All parts must have the same fields to be concatenated")
+        attributes = None
+        if first.attribute_names:
+            attributes = pd.concat([part.attributes[part.attribute_names] for part in parts], ignore_index=True)
+        return PointColumns(
+            np.concatenate([part.lat for part in parts]),
+            np.concatenate([part.lon for part in parts]),
+            color=None if first.color is None else np.concatenate([part.color for part in parts]),
+            size=None if first.size is None else np.concatenate([part.size for part in parts]),
+            attributes=attributes,
+            attribute_names=list(first.attribute_names),
+        )
+
+    def points(self) -> GeoPointArray:
+        return GeoPointArray(self.lat, self.lon)
+
+    def view(self) -> 'PointColumns':
+        """
+        Make new columns, sharing arrays with these, so setting colors or sizes of them does not change these.
+        >>> columns = PointColumns([55.7], [37.8])
+        >>> view = columns.view()
+        >>> view.set_size([2])
+        >>> view.lat is columns.lat, columns.size is None
+        (True, True)
+        """
+        return PointColumns(
+            self.lat, self.lon, color=self.color, size=self.size,
+            attributes=self.attributes, attribute_names=list(self.attribute_names),
+        )
+
+    def copy(self) -> 'PointColumns':
+        """
+        Make deep copy of columns, which does not share memory with input.
+        >>> lat = np.array([55.7])
+        >>> columns = PointColumns(lat, [37.8])
+        >>> columns.lat is lat, columns.copy().lat is lat
+        (True, False)
+        """
+        return PointColumns(
+            self.lat.copy(), self.lon.copy(),
+            color=None if self.color is None else self.color.copy(),
+            size=None if self.size is None else self.size.copy(),
+            attributes=None if self.attributes is None else self.attributes[self.attribute_names].copy(),
+            attribute_names=list(self.attribute_names),
+        )
+
+    def take(self, indices: np.ndarray) -> 'PointColumns':
+        """
+        Make new columns with points at given positions.
+        >>> PointColumns([55.7, 55.8, 55.9], [37.8, 37.9, 38.0], size=[1, 2, 3]).take([0, 2]).to_records()
+        [{'lat': 55.7, 'lon': 37.8, 'size': 1}, {'lat': 55.9, 'lon': 38.0, 'size': 3}]
+        """
+        indices = np.asarray(indices)
+        return PointColumns(
+            self.lat[indices], self.lon[indices],
+            color=None if self.color is None else self.color[indices],
+            size=None if self.size is None else self.size[indices],
+            attributes=None if self.attributes is None else self.attributes.iloc[indices],
+            attribute_names=list(self.attribute_names),
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get values of field `name` as array.
+        >>> PointColumns([55.7, 55.8], [37.8, 37.9]).column('lon')
+        array([37.8, 37.9])
+        """
+        if name in ('lat', 'lon', 'color', 'size') and getattr(self, name) is not None:
+            return getattr(self, name)
+        if name not in self.attribute_names:
+            raise ValueError(f"Key `{name}` does not exist")
+        return self.attributes[name].to_numpy()
+
+    def set_color(self, color: Iterable[Any]):
+        color = as_array(color)
+        if len(color) != len(self):
+            raise ValueError("Colors and points must be of equal lengths")
+        self.color = color
+
+    def set_size(self, size: Iterable[Any]):
+        size = as_array(size)
+        if len(size) != len(self):
+            raise ValueError("Sizes and points must be of equal lengths")
+        self.size = size
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Materialize points as list of dicts.
+        >>> PointColumns([55.7, 55.8], [37.8, 37.9], color=[[255, 0, 0], [0, 255, 0]]).to_records()
+        [{'lat': 55.7, 'lon': 37.8, 'color': [255, 0, 0]}, {'lat': 55.8, 'lon': 37.9, 'color': [0, 255, 0]}]
+        """
+        fields = {name: self.attributes[name].tolist() for name in self.attribute_names}
+        fields['lat'] = self.lat.tolist()
+        fields['lon'] = self.lon.tolist()
+        if self.color is not None:
+            fields['color'] = self.color.tolist()
+        if self.size is not None:
+            fields['size'] = self.size.tolist()
+        keys = list(fields.keys())
+        return [dict(zip(keys, row)) for row in zip(*fields.values())]
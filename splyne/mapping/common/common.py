@@ -1,11 +1,24 @@
 import haversine
+import numpy as np
 
-from typing import Callable, Optional
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from splyne.common.base import SplyneObject
+from splyne.mapping.common.distance import haversine_distance
 
 
 class GeoPoint(SplyneObject):
+    """
+    Compact value type for a single point.
+    >>> lat, lon = GeoPoint(55.7, 37.8)
+    >>> (lat, lon)
+    (55.7, 37.8)
+    >>> GeoPoint(55.7, 37.8) == GeoPoint(55.7, 37.8)
+    True
+    >>> hasattr(GeoPoint(55.7, 37.8), '__dict__')
+    False
+    """
+    __slots__ = ('lat', 'lon')
 
     MIN_LAT = -90.0
     MAX_LAT = +90.0
@@ -13,7 +26,6 @@ class GeoPoint(SplyneObject):
     MAX_LON = +180.0
 
     def __init__(self, lat, lon):
-        super().__init__()
         if not (GeoPoint.MIN_LAT <= lat <= GeoPoint.MAX_LAT):
             raise ValueError("Latitude must be in [-90.0, 90.0] interval")
         if not (GeoPoint.MIN_LON <= lon <= GeoPoint.MAX_LON):
@@ -24,6 +36,18 @@ class GeoPoint(SplyneObject):
     def __repr__(self):
         return "GeoPoint({lat:.6f}, {lon:6f})".format(lat=self.lat, lon=self.lon)
 
+    def __iter__(self) -> Iterator[float]:
+        yield self.lat
+        yield self.lon
+
+    def __eq__(self, other):
+        if not isinstance(other, GeoPoint):
+            return NotImplemented
+        return self.lat == other.lat and self.lon == other.lon
+
+    def __hash__(self):
+        return hash((self.lat, self.lon))
+
     @staticmethod
     def axiswise_aggregation(
         first: 'GeoPoint', second: 'GeoPoint',
@@ -48,7 +72,63 @@ class GeoPoint(SplyneObject):
         return GeoPoint.axiswise_aggregation(first, second, max)
 
 
+class GeoPointArray(SplyneObject):
+    """
+    Array-backed collection of points, to use instead of list of GeoPoints.
+    Points are validated at once with vectorized checks, single GeoPoints are created only on access.
+    >>> points = GeoPointArray([55.7, 55.8, 56.0], [37.8, 37.9, 38.0])
+    >>> len(points)
+    3
+    >>> points[1]
+    GeoPoint(55.800000, 37.900000)
+    >>> points[1:]
+    GeoPointArray(2 points)
+    >>> points.bbox()
+    BBox(GeoPoint(55.700000, 37.800000), GeoPoint(56.000000, 38.000000))
+    >>> GeoPointArray([55.7, 95.0], [37.8, 37.9])
+    Traceback (most recent call last):
+     ...
+    ValueError: Latitude must be in [-90.0, 90.0] interval
+    """
+    __slots__ = ('lat', 'lon')
+
+    def __init__(self, lat: Iterable[float], lon: Iterable[float]):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if lat.ndim != 1 or lat.shape != lon.shape:
+            raise ValueError("Latitudes and longitudes must be one-dimensional and of equal lengths")
+        if not np.all((GeoPoint.MIN_LAT <= lat) & (lat <= GeoPoint.MAX_LAT)):
+            raise ValueError("Latitude must be in [-90.0, 90.0] interval")
+        if not np.all((GeoPoint.MIN_LON <= lon) & (lon <= GeoPoint.MAX_LON)):
+            raise ValueError("Longitude must be in [-180.0, 180.0] interval")
+        self.lat = lat
+        self.lon = lon
+
+    def __repr__(self):
+        return 'GeoPointArray({} points)'.format(len(self))
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray]) -> Union[GeoPoint, 'GeoPointArray']:
+        if isinstance(key, (int, np.integer)):
+            return GeoPoint(float(self.lat[key]), float(self.lon[key]))
+        return GeoPointArray(self.lat[key], self.lon[key])
+
+    def __iter__(self) -> Iterator[GeoPoint]:
+        for lat, lon in zip(self.lat.tolist(), self.lon.tolist()):
+            yield GeoPoint(lat, lon)
+
+    @property
+    def nbytes(self) -> int:
+        return self.lat.nbytes + self.lon.nbytes
+
+    def bbox(self) -> 'BBox':
+        return BBox.from_arrays(self.lat, self.lon)
+
+
 class BBox(SplyneObject):
+    __slots__ = ('ll_point', 'ur_point', 'initialized')
 
     def __init__(
         self,
@@ -61,7 +141,6 @@ class BBox(SplyneObject):
         :param ll_point: lower left bound of BBox
         :param ur_point: upper right bound of BBox
         """
-        super().__init__()
         if (ll_point is not None) and (ur_point is not None):
             self.ll_point = ll_point
             self.ur_point = ur_point
@@ -89,11 +168,11 @@ class BBox(SplyneObject):
         '0.000'
         """
         if self.initialized:
-            return haversine.haversine(
-                (self.ll_point.lat, self.ll_point.lon),
-                (self.ur_point.lat, self.ur_point.lon),
-                units
-            )
+            return float(haversine_distance(
+                self.ll_point.lat, self.ll_point.lon,
+                self.ur_point.lat, self.ur_point.lon,
+                unit=units,
+            ))
         else:
             raise ValueError("BBox is uninitialized")
 
@@ -129,6 +208,49 @@ class BBox(SplyneObject):
         self.ur_point = GeoPoint.axiswise_max(self.ur_point, point)
         self.initialized = True
 
+    def update_with_arrays(self, lat: Iterable[float], lon: Iterable[float]):
+        """
+        Updates BBox, to contain all points, given as arrays of coordinates.
+        Extent is computed with vectorized reductions, no GeoPoint is created per point.
+        >>> bb = BBox(GeoPoint(1.0, 1.0), GeoPoint(3.0, 3.0))
+        >>> bb.update_with_arrays([3.5, 2.0], [0.5, 2.0])
+        >>> bb
+        BBox(GeoPoint(1.000000, 0.500000), GeoPoint(3.500000, 3.000000))
+        >>> bb.update_with_arrays([], [])
+        >>> bb
+        BBox(GeoPoint(1.000000, 0.500000), GeoPoint(3.500000, 3.000000))
+        """
+        other = BBox.from_arrays(lat, lon)
+        if other.initialized:
+            self.ll_point = GeoPoint.axiswise_min(self.ll_point, other.ll_point)
+            self.ur_point = GeoPoint.axiswise_max(self.ur_point, other.ur_point)
+            self.initialized = True
+
+    @staticmethod
+    def from_arrays(lat: Iterable[float], lon: Iterable[float]) -> 'BBox':
+        """
+        Make BBox bounding all points, given as arrays of coordinates.
+        Empty arrays give uninitialized BBox.
+        >>> BBox.from_arrays([55.7, 56.4, 53.3], [37.8, 35.9, 36.4])
+        BBox(GeoPoint(53.300000, 35.900000), GeoPoint(56.400000, 37.800000))
+        >>> BBox.from_arrays([], []).initialized
+        False
+        >>> BBox.from_arrays([55.7, 95.0], [37.8, 35.9])
+        Traceback (most recent call last):
+         ...
+        ValueError: Latitude must be in [-90.0, 90.0] interval
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if lat.shape != lon.shape:
+            raise ValueError("Latitudes and longitudes must be of equal lengths")
+        if lat.size == 0:
+            return BBox()
+        return BBox(
+            GeoPoint(float(lat.min()), float(lon.min())),
+            GeoPoint(float(lat.max()), float(lon.max())),
+        )
+
     @staticmethod
     def merge(first: 'BBox', second: 'BBox') -> 'BBox':
         """
@@ -0,0 +1,74 @@
+"""
+Vectorized haversine distances over whole columns of coordinates.
+Supports all units of `haversine.Unit`.
+"""
+
+import math
+
+import haversine
+import numpy as np
+
+from typing import Optional, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+
+# Average earth radius in every unit, derived from `haversine` itself, so results are consistent with it
+EARTH_RADIUS = {
+    unit: haversine.haversine((0.0, 0.0), (0.0, 180.0), unit=unit) / math.pi
+    for unit in haversine.Unit
+}
+
+
+def haversine_distance(
+    lat1: ArrayLike, lon1: ArrayLike,
+    lat2: ArrayLike, lon2: ArrayLike,
+    unit: haversine.Unit = haversine.Unit.KILOMETERS,
+) -> np.ndarray:
+    """
+    Pairwise haversine distance between points. Inputs are broadcasted against each other,
+    so this works both along arrays of the same length and from one point to many.
+    >>> '%.3f' % haversine_distance(55.748, 37.611, 55.757, 37.624)
+    '1.290'
+    >>> haversine_distance(np.array([0.0, 0.0]), np.array([0.0, 0.0]), np.array([0.0, 90.0]), np.array([180.0, 0.0]), unit=haversine.Unit.DEGREES)
+    array([180.,  90.])
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(values, dtype=np.float64)) for values in (lat1, lon1, lat2, lon2))
+    d = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2 * EARTH_RADIUS[unit] * np.arcsin(np.sqrt(np.minimum(d, 1.0)))
+
+
+def distances_to(
+    lat: float, lon: float,
+    points_lat: np.ndarray, points_lon: np.ndarray,
+    unit: haversine.Unit = haversine.Unit.KILOMETERS,
+) -> np.ndarray:
+    """
+    Distances from a single point to every point of arrays.
+    >>> distances_to(0.0, 0.0, np.array([0.0, 0.0]), np.array([90.0, -90.0]), unit=haversine.Unit.DEGREES)
+    array([90., 90.])
+    """
+    return haversine_distance(lat, lon, points_lat, points_lon, unit=unit)
+
+
+def nearest_within(
+    lat: float, lon: float,
+    points_lat: np.ndarray, points_lon: np.ndarray,
+    radius: float,
+    k: Optional[int] = None,
+    unit: haversine.Unit = haversine.Unit.KILOMETERS,
+) -> np.ndarray:
+    """
+    Indices of points within `radius` from given point, ordered by distance.
+    If `k` is set, only `k` nearest of them are returned.
+    >>> points_lat, points_lon = np.array([55.75, 55.76, 59.93, 55.751]), np.array([37.61, 37.62, 30.33, 37.611])
+    >>> nearest_within(55.75, 37.61, points_lat, points_lon, radius=5.0)
+    array([0, 3, 1])
+    >>> nearest_within(55.75, 37.61, points_lat, points_lon, radius=5.0, k=2)
+    array([0, 3])
+    """
+    distances = distances_to(lat, lon, points_lat, points_lon, unit=unit)
+    indices = np.flatnonzero(distances <= radius)
+    if k is not None and k < len(indices):
+        indices = indices[np.argpartition(distances[indices], k - 1)[:k]]
+    return indices[np.argsort(distances[indices], kind='stable')]
@@ -0,0 +1,145 @@
+"""
+Binary encoding of layer payloads.
+Columns are packed into little-endian typed buffers and shipped as base64 strings,
+which are decoded into deck.gl binary attributes by `BINARY_DECODER_SCRIPT` in the browser.
+Quantized positions, see `Quantization`, are decoded by the same script.
+"""
+
+import base64
+
+import numpy as np
+
+from typing import Any, Dict, Optional
+
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.quantization import Quantization
+
+
+BINARY_KEY = '@@binary'
+
+# numpy dtypes, which have corresponding javascript typed arrays
+BINARY_DTYPES = {
+    'int8': '<i1', 'uint8': '<u1',
+    'int16': '<i2', 'uint16': '<u2',
+    'int32': '<i4', 'uint32': '<u4',
+    'float32': '<f4', 'float64': '<f8',
+}
+
+BINARY_DECODER_SCRIPT = """
+<script>
+  (function() {
+    const typedArrays = {
+      int8: Int8Array, uint8: Uint8Array, int16: Int16Array, uint16: Uint16Array,
+      int32: Int32Array, uint32: Uint32Array, float32: Float32Array, float64: Float64Array,
+    };
+    // Zigzag varint deltas of fixed-point offsets, decoded arithmetically, since offsets may exceed 32 bits
+    function decodeQuantized(node) {
+      const bytes = Uint8Array.from(atob(node.value), c => c.charCodeAt(0));
+      const positions = new Float64Array(2 * node.length);
+      const offsets = [0, 0];
+      let position = 0;
+      for (let i = 0; i < positions.length; i++) {
+        let value = 0, factor = 1, byte;
+        do {
+          byte = bytes[position++];
+          value += (byte & 0x7f) * factor;
+          factor *= 128;
+        } while (byte & 0x80);
+        const axis = i % 2;
+        offsets[axis] += value % 2 ? -(value + 1) / 2 : value / 2;
+        positions[i] = node.origin[axis] + offsets[axis] * node.scale[axis];
+      }
+      return positions;
+    }
+    function decodeBinary(node) {
+      if (Array.isArray(node)) {
+        return node.map(decodeBinary);
+      }
+      if (node === null || typeof node !== 'object') {
+        return node;
+      }
+      if (node['@@binary']) {
+        const bytes = Uint8Array.from(atob(node.value), c => c.charCodeAt(0));
+        return {value: new typedArrays[node['@@binary']](bytes.buffer), size: node.size};
+      }
+      if (node['@@quantized']) {
+        return {value: decodeQuantized(node), size: 2};
+      }
+      const result = {};
+      for (const key in node) {
+        result[key] = decodeBinary(node[key]);
+      }
+      return result;
+    }
+    const createDeck = window.createDeck;
+    window.createDeck = function(props) {
+      return createDeck(Object.assign({}, props, {jsonInput: decodeBinary(props.jsonInput)}));
+    };
+  })();
+</script>
+"""
+
+
+def encode_array(values: np.ndarray, dtype: str) -> Dict[str, Any]:
+    """
+    Pack array of shape (N,) or (N, size) into base64 typed buffer.
+    >>> encode_array(np.array([[1, 2], [3, 4]]), 'uint8')
+    {'@@binary': 'uint8', 'size': 2, 'value': 'AQIDBA=='}
+    """
+    if dtype not in BINARY_DTYPES:
+        raise ValueError(f"Unsupported binary dtype `{dtype}`, expected one of {list(BINARY_DTYPES)}")
+    values = np.ascontiguousarray(values, dtype=BINARY_DTYPES[dtype])
+    return {
+        BINARY_KEY: dtype,
+        'size': 1 if values.ndim == 1 else values.shape[1],
+        'value': base64.b64encode(values.tobytes()).decode('ascii'),
+    }
+
+
+def decode_array(encoded: Dict[str, Any]) -> np.ndarray:
+    """
+    Inverse of `encode_array`.
+    >>> decode_array(encode_array(np.array([[1.5, 2.5], [3.5, 4.5]]), 'float32'))
+    array([[1.5, 2.5],
+           [3.5, 4.5]], dtype=float32)
+    """
+    values = np.frombuffer(base64.b64decode(encoded['value']), dtype=BINARY_DTYPES[encoded[BINARY_KEY]])
+    if encoded['size'] > 1:
+        values = values.reshape(-1, encoded['size'])
+    return values
+
+
+def encode_point_columns(data: PointColumns, quantization: Optional[Quantization] = None) -> Dict[str, Any]:
+    """
+    Make deck.gl binary data of points: float32 positions, uint8 colors and float32 radii.
+    Other attributes of points are not shipped.
+    :param data: points to encode
+    :param quantization: optional grid to quantize positions to. Points are reordered then,
+        and positions are shipped as deltas of offsets, decoded into float64 positions in the browser
+    >>> encoded = encode_point_columns(PointColumns([55.7, 55.8], [37.8, 37.9], color=[[255, 0, 0], [0, 255, 0]]))
+    >>> encoded['length'], sorted(encoded['attributes'])
+    (2, ['getFillColor', 'getPosition'])
+    >>> decode_array(encoded['attributes']['getPosition'])
+    array([[37.8, 55.7],
+           [37.9, 55.8]], dtype=float32)
+    """
+    color, size = data.color, data.size
+    if quantization is not None:
+        position, order = quantization.encode(data)
+        color = None if color is None else color[order]
+        size = None if size is None else size[order]
+    else:
+        position = encode_array(np.column_stack([data.lon, data.lat]), 'float32')
+    attributes = {'getPosition': position}
+    if color is not None:
+        attributes['getFillColor'] = encode_array(color, 'uint8')
+    if size is not None:
+        attributes['getRadius'] = encode_array(size, 'float32')
+    return {'length': len(data), 'attributes': attributes}
+
+
+def inject_binary_decoder(html: str) -> str:
+    """
+    Add decoder of binary attributes to html page, rendered by pydeck.
+    """
+    return html.replace('</head>', BINARY_DECODER_SCRIPT + '</head>', 1)
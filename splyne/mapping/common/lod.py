@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from typing import List, Optional
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.columns import PointColumns
+
+
+# Size of the world in pixels at zoom 0, used by deck.gl web mercator viewport
+WORLD_SIZE_PIXELS = 512
+
+
+def pixel_size_degrees(zoom: float) -> float:
+    """
+    Get longitude span of a single screen pixel at given zoom level.
+    >>> pixel_size_degrees(0)
+    0.703125
+    >>> pixel_size_degrees(1)
+    0.3515625
+    """
+    return 360.0 / (WORLD_SIZE_PIXELS * 2.0 ** zoom)
+
+
+def pack_columns(columns: List[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Pack integer columns into single int64 key, which is much faster to deduplicate.
+    Returns None, if key does not fit into int64.
+    >>> pack_columns([np.array([0, 1, 1]), np.array([5, 5, 6])])
+    array([0, 2, 3])
+    """
+    lows = [column.min() for column in columns]
+    dims = [int(column.max() - low) + 1 for column, low in zip(columns, lows)]
+    if np.prod(dims, dtype=np.float64) >= 2 ** 62:
+        return None
+    packed = np.zeros(len(columns[0]), dtype=np.int64)
+    for column, low, dim in zip(columns, lows, dims):
+        packed *= dim
+        packed += column - low
+    return packed
+
+
+def grid_cells_first(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    cell_lat: float,
+    cell_lon: float,
+    keys: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Bin points into grid of given cell size and get sorted indices of first point in every cell.
+    If integer `keys` are given, first point of every key is kept in each cell.
+    >>> grid_cells_first(np.array([0.1, 0.2, 1.5]), np.array([0.1, 0.3, 0.1]), 1.0, 1.0)
+    array([0, 2])
+    >>> grid_cells_first(np.array([0.1, 0.2, 1.5]), np.array([0.1, 0.3, 0.1]), 1.0, 1.0, keys=np.array([0, 1, 0]))
+    array([0, 1, 2])
+    """
+    cells = [
+        np.floor(lon / cell_lon).astype(np.int64),
+        np.floor(lat / cell_lat).astype(np.int64),
+    ]
+    if keys is not None:
+        cells.append(keys)
+    packed = pack_columns(cells)
+    if packed is not None:
+        duplicated = pd.Series(packed).duplicated()
+    else:
+        duplicated = pd.DataFrame(dict(enumerate(cells))).duplicated()
+    return np.flatnonzero(~duplicated.to_numpy())
+
+
+def color_keys(color: np.ndarray) -> np.ndarray:
+    """
+    Get integer key of every color, equal colors get equal keys.
+    >>> keys = color_keys(np.array([[255, 0, 0], [0, 255, 0], [255, 0, 0]]))
+    >>> bool(keys[0] == keys[2] != keys[1])
+    True
+    """
+    color = color.reshape(len(color), -1)
+    keys = pack_columns([color[:, i].astype(np.int64) for i in range(color.shape[1])])
+    if keys is None:
+        keys, _ = pd.MultiIndex.from_arrays(list(color.T)).factorize()
+    return keys
+
+
+class LevelOfDetail(SplyneObject):
+
+    METHODS = ('grid', 'sample')
+
+    # Maximum number of grid coarsening steps, made to fit `max_points` budget
+    MAX_COARSENING_STEPS = 32
+
+    def __init__(
+        self,
+        method: str = 'grid',
+        max_points: Optional[int] = None,
+        pixels_per_cell: float = 1.0,
+        preserve_colors: bool = True,
+        seed: int = 0,
+    ):
+        """
+        Decimation of points, which can not be distinguished at the given zoom level.
+        :param method: `grid` keeps single point per screen cell, `sample` takes random subset of `max_points`
+        :param max_points: budget of points to keep. For `grid` method, cells are made coarser until budget is met
+        :param pixels_per_cell: size of `grid` cell in screen pixels
+        :param preserve_colors: keep one point of each color per cell, so every color stays represented
+        :param seed: seed of random sampling
+        """
+        super().__init__()
+        if method not in LevelOfDetail.METHODS:
+            raise ValueError(f"Unknown method `{method}`, expected one of {LevelOfDetail.METHODS}")
+        if method == 'sample' and max_points is None:
+            raise ValueError("`max_points` must be provided for `sample` method")
+        if max_points is not None and max_points <= 0:
+            raise ValueError("`max_points` must be positive")
+        if pixels_per_cell <= 0:
+            raise ValueError("`pixels_per_cell` must be positive")
+        self.method = method
+        self.max_points = max_points
+        self.pixels_per_cell = pixels_per_cell
+        self.preserve_colors = preserve_colors
+        self.seed = seed
+
+    def __repr__(self):
+        return 'LevelOfDetail(method={!r}, max_points={!r})'.format(self.method, self.max_points)
+
+    def select(self, data: PointColumns, zoom: float) -> np.ndarray:
+        """
+        Get sorted indices of points to keep at given zoom level.
+        >>> data = PointColumns([55.70, 55.70001, 55.8], [37.8, 37.80001, 37.9])
+        >>> LevelOfDetail().select(data, zoom=10)
+        array([0, 2])
+        >>> LevelOfDetail(max_points=1).select(data, zoom=10)
+        array([0])
+        >>> len(LevelOfDetail(method='sample', max_points=2).select(data, zoom=10))
+        2
+        """
+        if len(data) == 0:
+            return np.arange(0)
+        if self.method == 'sample':
+            if len(data) <= self.max_points:
+                return np.arange(len(data))
+            return self._sample(np.arange(len(data)))
+
+        keys = None
+        if self.preserve_colors and data.color is not None:
+            keys = color_keys(data.color)
+        cell_lon = self.pixels_per_cell * pixel_size_degrees(zoom)
+        cell_lat = cell_lon * max(np.cos(np.radians(np.median(data.lat))), 1e-6)
+        indices = grid_cells_first(data.lat, data.lon, cell_lat, cell_lon, keys=keys)
+        for _ in range(LevelOfDetail.MAX_COARSENING_STEPS):
+            if self.max_points is None or len(indices) <= self.max_points:
+                break
+            cell_lat, cell_lon = 2 * cell_lat, 2 * cell_lon
+            indices = grid_cells_first(data.lat, data.lon, cell_lat, cell_lon, keys=keys)
+        if self.max_points is not None and len(indices) > self.max_points:
+            indices = self._sample(indices)
+        return indices
+
+    def apply(self, data: PointColumns, zoom: float) -> PointColumns:
+        indices = self.select(data, zoom)
+        if len(indices) == len(data):
+            return data
+        self.logger.info(f'Level of detail kept {len(indices)} of {len(data)} points')
+        return data.take(indices)
+
+    def _sample(self, indices: np.ndarray) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        return np.sort(rng.choice(indices, size=self.max_points, replace=False))
+
+
+class StreamSample(SplyneObject):
+
+    def __init__(self, max_points: int, seed: int = 0):
+        """
+        Uniform random sample of `max_points` points of a stream of chunks, kept in memory chunk by chunk.
+        Every point gets a random key, and points with the smallest keys are kept, so the sample
+        does not depend on how the stream is split into chunks, and earlier chunks are not thinned out.
+        :param max_points: size of sample
+        :param seed: seed of random keys
+        >>> sample = StreamSample(max_points=2)
+        >>> for chunk in (PointColumns([55.7, 55.8], [37.6, 37.7]), PointColumns([55.9], [37.8])):
+        ...     sample.update(chunk)
+        >>> len(sample.data)
+        2
+        """
+        super().__init__()
+        self.max_points = max_points
+        self.data = None
+        self.keys = np.array([], dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, chunk: PointColumns):
+        """
+        Add points of the next chunk to the sample. Kept points stay in order of the stream.
+        """
+        keys = np.concatenate([self.keys, self.rng.random(len(chunk))])
+        data = chunk if self.data is None else PointColumns.concat([self.data, chunk])
+        if len(keys) > self.max_points:
+            indices = np.sort(np.argpartition(keys, self.max_points - 1)[:self.max_points])
+            data, keys = data.take(indices), keys[indices]
+        self.data, self.keys = data, keys
@@ -0,0 +1,179 @@
+"""
+Time buckets of points for playback in the browser.
+Points are sorted by time once, so every bucket is a contiguous range of them, given by offsets.
+The page gets a slider, see `PLAYBACK_SCRIPT`, which shows window of buckets as views of binary attributes,
+so scrubbing time does not need python or copying of data.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import Any, Iterable, List, Optional, Union
+
+from splyne.common.base import SplyneObject
+
+PLAYBACK_SCRIPT = """
+<script>
+  (function() {
+    // Binary data of points, sorted by time, with offsets of frames, see `splyne.mapping.common.playback`
+    function frameData(data, start, end) {
+      const attributes = {};
+      for (const name in data.attributes) {
+        const attribute = data.attributes[name];
+        const value = attribute.value.subarray(start * attribute.size, end * attribute.size);
+        attributes[name] = Object.assign({}, attribute, {value: value});
+      }
+      return {length: end - start, attributes: attributes};
+    }
+    const createDeck = window.createDeck;
+    window.createDeck = function(props) {
+      const deck = createDeck(props);
+      const sources = {};
+      let frames = null;
+      for (const layer of deck.props.layers || []) {
+        if (layer.props.data && layer.props.data.frames) {
+          sources[layer.id] = layer.props.data;
+          frames = frames || layer.props.data.frames;
+        }
+      }
+      if (!frames) {
+        return deck;
+      }
+      const panel = document.createElement('div');
+      panel.style.cssText = 'position: absolute; left: 16px; bottom: 24px; z-index: 1; padding: 6px 10px; background: white; font: 12px sans-serif;';
+      const button = document.createElement('button');
+      const slider = document.createElement('input');
+      const label = document.createElement('span');
+      button.textContent = 'Play';
+      slider.type = 'range';
+      slider.min = 0;
+      slider.max = frames.labels.length - 1;
+      slider.value = 0;
+      panel.append(button, slider, label);
+      document.body.appendChild(panel);
+
+      function show(frame) {
+        label.textContent = ' ' + frames.labels[frame];
+        deck.setProps({layers: deck.props.layers.map(layer => {
+          const source = sources[layer.id];
+          if (!source) {
+            return layer;
+          }
+          const offsets = source.frames.offsets;
+          const first = Math.min(frame, offsets.length - 1);
+          const last = Math.min(frame + source.frames.window, offsets.length - 1);
+          return layer.clone({data: frameData(source, offsets[first], offsets[last])});
+        })});
+      }
+      let timer = null;
+      slider.addEventListener('input', () => show(Number(slider.value)));
+      button.addEventListener('click', () => {
+        if (timer !== null) {
+          clearInterval(timer);
+          timer = null;
+          button.textContent = 'Play';
+          return;
+        }
+        button.textContent = 'Pause';
+        timer = setInterval(() => {
+          slider.value = (Number(slider.value) + 1) % frames.labels.length;
+          show(Number(slider.value));
+        }, frames.interval);
+      });
+      show(0);
+      return deck;
+    };
+  })();
+</script>
+"""
+
+# Upper bound of number of buckets, so too small bucket does not produce a huge index
+MAX_BUCKETS = 100_000
+
+LABEL_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class TimeBuckets(SplyneObject):
+
+    DEFAULT_BUCKETS = 100
+
+    def __init__(
+        self,
+        times: Iterable[Any],
+        bucket: Optional[Union[float, str, pd.Timedelta]] = None,
+        buckets: int = DEFAULT_BUCKETS,
+    ):
+        """
+        Index of points, sorted by time, in buckets of equal duration, from the earliest point.
+        :param times: timestamps of points, numbers or datetimes
+        :param bucket: duration of bucket, in units of numeric `times`, or `pd.Timedelta` or string, e.g. `5min`, for datetimes.
+            By default range of `times` is split into `buckets` buckets
+        :param buckets: number of buckets, if `bucket` is not given
+        >>> index = TimeBuckets([5.0, 1.0, 2.5, 1.5], bucket=1.0)
+        >>> index.order.tolist(), index.offsets.tolist()
+        ([1, 3, 2, 0], [0, 2, 3, 3, 3, 4])
+        >>> index.labels()
+        ['1', '2', '3', '4', '5']
+        """
+        super().__init__()
+        times = times if isinstance(times, (np.ndarray, pd.Series, pd.Index)) else np.asarray(list(times))
+        self.is_datetime = not pd.api.types.is_numeric_dtype(times)
+        self.timezone = None
+        if self.is_datetime:
+            times = pd.DatetimeIndex(pd.to_datetime(times))
+            if times.hasnans:
+                raise ValueError("Timestamps must not be missing")
+            self.timezone = times.tz
+            values = times.as_unit('ns').asi8
+            bucket = None if bucket is None else pd.Timedelta(bucket).value
+        else:
+            values = np.asarray(times, dtype=np.float64)
+            if not np.isfinite(values).all():
+                raise ValueError("Timestamps must be finite")
+
+        if len(values) == 0:
+            self.start, self.bucket, count = 0, 1, 0
+        else:
+            self.start = values.min()
+            span = values.max() - self.start
+            if bucket is None:
+                if buckets <= 0:
+                    raise ValueError("Number of buckets must be positive")
+                bucket = span / buckets if span > 0 else 1
+                count = buckets if span > 0 else 1
+            else:
+                if not bucket > 0:
+                    raise ValueError("Duration of bucket must be positive")
+                count = int(span // bucket) + 1
+            if count > MAX_BUCKETS:
+                raise ValueError(f"Too many buckets: {count}, at most {MAX_BUCKETS} are supported")
+            self.bucket = bucket
+        self.order = np.argsort(values, kind='stable')
+        ids = np.minimum(((values[self.order] - self.start) // self.bucket).astype(np.int64), max(count - 1, 0))
+        self.offsets = np.searchsorted(ids, np.arange(count + 1), side='left')
+        self.offsets[-1] = len(values)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return 'TimeBuckets({} buckets of {} points)'.format(len(self), self.offsets[-1])
+
+    def labels(self) -> List[str]:
+        """
+        Start time of every bucket.
+        """
+        starts = self.start + np.arange(len(self)) * self.bucket
+        if not self.is_datetime:
+            return ['{:g}'.format(start) for start in starts]
+        starts = pd.to_datetime(np.asarray(starts, dtype=np.int64), unit='ns', utc=self.timezone is not None)
+        if self.timezone is not None:
+            starts = starts.tz_convert(self.timezone)
+        return list(starts.strftime(LABEL_FORMAT))
+
+
+def inject_playback_controls(html: str) -> str:
+    """
+    Add time slider of playback layers to html page, rendered by pydeck.
+    """
+    return html.replace('</head>', PLAYBACK_SCRIPT + '</head>', 1)
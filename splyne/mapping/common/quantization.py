@@ -0,0 +1,192 @@
+"""
+Quantization of coordinates into fixed-point offsets from the center of bounding box of points.
+Offsets are sorted along Morton curve and shipped as zigzag varint deltas, so neighbouring points of dense
+city-scale data take one or two bytes per coordinate instead of four or eight,
+and positions are decoded by `BINARY_DECODER_SCRIPT` in the browser.
+"""
+
+import base64
+import math
+
+import haversine
+import numpy as np
+
+from typing import Any, Dict, Tuple, Union
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.distance import EARTH_RADIUS
+from splyne.mapping.common.mvt import decode_varints, varint_matrix, zigzag
+
+QUANTIZED_KEY = '@@quantized'
+
+# Largest absolute offset of every width, offsets are symmetric around the center of bounding box
+QUANTIZED_DTYPES = {'int16': 2 ** 15 - 1, 'int32': 2 ** 31 - 1}
+
+METERS_PER_DEGREE = EARTH_RADIUS[haversine.Unit.METERS] * math.pi / 180.0
+
+# Steps of boxes of a single point, or of points on a single meridian or parallel
+MIN_STEP_DEGREES = 1e-9
+
+# Number of coordinates, encoded into varints at once, bounds temporary memory of encoding
+ENCODE_CHUNK_SIZE = 1_000_000
+
+_SPREAD_MASKS = (
+    (16, 0x0000FFFF0000FFFF),
+    (8, 0x00FF00FF00FF00FF),
+    (4, 0x0F0F0F0F0F0F0F0F),
+    (2, 0x3333333333333333),
+    (1, 0x5555555555555555),
+)
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in _SPREAD_MASKS:
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_codes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Interleave bits of non-negative integer coordinates, so points, close on the plane, are mostly close in order of codes.
+    >>> morton_codes(np.array([0, 1, 0, 1, 2]), np.array([0, 0, 1, 1, 0])).tolist()
+    [0, 1, 2, 3, 4]
+    """
+    return _spread_bits(x) | (_spread_bits(y) << np.uint64(1))
+
+
+def unzigzag(values: np.ndarray) -> np.ndarray:
+    """
+    >>> unzigzag(np.array([0, 1, 2, 3], dtype=np.uint64)).tolist()
+    [0, -1, 1, -2]
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+class Quantization(SplyneObject):
+
+    def __init__(self, bbox: BBox, precision: Union[float, str]):
+        """
+        Fixed-point grid over bounding box of points, with its own step along every axis.
+        Declared `max_error_meters` bounds distance between every point and its position on the grid.
+        :param bbox: bounding box of points
+        :param precision: max error of positions in meters, the narrowest width of offsets, which fits the box, is used.
+            Or width of offsets, `int16` or `int32`, then the box is divided into as many steps as fit into it,
+            and max error is derived from size of the box.
+        >>> bbox = BBox.from_arrays([55.5, 56.0], [37.3, 37.9])
+        >>> Quantization(bbox, 1.0)
+        Quantization(int16, max error 1.000 m)
+        >>> Quantization(bbox, 'int32')
+        Quantization(int32, max error 0.000 m)
+        """
+        super().__init__()
+        if not bbox.initialized:
+            raise ValueError("Bounding box of points must not be empty")
+        south, west = bbox.ll_point.lat, bbox.ll_point.lon
+        north, east = bbox.ur_point.lat, bbox.ur_point.lon
+        self.origin = ((west + east) / 2.0, (south + north) / 2.0)
+        half_spans = ((east - west) / 2.0, (north - south) / 2.0)
+
+        # Degree of longitude is the longest at latitude, closest to equator
+        nearest_lat = 0.0 if south <= 0.0 <= north else min(abs(south), abs(north))
+        meters_per_degree = (METERS_PER_DEGREE * math.cos(math.radians(nearest_lat)), METERS_PER_DEGREE)
+
+        if isinstance(precision, str):
+            if precision not in QUANTIZED_DTYPES:
+                raise ValueError(f"Unknown precision `{precision}`, expected max error in meters or one of {list(QUANTIZED_DTYPES)}")
+            self.dtype = precision
+            limit = QUANTIZED_DTYPES[precision]
+            self.step = tuple(max(half_span / limit, MIN_STEP_DEGREES) for half_span in half_spans)
+        else:
+            if not precision > 0:
+                raise ValueError("Precision must be positive")
+            # Error along every axis is at most half of step, so error of position is at most step / sqrt(2)
+            step_meters = precision * math.sqrt(2.0)
+            self.step = tuple(max(step_meters / meters, MIN_STEP_DEGREES) for meters in meters_per_degree)
+            offsets = max(half_span / step for half_span, step in zip(half_spans, self.step))
+            fitting = [dtype for dtype, limit in QUANTIZED_DTYPES.items() if offsets <= limit]
+            if not fitting:
+                raise ValueError(f"Precision {precision} m is too fine for bounding box of points")
+            self.dtype = fitting[0]
+        self.max_error_meters = math.hypot(*(step * meters / 2.0 for step, meters in zip(self.step, meters_per_degree)))
+
+    def __repr__(self):
+        return 'Quantization({}, max error {:.3f} m)'.format(self.dtype, self.max_error_meters)
+
+    def quantize(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get integer offsets of points along longitude and latitude.
+        """
+        limit = QUANTIZED_DTYPES[self.dtype]
+        x = np.rint((np.asarray(lon, dtype=np.float64) - self.origin[0]) / self.step[0])
+        y = np.rint((np.asarray(lat, dtype=np.float64) - self.origin[1]) / self.step[1])
+        return np.clip(x, -limit, limit).astype(np.int64), np.clip(y, -limit, limit).astype(np.int64)
+
+    def dequantize(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get latitudes and longitudes of offsets.
+        """
+        return self.origin[1] + y * self.step[1], self.origin[0] + x * self.step[0]
+
+    @property
+    def decimals(self) -> int:
+        """
+        Number of decimal digits of degrees, rounding to which keeps error within `max_error_meters`.
+        """
+        return max(0, math.ceil(-math.log10(min(self.step))))
+
+    def round(self, data: PointColumns) -> PointColumns:
+        """
+        Round coordinates to `decimals` digits, so they take less characters in json.
+        Other columns are shared with `data`.
+        >>> data = PointColumns([55.751244, 55.761244], [37.618423, 37.628423])
+        >>> Quantization(BBox.from_arrays(data.lat, data.lon), 10.0).round(data).to_records()
+        [{'lat': 55.7512, 'lon': 37.6184}, {'lat': 55.7612, 'lon': 37.6284}]
+        """
+        return PointColumns(
+            np.round(data.lat, self.decimals), np.round(data.lon, self.decimals),
+            color=data.color, size=data.size,
+            attributes=data.attributes, attribute_names=list(data.attribute_names),
+        )
+
+    def encode(self, data: PointColumns) -> Tuple[Dict[str, Any], np.ndarray]:
+        """
+        Encode positions of points as zigzag varint deltas of offsets, sorted along Morton curve.
+        Returns encoded positions and order of points, other attributes must be permuted with it.
+        >>> data = PointColumns([55.75, 55.70, 55.80], [37.60, 37.55, 37.65])
+        >>> quantization = Quantization(BBox.from_arrays(data.lat, data.lon), 1.0)
+        >>> encoded, order = quantization.encode(data)
+        >>> order.tolist(), encoded['length']
+        ([1, 0, 2], 3)
+        >>> bool(np.abs(Quantization.decode(encoded) - np.column_stack([data.lon, data.lat])[order]).max() < 1e-5)
+        True
+        """
+        x, y = self.quantize(data.lat, data.lon)
+        limit = QUANTIZED_DTYPES[self.dtype]
+        order = np.argsort(morton_codes(x + limit, y + limit), kind='stable')
+        offsets = np.column_stack([x[order], y[order]])
+        deltas = zigzag(np.diff(offsets, axis=0, prepend=0).ravel())
+        chunks = []
+        for start in range(0, len(deltas), ENCODE_CHUNK_SIZE):
+            matrix, mask = varint_matrix(deltas[start:start + ENCODE_CHUNK_SIZE])
+            chunks.append(matrix[mask].tobytes())
+        encoded = {
+            QUANTIZED_KEY: self.dtype,
+            'length': len(data),
+            'origin': list(self.origin),
+            'scale': list(self.step),
+            'value': base64.b64encode(b''.join(chunks)).decode('ascii'),
+        }
+        return encoded, order
+
+    @staticmethod
+    def decode(encoded: Dict[str, Any]) -> np.ndarray:
+        """
+        Inverse of `encode`: positions of points as array of shape (N, 2) of longitudes and latitudes, in encoded order.
+        """
+        deltas = unzigzag(decode_varints(base64.b64decode(encoded['value']))).reshape(-1, 2)
+        offsets = np.cumsum(deltas, axis=0)
+        return np.asarray(encoded['origin']) + offsets * np.asarray(encoded['scale'])
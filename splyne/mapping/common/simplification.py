@@ -0,0 +1,83 @@
+"""
+Vectorized Douglas-Peucker simplification of many polylines at once.
+Polylines are contiguous ranges of coordinate arrays. Instead of recursing into every polyline,
+all segments of all polylines, which are too far from their inner vertices, are split at once on every iteration,
+so every iteration costs time linear in the number of vertices, which are not settled yet.
+"""
+
+import numpy as np
+
+# Number of vertices of polylines, simplified at once
+BATCH_SIZE = 16_384
+
+
+def segment_distances(
+    x: np.ndarray, y: np.ndarray,
+    x0: np.ndarray, y0: np.ndarray,
+    x1: np.ndarray, y1: np.ndarray,
+) -> np.ndarray:
+    """
+    Distance from every point to its segment, inputs are broadcasted against each other.
+    >>> segment_distances(np.array([0.5, 2.0, 4.0]), np.array([1.0, 0.0, 4.0]), 0.0, 0.0, 1.0, 0.0)
+    array([1., 1., 5.])
+    """
+    dx, dy = x1 - x0, y1 - y0
+    squared_length = dx * dx + dy * dy
+    t = ((x - x0) * dx + (y - y0) * dy) / np.where(squared_length > 0, squared_length, 1.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+
+def simplify_polylines(x: np.ndarray, y: np.ndarray, starts: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Get mask of vertices, kept by Douglas-Peucker simplification of every polyline.
+    First and last vertices of polylines are always kept, and every dropped vertex is within `tolerance`
+    of simplified polyline.
+    :param x: abscissas of vertices of all polylines
+    :param y: ordinates of vertices of all polylines
+    :param starts: sorted indices of first vertex of every polyline, which lasts until the next one starts
+    :param tolerance: max distance of dropped vertices, in units of coordinates
+    >>> x = np.array([0.0, 1.0, 2.0, 3.0, 0.0, 1.0, 2.0])
+    >>> y = np.array([0.0, 0.1, -0.1, 0.0, 0.0, 5.0, 0.0])
+    >>> simplify_polylines(x, y, np.array([0, 4]), tolerance=0.5).tolist()
+    [True, False, False, True, True, True, True]
+    """
+    count = len(x)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.append(starts[1:], count)
+    # Polylines are simplified in batches of about `BATCH_SIZE` vertices, so temporary arrays stay in cache
+    batches = np.flatnonzero(np.diff(starts // BATCH_SIZE, prepend=-1))
+    for batch_start, batch_end in zip(batches, np.append(batches[1:], len(starts))):
+        _simplify_batch(x, y, starts[batch_start:batch_end], ends[batch_start:batch_end] - 1, tolerance, keep)
+    return keep
+
+
+def _simplify_batch(x: np.ndarray, y: np.ndarray, first: np.ndarray, last: np.ndarray, tolerance: float, keep: np.ndarray):
+    keep[first] = True
+    keep[last] = True
+    while True:
+        inner = last - first - 1
+        active = inner > 0
+        first, last, inner = first[active], last[active], inner[active]
+        if not len(first):
+            break
+        # Inner vertices of all segments, segment by segment
+        offsets = np.cumsum(inner) - inner
+        segment = np.repeat(np.arange(len(first)), inner)
+        index = np.arange(offsets[-1] + inner[-1]) - offsets[segment] + first[segment] + 1
+        start, end = first[segment], last[segment]
+        distances = segment_distances(x[index], y[index], x[start], y[start], x[end], y[end])
+
+        farthest = np.maximum.reduceat(distances, offsets)
+        split = farthest > tolerance
+        if not split.any():
+            break
+        # First of the farthest vertices of every segment
+        hits = np.flatnonzero(distances == farthest[segment])
+        _, first_hits = np.unique(segment[hits], return_index=True)
+        pivots = index[hits[first_hits]][split]
+        keep[pivots] = True
+        first, last = np.concatenate([first[split], pivots]), np.concatenate([pivots, last[split]])
@@ -0,0 +1,244 @@
+"""
+Point columns, stored on disk and processed chunk by chunk, so inputs larger than memory can be plotted.
+Sources are read twice: coordinates are streamed first to get bounds and zoom level of the map,
+then points are streamed again and decimated at that zoom level, see `ScatterplotLayer.from_source`.
+"""
+
+import abc
+import os
+
+import numpy as np
+
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from splyne.common.base import SplyneObject
+from splyne.common.coloring import ColorGenerator
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+def open_column(column: Union[str, os.PathLike, np.ndarray]) -> np.ndarray:
+    """
+    Memory-map `.npy` file, given by path, arrays are returned as is.
+    """
+    if isinstance(column, (str, os.PathLike)):
+        return np.load(column, mmap_mode='r')
+    return column
+
+
+def chunk_colors(color: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Colors of chunk: arrays of shape (N, 3) or (N, 4) are colors themselves, one-dimensional arrays are keys,
+    colored with `ColorGenerator`, so the same keys get the same colors across chunks.
+    >>> chunk_colors(np.array(['red', 'blue'])).tolist()
+    [[255, 0, 0], [0, 0, 255]]
+    """
+    if color is None or np.ndim(color) != 1:
+        return color
+    return ColorGenerator().get_colors(color)
+
+
+class ColumnSource(SplyneObject):
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Base class of on-disk point columns.
+        :param chunk_size: number of points, processed at once
+        """
+        super().__init__()
+        if chunk_size <= 0:
+            raise ValueError("`chunk_size` must be positive")
+        self.chunk_size = chunk_size
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def coordinate_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Latitudes and longitudes of chunks, without reading other columns.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def chunks(self) -> Iterator[PointColumns]:
+        raise NotImplementedError()
+
+    def bbox(self) -> BBox:
+        """
+        Bounding box of all points, computed chunk by chunk.
+        """
+        bbox = BBox()
+        for lat, lon in self.coordinate_chunks():
+            chunk_bbox = BBox.from_arrays(lat, lon)
+            if chunk_bbox.initialized:
+                bbox = BBox.merge(bbox, chunk_bbox)
+        return bbox
+
+
+class MappedColumns(ColumnSource):
+    """
+    Points, given as memory-mapped arrays, e.g. `np.memmap` or paths of `.npy` files.
+    Chunks are views of the arrays, so only pages of current chunk are read into memory.
+    >>> columns = MappedColumns(np.array([55.7, 55.8, 55.9]), np.array([37.8, 37.9, 38.0]), chunk_size=2)
+    >>> [len(chunk) for chunk in columns.chunks()]
+    [2, 1]
+    >>> columns.bbox()
+    BBox(GeoPoint(55.700000, 37.800000), GeoPoint(55.900000, 38.000000))
+    """
+
+    def __init__(
+        self,
+        lat: Union[str, os.PathLike, np.ndarray],
+        lon: Union[str, os.PathLike, np.ndarray],
+        color: Optional[Union[str, os.PathLike, np.ndarray]] = None,
+        size: Optional[Union[str, os.PathLike, np.ndarray]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        :param lat: latitudes of points
+        :param lon: longitudes of points
+        :param color: optional colors of points, array of shape (N, 3) or (N, 4), or one-dimensional array of keys
+        :param size: optional sizes of points
+        :param chunk_size: number of points, processed at once
+        """
+        super().__init__(chunk_size=chunk_size)
+        self.lat = open_column(lat)
+        self.lon = open_column(lon)
+        self.color = None if color is None else open_column(color)
+        self.size = None if size is None else open_column(size)
+        for name, column in (('lon', self.lon), ('color', self.color), ('size', self.size)):
+            if column is not None and len(column) != len(self.lat):
+                raise ValueError(f"`{name}` and `lat` must be of equal lengths")
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def __repr__(self):
+        return 'MappedColumns({} points)'.format(len(self))
+
+    def _slices(self) -> Iterator[slice]:
+        for start in range(0, len(self), self.chunk_size):
+            yield slice(start, start + self.chunk_size)
+
+    def coordinate_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for part in self._slices():
+            yield self.lat[part], self.lon[part]
+
+    def chunks(self) -> Iterator[PointColumns]:
+        for part in self._slices():
+            yield PointColumns(
+                self.lat[part], self.lon[part],
+                color=None if self.color is None else chunk_colors(self.color[part]),
+                size=None if self.size is None else self.size[part],
+            )
+
+
+class ArrowColumns(ColumnSource):
+    """
+    Points, stored in columns of parquet or Arrow IPC (feather) file. Requires `pyarrow`.
+    Arrow files are memory-mapped and read batch by batch without copying,
+    parquet files are decoded by `chunk_size` rows, reading only needed columns.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        lat: str = 'lat',
+        lon: str = 'lon',
+        color: Optional[str] = None,
+        size: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        :param path: path of file, files with `.parquet` or `.pq` suffix are read as parquet, others as Arrow IPC
+        :param lat: name of latitude column
+        :param lon: name of longitude column
+        :param color: optional name of column of keys to color points by
+        :param size: optional name of column of sizes
+        :param chunk_size: number of rows of parquet file, decoded at once
+        """
+        super().__init__(chunk_size=chunk_size)
+        self.path = os.fspath(path)
+        self.lat = lat
+        self.lon = lon
+        self.color = color
+        self.size = size
+        self.is_parquet = self.path.lower().endswith(PARQUET_SUFFIXES)
+
+    def __len__(self) -> int:
+        if self.is_parquet:
+            return self._parquet_file().metadata.num_rows
+        reader = self._ipc_reader()
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    def __repr__(self):
+        return 'ArrowColumns({!r})'.format(self.path)
+
+    @staticmethod
+    def _import_pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError("`pyarrow` is required to read parquet and Arrow files") from error
+        return pyarrow
+
+    def _parquet_file(self):
+        return self._import_pyarrow().parquet.ParquetFile(self.path)
+
+    def _ipc_reader(self):
+        pyarrow = self._import_pyarrow()
+        return pyarrow.ipc.open_file(pyarrow.memory_map(self.path, 'r'))
+
+    def _batches(self, columns: List[str]) -> Iterator[Any]:
+        # Record batches of memory-mapped Arrow file reference the mapping, so other columns are not read
+        if self.is_parquet:
+            yield from self._parquet_file().iter_batches(batch_size=self.chunk_size, columns=columns)
+            return
+        reader = self._ipc_reader()
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    @staticmethod
+    def _column(batch, name: str) -> np.ndarray:
+        return batch.column(name).to_numpy(zero_copy_only=False)
+
+    def coordinate_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for batch in self._batches([self.lat, self.lon]):
+            yield self._column(batch, self.lat), self._column(batch, self.lon)
+
+    def chunks(self) -> Iterator[PointColumns]:
+        columns = [self.lat, self.lon] + [name for name in (self.color, self.size) if name is not None]
+        for batch in self._batches(list(dict.fromkeys(columns))):
+            yield PointColumns(
+                self._column(batch, self.lat), self._column(batch, self.lon),
+                color=None if self.color is None else chunk_colors(self._column(batch, self.color)),
+                size=None if self.size is None else self._column(batch, self.size),
+            )
+
+    def bbox(self) -> BBox:
+        """
+        Bounding box of all points. For parquet files it is taken from statistics of row groups,
+        without reading the data, if all row groups have them.
+        """
+        if not self.is_parquet:
+            return super().bbox()
+        metadata = self._parquet_file().metadata
+        names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+        bbox = BBox()
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            statistics = [row_group.column(names.index(name)).statistics for name in (self.lat, self.lon)]
+            if any(stats is None or not stats.has_min_max for stats in statistics):
+                return super().bbox()
+            if row_group.num_rows:
+                lat, lon = statistics
+                bbox = BBox.merge(bbox, BBox.from_arrays([lat.min, lat.max], [lon.min, lon.max]))
+        return bbox
@@ -0,0 +1,187 @@
+import math
+
+import haversine
+import numpy as np
+
+from typing import Optional, Tuple
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.common import BBox, GeoPoint
+from splyne.mapping.common.distance import EARTH_RADIUS, distances_to
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """
+    Get BBox of web mercator tile `z/x/y`.
+    >>> tile_bbox(1, 1, 0)
+    BBox(GeoPoint(0.000000, 0.000000), GeoPoint(85.051129, 180.000000))
+    """
+    count = 2 ** z
+    if not (0 <= x < count and 0 <= y < count):
+        raise ValueError(f"Tile `{z}/{x}/{y}` does not exist")
+
+    def tile_lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / count))))
+
+    return BBox(
+        GeoPoint(tile_lat(y + 1), x / count * 360.0 - 180.0),
+        GeoPoint(tile_lat(y), (x + 1) / count * 360.0 - 180.0),
+    )
+
+
+class GridIndex(SplyneObject):
+
+    # Average number of points per cell, when cell size is chosen automatically
+    DEFAULT_POINTS_PER_CELL = 64
+    # Upper bound of number of rows and of columns of cells, so tiny cells do not produce a huge grid
+    MAX_CELLS_PER_AXIS = 1 << 20
+    MIN_CELL_SIZE = 1e-9
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        cell_size: Optional[float] = None,
+    ):
+        """
+        Packed grid index over arrays of coordinates.
+        Points are sorted by their cell once, so each row of cells is a contiguous slice,
+        and a window query costs a binary search per row of cells plus the size of result.
+        :param lat: latitudes of points
+        :param lon: longitudes of points
+        :param cell_size: size of grid cell in degrees, by default chosen to keep about
+            `DEFAULT_POINTS_PER_CELL` points in a cell. Cells are stretched along an axis,
+            if it would get more than `MAX_CELLS_PER_AXIS` cells
+        >>> index = GridIndex(np.linspace(55.0, 56.0, 1000), np.full(1000, 37.6))
+        >>> index.rows_count, index.cols_count
+        (16, 1)
+        """
+        super().__init__()
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        if self.lat.shape != self.lon.shape:
+            raise ValueError("Latitudes and longitudes must be of equal lengths")
+        self.bbox = BBox.from_arrays(self.lat, self.lon)
+        max_cells = GridIndex.MAX_CELLS_PER_AXIS
+        if cell_size is None:
+            cell_size = self._default_cell_size()
+            max_cells = min(max_cells, self._cells_count())
+        if cell_size <= 0:
+            raise ValueError("`cell_size` must be positive")
+        self.cell_size = cell_size
+        # Cells are stretched along an axis, which would get too many of them
+        self.lat_cell_size, self.lon_cell_size = (
+            max(cell_size, span / max_cells, GridIndex.MIN_CELL_SIZE) for span in self._spans()
+        )
+        # Points on the upper border fall into the last cell, so the grid is at most `max_cells` wide
+        self._last_cell = tuple(
+            max(math.ceil(span / size) - 1, 0) for span, size in zip(self._spans(), (self.lat_cell_size, self.lon_cell_size))
+        )
+
+        rows, cols = self._cells(self.lat, self.lon)
+        self.rows_count = int(rows.max()) + 1 if len(rows) else 1
+        self.cols_count = int(cols.max()) + 1 if len(cols) else 1
+        keys = rows * self.cols_count + cols
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        # Rows of cells, which contain points, so queries skip empty rows
+        self.occupied_rows = np.unique(self.keys // self.cols_count)
+
+    def __repr__(self):
+        return 'GridIndex({} points, cell_size={:.6f})'.format(len(self.lat), self.cell_size)
+
+    def _default_cell_size(self) -> float:
+        if not self.bbox.initialized:
+            return 1.0
+        lat_span, lon_span = self._spans()
+        if lat_span > 0 and lon_span > 0:
+            return math.sqrt(lat_span * lon_span / self._cells_count())
+        # Points are on a line along one axis, or are all the same point
+        return max(lat_span, lon_span) / self._cells_count() or 1.0
+
+    def _cells_count(self) -> float:
+        return max(len(self.lat) / GridIndex.DEFAULT_POINTS_PER_CELL, 1.0)
+
+    def _spans(self) -> Tuple[float, float]:
+        if not self.bbox.initialized:
+            return 0.0, 0.0
+        return self.bbox.ur_point.lat - self.bbox.ll_point.lat, self.bbox.ur_point.lon - self.bbox.ll_point.lon
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((np.asarray(lat) - self.bbox.ll_point.lat) / self.lat_cell_size)
+        cols = np.floor((np.asarray(lon) - self.bbox.ll_point.lon) / self.lon_cell_size)
+        last_row, last_col = self._last_cell
+        return np.clip(rows, 0, last_row).astype(np.int64), np.clip(cols, 0, last_col).astype(np.int64)
+
+    def query_bbox(self, bbox: BBox) -> np.ndarray:
+        """
+        Get sorted indices of points inside of `bbox`, borders included.
+        >>> index = GridIndex(np.array([55.7, 55.8, 59.9, 55.75]), np.array([37.6, 37.7, 30.3, 37.65]), cell_size=0.1)
+        >>> index.query_bbox(BBox(GeoPoint(55.6, 37.5), GeoPoint(55.9, 37.8)))
+        array([0, 1, 3])
+        >>> index.query_bbox(BBox(GeoPoint(10.0, 10.0), GeoPoint(11.0, 11.0)))
+        array([], dtype=int64)
+        """
+        if not self.bbox.initialized or not bbox.initialized:
+            return np.array([], dtype=np.int64)
+        (row_low, row_high), (col_low, col_high) = self._cells(
+            np.array([bbox.ll_point.lat, bbox.ur_point.lat]),
+            np.array([bbox.ll_point.lon, bbox.ur_point.lon]),
+        )
+        # Only rows of cells with points are walked, cells are clipped to the grid by `_cells`
+        rows = self.occupied_rows[
+            np.searchsorted(self.occupied_rows, row_low, side='left'):np.searchsorted(self.occupied_rows, row_high, side='right')
+        ]
+        if len(rows) == 0:
+            return np.array([], dtype=np.int64)
+
+        row_keys = rows * self.cols_count
+        starts = np.searchsorted(self.keys, row_keys + col_low, side='left')
+        ends = np.searchsorted(self.keys, row_keys + col_high, side='right')
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (
+            (bbox.ll_point.lat <= lat) & (lat <= bbox.ur_point.lat)
+            & (bbox.ll_point.lon <= lon) & (lon <= bbox.ur_point.lon)
+        )
+        return np.sort(candidates[inside])
+
+    def query_radius(
+        self,
+        lat: float, lon: float,
+        radius: float,
+        k: Optional[int] = None,
+        unit: haversine.Unit = haversine.Unit.KILOMETERS,
+    ) -> np.ndarray:
+        """
+        Get indices of points within `radius` from given point, ordered by distance.
+        If `k` is set, only `k` nearest of them are returned. Queries are not wrapped over antimeridian.
+        >>> index = GridIndex(np.array([55.75, 55.76, 59.93, 55.751]), np.array([37.61, 37.62, 30.33, 37.611]))
+        >>> index.query_radius(55.75, 37.61, radius=5.0)
+        array([0, 3, 1])
+        >>> index.query_radius(55.75, 37.61, radius=5.0, k=1)
+        array([0])
+        """
+        radius_degrees = math.degrees(radius / EARTH_RADIUS[unit])
+        lat_low, lat_high = max(lat - radius_degrees, GeoPoint.MIN_LAT), min(lat + radius_degrees, GeoPoint.MAX_LAT)
+        cos_lat = min(math.cos(math.radians(lat_low)), math.cos(math.radians(lat_high)))
+        if cos_lat <= 0 or radius_degrees / cos_lat >= 180.0:
+            lon_low, lon_high = GeoPoint.MIN_LON, GeoPoint.MAX_LON
+        else:
+            lon_low = max(lon - radius_degrees / cos_lat, GeoPoint.MIN_LON)
+            lon_high = min(lon + radius_degrees / cos_lat, GeoPoint.MAX_LON)
+        candidates = self.query_bbox(BBox(GeoPoint(lat_low, lon_low), GeoPoint(lat_high, lon_high)))
+
+        distances = distances_to(lat, lon, self.lat[candidates], self.lon[candidates], unit=unit)
+        within = np.flatnonzero(distances <= radius)
+        if k is not None and k < len(within):
+            within = within[np.argpartition(distances[within], k - 1)[:k]]
+        return candidates[within[np.argsort(distances[within], kind='stable')]]
+
+    def query_tile(self, z: int, x: int, y: int) -> np.ndarray:
+        """
+        Get sorted indices of points inside of web mercator tile `z/x/y`.
+        >>> GridIndex(np.array([55.7, -33.9]), np.array([37.6, 18.4])).query_tile(1, 1, 0)
+        array([0])
+        """
+        return self.query_bbox(tile_bbox(z, x, y))
@@ -0,0 +1,167 @@
+"""
+Pyramid of web mercator vector tiles for point layers, too large to be embedded into a single html page.
+Tiles are written into `{z}/{x}/{y}.pbf` files of a directory, which is served by a static file server.
+"""
+
+import functools
+import http.server
+import json
+import os
+import threading
+
+import numpy as np
+
+from typing import Any, Dict, Tuple
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.aggregation import MAX_MERCATOR_LAT
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.lod import LevelOfDetail
+from splyne.mapping.common.mvt import DEFAULT_EXTENT, encode_points_tile
+
+METADATA_FILENAME = 'tiles.json'
+TILE_URL_TEMPLATE = '{z}/{x}/{y}.pbf'
+TILES_LAYER_NAME = 'points'
+DEFAULT_PORT = 8000
+
+
+def world_coordinates(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Web mercator coordinates of points, from 0 to 1, with y growing southwards.
+    >>> world_coordinates(np.array([0.0, 85.051129]), np.array([0.0, -180.0]))
+    (array([0.5, 0. ]), array([0.5, 0. ]))
+    """
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return x, np.clip(y, 0.0, 1.0)
+
+
+def tile_coordinates(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    zoom: int,
+    extent: int = DEFAULT_EXTENT,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get tile `x`, `y` of every point at given zoom, and integer coordinates of points inside of their tiles.
+    >>> tile_coordinates(np.array([55.75]), np.array([37.62]), zoom=10)
+    (array([619]), array([320]), array([32]), array([550]))
+    """
+    count = 2 ** zoom
+    world_x, world_y = world_coordinates(lat, lon)
+    tile_x = np.clip(np.floor(world_x * count).astype(np.int64), 0, count - 1)
+    tile_y = np.clip(np.floor(world_y * count).astype(np.int64), 0, count - 1)
+    local_x = np.clip(np.floor((world_x * count - tile_x) * extent).astype(np.int64), 0, extent - 1)
+    local_y = np.clip(np.floor((world_y * count - tile_y) * extent).astype(np.int64), 0, extent - 1)
+    return tile_x, tile_y, local_x, local_y
+
+
+class TilePyramid(SplyneObject):
+
+    DEFAULT_MAX_ZOOM = 16
+    DEFAULT_MAX_POINTS_PER_TILE = 20_000
+
+    def __init__(
+        self,
+        min_zoom: int = 0,
+        max_zoom: int = DEFAULT_MAX_ZOOM,
+        max_points_per_tile: int = DEFAULT_MAX_POINTS_PER_TILE,
+        pixels_per_cell: float = 1.0,
+        extent: int = DEFAULT_EXTENT,
+    ):
+        """
+        Cuts points into pyramid of vector tiles, from `max_zoom` to `min_zoom`.
+        Every tile is decimated with `LevelOfDetail` at its zoom level to at most `max_points_per_tile` points,
+        and coarser zoom level is made of points, kept at finer one, so every level costs less than previous.
+        At `max_zoom` tiles keep all their points, unless they exceed the budget.
+        :param min_zoom: coarsest zoom level
+        :param max_zoom: finest zoom level, map shows its tiles when zoomed further
+        :param max_points_per_tile: budget of points of every tile
+        :param pixels_per_cell: size of decimation cell in screen pixels, see `LevelOfDetail`
+        :param extent: resolution of coordinates inside of tile
+        """
+        super().__init__()
+        if not 0 <= min_zoom <= max_zoom <= 30:
+            raise ValueError("Zoom levels must satisfy 0 <= `min_zoom` <= `max_zoom` <= 30")
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.max_points_per_tile = max_points_per_tile
+        self.extent = extent
+        self.lod = LevelOfDetail(max_points=max_points_per_tile, pixels_per_cell=pixels_per_cell)
+
+    def __repr__(self):
+        return 'TilePyramid(zoom {}-{}, max_points_per_tile={})'.format(
+            self.min_zoom, self.max_zoom, self.max_points_per_tile,
+        )
+
+    def write(self, data: PointColumns, directory: str) -> Dict[str, Any]:
+        """
+        Write tiles of points into `directory`, with metadata in `tiles.json`.
+        Only coordinates, colors and sizes of points are written.
+        :return: metadata of pyramid
+        """
+        os.makedirs(directory, exist_ok=True)
+        data = PointColumns(data.lat, data.lon, color=data.color, size=data.size)
+        bbox = BBox.from_arrays(data.lat, data.lon)
+        tiles_count = 0
+        created_directories = set()
+        for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+            tile_x, tile_y, local_x, local_y = tile_coordinates(data.lat, data.lon, zoom, extent=self.extent)
+            keys = tile_x * (2 ** zoom) + tile_y
+            order = np.argsort(keys, kind='stable')
+            bounds = np.flatnonzero(np.diff(keys[order])) + 1
+            kept = []
+            for indices in np.split(order, bounds) if len(order) else []:
+                if zoom < self.max_zoom or len(indices) > self.max_points_per_tile:
+                    indices = indices[self.lod.select(data.take(indices), zoom)]
+                kept.append(indices)
+
+                tile_directory = os.path.join(directory, str(zoom), str(tile_x[indices[0]]))
+                if tile_directory not in created_directories:
+                    os.makedirs(tile_directory, exist_ok=True)
+                    created_directories.add(tile_directory)
+                tile = encode_points_tile(
+                    local_x[indices], local_y[indices],
+                    color=None if data.color is None else data.color[indices],
+                    size=None if data.size is None else data.size[indices],
+                    layer_name=TILES_LAYER_NAME,
+                    extent=self.extent,
+                )
+                with open(os.path.join(tile_directory, f'{tile_y[indices[0]]}.pbf'), 'wb') as file:
+                    file.write(tile)
+            tiles_count += len(kept)
+            self.logger.info(f'Zoom {zoom}: {len(kept)} tiles of {len(data)} points')
+            if kept:
+                data = data.take(np.sort(np.concatenate(kept)))
+
+        metadata = {
+            'min_zoom': self.min_zoom,
+            'max_zoom': self.max_zoom,
+            'bounds': [bbox.ll_point.lon, bbox.ll_point.lat, bbox.ur_point.lon, bbox.ur_point.lat] if bbox.initialized else None,
+            'tile_url': TILE_URL_TEMPLATE,
+            'layer': TILES_LAYER_NAME,
+            'tiles': tiles_count,
+            'color': data.color is not None,
+            'size': data.size is not None,
+        }
+        with open(os.path.join(directory, METADATA_FILENAME), 'w', encoding='utf-8') as file:
+            json.dump(metadata, file, indent=2)
+        return metadata
+
+
+def read_metadata(directory: str) -> Dict[str, Any]:
+    with open(os.path.join(directory, METADATA_FILENAME), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def serve(directory: str, port: int = DEFAULT_PORT) -> http.server.ThreadingHTTPServer:
+    """
+    Serve files of `directory` over http in background thread, e.g. map page and its tiles.
+    Call `shutdown` of returned server to stop it.
+    """
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('localhost', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
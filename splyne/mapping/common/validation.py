@@ -0,0 +1,194 @@
+"""
+Vectorized validation of coordinate columns.
+Every row is checked at once with numpy masks, instead of raising on the first invalid `GeoPoint`,
+and invalid rows are raised on, dropped, repaired or only reported, depending on policy.
+"""
+
+import numpy as np
+
+from typing import Dict, Iterator, Optional, Tuple
+
+from splyne.common.base import SplyneObject
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import GeoPoint
+from splyne.mapping.common.sources import ColumnSource
+
+
+class ValidationReport(SplyneObject):
+
+    REASONS = ('not_finite', 'lat_out_of_range', 'lon_out_of_range', 'swapped')
+
+    def __init__(
+        self,
+        total: int,
+        counts: Optional[Dict[str, int]] = None,
+        policy: Optional[str] = None,
+    ):
+        """
+        Summary of validation: number of checked rows and number of invalid rows for every reason.
+        Every invalid row is counted once, rows with swapped latitude and longitude are counted as `swapped` only.
+        :param total: number of checked rows
+        :param counts: number of invalid rows for every reason of `REASONS`
+        :param policy: policy, applied to invalid rows
+        """
+        super().__init__()
+        self.total = total
+        self.counts = {reason: 0 for reason in ValidationReport.REASONS}
+        self.counts.update(counts or {})
+        self.policy = policy
+
+    def __repr__(self):
+        reasons = ', '.join(f'{reason}={count}' for reason, count in self.counts.items() if count)
+        return 'ValidationReport({} of {} rows invalid{})'.format(self.rejected, self.total, ': ' + reasons if reasons else '')
+
+    @property
+    def rejected(self) -> int:
+        return sum(self.counts.values())
+
+    def merge(self, other: 'ValidationReport') -> 'ValidationReport':
+        """
+        Summary of both reports, e.g. of consecutive chunks.
+        >>> ValidationReport(10, {'swapped': 1}).merge(ValidationReport(5, {'swapped': 2, 'not_finite': 1}))
+        ValidationReport(4 of 15 rows invalid: not_finite=1, swapped=3)
+        """
+        counts = {reason: self.counts[reason] + other.counts[reason] for reason in ValidationReport.REASONS}
+        return ValidationReport(self.total + other.total, counts, policy=self.policy)
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.counts, total=self.total, rejected=self.rejected)
+
+
+class CoordinateValidator(SplyneObject):
+
+    POLICIES = ('raise', 'drop', 'clip', 'report')
+
+    def __init__(self, policy: str = 'raise', detect_swapped: bool = True):
+        """
+        Bulk validation of latitudes and longitudes: finiteness, ranges and swapped axes.
+        Row is considered swapped, if its latitude is out of range, but both coordinates fit
+        each other's ranges, e.g. `(37.6, 55.7)` in place of `(55.7, 37.6)` is valid, but `(120.0, 55.7)` is swapped.
+        :param policy: what to do with invalid rows. `raise` raises ValueError with summary,
+            `drop` drops them, `clip` swaps back swapped rows, clips out of range coordinates to valid ranges
+            and drops non-finite ones, `report` keeps data as is and only logs the summary,
+            so it is not accepted by map layers
+        :param detect_swapped: distinguish swapped rows from rows with latitude out of range
+        """
+        super().__init__()
+        if policy not in CoordinateValidator.POLICIES:
+            raise ValueError(f"Unknown policy `{policy}`, expected one of {CoordinateValidator.POLICIES}")
+        self.policy = policy
+        self.detect_swapped = detect_swapped
+
+    def __repr__(self):
+        return 'CoordinateValidator(policy={!r})'.format(self.policy)
+
+    @staticmethod
+    def is_valid(lat: np.ndarray, lon: np.ndarray) -> bool:
+        """
+        Check ranges with four reductions and no temporary masks, NaNs make comparisons false.
+        """
+        if len(lat) == 0:
+            return True
+        return bool(
+            lat.min() >= GeoPoint.MIN_LAT and lat.max() <= GeoPoint.MAX_LAT
+            and lon.min() >= GeoPoint.MIN_LON and lon.max() <= GeoPoint.MAX_LON
+        )
+
+    def check(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[Optional[Dict[str, np.ndarray]], ValidationReport]:
+        """
+        Get masks of invalid rows for every reason, or None, if all rows are valid, and summary of them.
+        >>> masks, report = CoordinateValidator().check(np.array([55.7, np.nan, 95.0, 120.0]), np.array([37.6, 37.6, 120.0, 55.7]))
+        >>> report
+        ValidationReport(3 of 4 rows invalid: not_finite=1, lat_out_of_range=1, swapped=1)
+        >>> masks['swapped'].tolist()
+        [False, False, False, True]
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if self.is_valid(lat, lon):
+            return None, ValidationReport(len(lat), policy=self.policy)
+
+        not_finite = ~(np.isfinite(lat) & np.isfinite(lon))
+        lat_bad = ~(np.abs(lat) <= GeoPoint.MAX_LAT) & ~not_finite
+        lon_bad = ~(np.abs(lon) <= GeoPoint.MAX_LON) & ~not_finite
+        swapped = np.zeros(len(lat), dtype=bool)
+        if self.detect_swapped:
+            swapped = lat_bad & (np.abs(lat) <= GeoPoint.MAX_LON) & (np.abs(lon) <= GeoPoint.MAX_LAT)
+        masks = {
+            'not_finite': not_finite,
+            'lat_out_of_range': lat_bad & ~swapped,
+            'lon_out_of_range': lon_bad & ~lat_bad,
+            'swapped': swapped,
+        }
+        counts = {reason: int(np.count_nonzero(mask)) for reason, mask in masks.items()}
+        return masks, ValidationReport(len(lat), counts, policy=self.policy)
+
+    def apply(self, data: PointColumns) -> Tuple[PointColumns, ValidationReport]:
+        """
+        Validate points and apply policy to invalid ones. Input is never modified, repaired columns are copies.
+        >>> data = PointColumns([55.7, 95.0, 37.6, np.nan, 120.0], [37.6, 120.0, 200.0, 37.6, 55.7])
+        >>> fixed, report = CoordinateValidator('clip').apply(data)
+        >>> fixed.lat.tolist(), fixed.lon.tolist()
+        ([55.7, 90.0, 37.6, 55.7], [37.6, 120.0, 180.0, 120.0])
+        >>> CoordinateValidator('drop').apply(data)[0].lat.tolist()
+        [55.7]
+        """
+        masks, report = self.check(data.lat, data.lon)
+        if masks is None:
+            return data, report
+        if self.policy == 'raise':
+            raise ValueError(f"Invalid coordinates: {report}")
+        if self.policy == 'report':
+            self.logger.warning(f'Invalid coordinates: {report}')
+            return data, report
+
+        self.logger.info(f'Invalid coordinates: {report}, policy `{self.policy}`')
+        invalid = masks['not_finite'] | masks['lat_out_of_range'] | masks['lon_out_of_range'] | masks['swapped']
+        if self.policy == 'drop':
+            return data.take(np.flatnonzero(~invalid)), report
+
+        swapped = masks['swapped']
+        lat = np.where(swapped, data.lon, np.clip(data.lat, GeoPoint.MIN_LAT, GeoPoint.MAX_LAT))
+        lon = np.where(swapped, data.lat, np.clip(data.lon, GeoPoint.MIN_LON, GeoPoint.MAX_LON))
+        kept = np.flatnonzero(~masks['not_finite'])
+        fixed = data.take(kept)
+        fixed.lat, fixed.lon = lat[kept], lon[kept]
+        return fixed, report
+
+
+class ValidatedSource(ColumnSource):
+
+    def __init__(self, source: ColumnSource, validator: CoordinateValidator):
+        """
+        On-disk columns, validated chunk by chunk. Both passes over `source` are validated,
+        so `raise` policy fails while bounds are computed, before points are processed.
+        Summary of the last pass over points is kept in `report`.
+        :param source: columns to validate
+        :param validator: validator to apply to every chunk
+        """
+        super().__init__(chunk_size=source.chunk_size)
+        self.source = source
+        self.validator = validator
+        self.report = ValidationReport(0, policy=validator.policy)
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __repr__(self):
+        return 'ValidatedSource({!r}, {!r})'.format(self.source, self.validator)
+
+    def coordinate_chunks(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for lat, lon in self.source.coordinate_chunks():
+            if self.validator.policy == 'report':
+                # Summary is logged once, on the pass over points
+                yield lat, lon
+                continue
+            data, _ = self.validator.apply(PointColumns(lat, lon))
+            yield data.lat, data.lon
+
+    def chunks(self) -> Iterator[PointColumns]:
+        self.report = ValidationReport(0, policy=self.validator.policy)
+        for chunk in self.source.chunks():
+            chunk, report = self.validator.apply(chunk)
+            self.report = self.report.merge(report)
+            yield chunk
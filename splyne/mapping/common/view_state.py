@@ -1,11 +1,16 @@
-import pydeck
 import haversine
 
 from collections.abc import Iterable
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
 
 from splyne.common.base import SplyneObject
 from splyne.mapping.common.common import BBox, GeoPoint
 
+if TYPE_CHECKING:
+    import pydeck
+
 
 class ViewState(SplyneObject):
 
@@ -57,7 +62,9 @@ class ViewState(SplyneObject):
                 return i
         return 0
 
-    def get_view_state(self) -> pydeck.ViewState:
+    def get_view_state(self) -> 'pydeck.ViewState':
+        import pydeck
+
         center = self.bbox.center()
         zoom = self.get_zoom_level()
         return pydeck.ViewState(
@@ -73,3 +80,57 @@ class ViewState(SplyneObject):
     def update_multiple(self, points: Iterable[GeoPoint]):
         for point in points:
             self.update(point)
+
+    def update_with_bbox(self, bbox: BBox):
+        """
+        Update view state to cover `bbox`, e.g. computed separately for part of data.
+        >>> vs = ViewState()
+        >>> vs.update_with_bbox(BBox())
+        >>> vs.bbox.initialized
+        False
+        >>> vs.update_with_bbox(BBox(GeoPoint(55.5, 37.7), GeoPoint(55.8, 37.8)))
+        >>> vs.bbox
+        BBox(GeoPoint(55.500000, 37.700000), GeoPoint(55.800000, 37.800000))
+        """
+        if bbox.initialized:
+            self.bbox = BBox.merge(self.bbox, bbox)
+
+    def update_with_arrays(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        chunk_size: Optional[int] = None,
+    ):
+        """
+        Update view state with points, given as arrays of coordinates.
+        If `chunk_size` is set, arrays are reduced chunk by chunk, which keeps temporary
+        memory bounded for memory-mapped or otherwise lazily loaded arrays.
+        >>> vs = ViewState()
+        >>> vs.update_with_arrays(np.array([55.5, 55.8]), np.array([37.7, 37.8]), chunk_size=1)
+        >>> vs.bbox
+        BBox(GeoPoint(55.500000, 37.700000), GeoPoint(55.800000, 37.800000))
+        >>> vs.get_zoom_level()
+        9
+        """
+        if chunk_size is None:
+            self.bbox.update_with_arrays(lat, lon)
+            return
+        if chunk_size <= 0:
+            raise ValueError("`chunk_size` must be positive")
+        if len(lat) != len(lon):
+            raise ValueError("Latitudes and longitudes must be of equal lengths")
+        self.update_with_chunks(
+            (lat[start:start + chunk_size], lon[start:start + chunk_size])
+            for start in range(0, len(lat), chunk_size)
+        )
+
+    def update_with_chunks(self, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]):
+        """
+        Incrementally update view state with streamed `(lat, lon)` chunks.
+        >>> vs = ViewState()
+        >>> vs.update_with_chunks([([55.5], [37.7]), ([], []), ([55.8], [37.8])])
+        >>> vs.bbox
+        BBox(GeoPoint(55.500000, 37.700000), GeoPoint(55.800000, 37.800000))
+        """
+        for lat, lon in chunks:
+            self.bbox.update_with_arrays(lat, lon)
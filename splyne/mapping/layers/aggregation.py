@@ -0,0 +1,227 @@
+import abc
+
+import numpy as np
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+
+from splyne.common.coloring import ColorGenerator
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.aggregation import (
+    AGGREGATIONS,
+    aggregate_cells,
+    grid_cells,
+    grid_polygons,
+    hexagon_cells,
+    hexagon_polygons,
+    mercator_lat,
+    mercator_y,
+)
+from splyne.mapping.common.columns import PointColumns, as_array
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.lod import pixel_size_degrees
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.base import BaseLayer
+
+if TYPE_CHECKING:
+    import pydeck
+
+
+class AggregationLayer(BaseLayer):
+
+    PYDECK_TYPE = 'PolygonLayer'
+    DEFAULT_CELL_SIZE_PIXELS = 20
+    DEFAULT_COLORMAP = 'viridis'
+    # Precision of coordinates of shipped cells, 1e-6 degree is about 0.1 meter
+    COORDINATES_DECIMALS = 6
+
+    DEFAULT_PARAMS = {
+        'pickable': True,
+        'stroked': False,
+        'filled': True,
+        'opacity': 0.8,
+        'get_polygon': 'polygon',
+        'get_fill_color': 'color',
+    }
+
+    def __init__(
+        self,
+        data: PointColumns,
+        view_state: ViewState,
+        weight: Optional[Union[str, Iterable[float]]] = None,
+        aggregation: str = 'count',
+        cell_size_pixels: Optional[float] = None,
+        colormap: str = DEFAULT_COLORMAP,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ):
+        """
+        Base class of layers, which bin points into cells in python and ship only aggregated cells.
+        Cell size is given in screen pixels at initial zoom level of view state, which covers points of this
+        and all previously added layers.
+        :param data: points to aggregate
+        :param view_state: view state to update with points
+        :param weight: name of field or values to aggregate, by default points are counted
+        :param aggregation: `count` of points, `sum` or `mean` of weights in every cell
+        :param cell_size_pixels: size of cell in pixels at initial zoom level
+        :param colormap: continuous colormap to paint cells with, see `COLORMAPS`
+        :param profiler: optional profiler to record stages of layer in
+        :param kwargs: extra pydeck layer parameters
+        """
+        super().__init__()
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation `{aggregation}`, expected one of {AGGREGATIONS}")
+        if aggregation != 'count' and weight is None:
+            raise ValueError(f"`weight` must be provided for `{aggregation}` aggregation")
+        if cell_size_pixels is None:
+            cell_size_pixels = type(self).DEFAULT_CELL_SIZE_PIXELS
+        if cell_size_pixels <= 0:
+            raise ValueError("`cell_size_pixels` must be positive")
+        self.pydeck_kwargs = dict(type(self).DEFAULT_PARAMS)
+        self.pydeck_kwargs.update(kwargs)
+        self.binary = False
+        self.source = data
+        self.aggregation = aggregation
+        self.colormap = colormap
+        self.profiler = profiler
+        self._payload = None
+
+        if isinstance(weight, str):
+            weight = data.column(weight)
+        elif weight is not None:
+            weight = as_array(weight, dtype=np.float64)
+            if len(weight) != len(data):
+                raise ValueError("Weights and points must be of equal lengths")
+
+        self.bbox = BBox.from_arrays(data.lat, data.lon)
+        view_state.update_with_bbox(self.bbox)
+        self.cell_size = cell_size_pixels * pixel_size_degrees(view_state.get_zoom_level())
+        with self._stage('aggregate', rows=len(data)):
+            codes, self.center_x, self.center_y = self.make_cells(data.lon, mercator_y(data.lat))
+            self.counts, self.values = aggregate_cells(
+                codes, len(self.center_x), weights=weight, aggregation=aggregation,
+            )
+        self.logger.info(f'{len(data)} points are aggregated into {len(self.counts)} cells')
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _stage(self, name: str, rows: Optional[int] = None):
+        return profile_stage(self.profiler, name, layer=self.pydeck_kwargs.get('id'), rows=rows)
+
+    @abc.abstractmethod
+    def make_cells(self, x: np.ndarray, y: np.ndarray):
+        """
+        Bin points, given in mercator projection, into cells, returning code of cell of every point and centers of cells.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def make_polygons(self) -> np.ndarray:
+        """
+        Get corners of every cell as array of shape (N, vertices, 2) of `[lon, lat]`.
+        """
+        raise NotImplementedError()
+
+    def make_records(self) -> List[Dict[str, Any]]:
+        polygons = self.make_polygons().round(type(self).COORDINATES_DECIMALS)
+        colors = ColorGenerator.get_continuous_colors(self.values, colormap=self.colormap)
+        return [
+            {'polygon': polygon, 'count': count, 'value': value, 'color': color}
+            for polygon, count, value, color in zip(
+                polygons.tolist(), self.counts.tolist(), self.values.tolist(), colors.tolist(),
+            )
+        ]
+
+    def payload(self) -> List[Dict[str, Any]]:
+        """
+        Aggregated cells as list of records. Computed once and cached.
+        """
+        if self._payload is None:
+            with self._stage('encode_payload', rows=len(self)):
+                self._payload = self.make_records()
+        return self._payload
+
+    def make_pydeck_layer(self, data_url: Optional[str] = None) -> 'pydeck.Layer':
+        """
+        :param data_url: if set, layer loads data from this url instead of embedding the payload
+        """
+        import pydeck
+
+        data = self.payload() if data_url is None else data_url
+        with self._stage('pydeck_layer'):
+            return pydeck.Layer(type(self).PYDECK_TYPE, data=data, **self.pydeck_kwargs)
+
+
+class GridLayer(AggregationLayer):
+    """
+    Square cells, painted by aggregated value.
+    >>> view_state = ViewState()
+    >>> layer = GridLayer(PointColumns([55.70, 55.70001, 55.8], [37.8, 37.80001, 37.9]), view_state)
+    >>> layer.counts.tolist()
+    [2, 1]
+    >>> len(layer.payload()[0]['polygon'])
+    4
+    """
+
+    def make_cells(self, x: np.ndarray, y: np.ndarray):
+        return grid_cells(x, y, self.cell_size)
+
+    def make_polygons(self) -> np.ndarray:
+        return grid_polygons(self.center_x, self.center_y, self.cell_size)
+
+
+class HexagonLayer(AggregationLayer):
+    """
+    Hexagonal cells, painted by aggregated value. Cell size is circumradius of hexagons.
+    >>> layer = HexagonLayer(PointColumns([55.70, 55.70001, 55.8], [37.8, 37.80001, 37.9]), ViewState(), weight=[1, 2, 3], aggregation='sum')
+    >>> layer.values.tolist()
+    [3.0, 3.0]
+    >>> len(layer.payload()[0]['polygon'])
+    6
+    """
+
+    def make_cells(self, x: np.ndarray, y: np.ndarray):
+        return hexagon_cells(x, y, self.cell_size)
+
+    def make_polygons(self) -> np.ndarray:
+        return hexagon_polygons(self.center_x, self.center_y, self.cell_size)
+
+
+class HeatmapLayer(AggregationLayer):
+    """
+    Density heatmap. Points are aggregated into fine grid, and kernel density of cells, weighted by
+    aggregated value, is rendered by deck.gl, which looks the same as density of raw points.
+    >>> layer = HeatmapLayer(PointColumns([55.70, 55.70001, 55.8], [37.8, 37.80001, 37.9]), ViewState())
+    >>> [record['value'] for record in layer.payload()]
+    [2.0, 1.0]
+    """
+
+    PYDECK_TYPE = 'HeatmapLayer'
+    DEFAULT_CELL_SIZE_PIXELS = 4
+    # Number of colors of colormap to use as color range of heatmap
+    COLOR_RANGE_SIZE = 6
+
+    DEFAULT_PARAMS = {
+        'get_position': ['lon', 'lat'],
+        'get_weight': 'value',
+        'radius_pixels': 30,
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'color_range' not in self.pydeck_kwargs:
+            color_range = ColorGenerator.get_continuous_colors(
+                np.linspace(0.0, 1.0, HeatmapLayer.COLOR_RANGE_SIZE), colormap=self.colormap,
+            )
+            self.pydeck_kwargs['color_range'] = color_range.tolist()
+
+    def make_cells(self, x: np.ndarray, y: np.ndarray):
+        return grid_cells(x, y, self.cell_size)
+
+    def make_records(self) -> List[Dict[str, Any]]:
+        lon = self.center_x.round(HeatmapLayer.COORDINATES_DECIMALS)
+        lat = mercator_lat(self.center_y).round(HeatmapLayer.COORDINATES_DECIMALS)
+        return [
+            {'lon': x, 'lat': y, 'count': count, 'value': value}
+            for x, y, count, value in zip(lon.tolist(), lat.tolist(), self.counts.tolist(), self.values.tolist())
+        ]
@@ -1,9 +1,12 @@
 import abc
 
-import pydeck
+from typing import TYPE_CHECKING
 
 from splyne.common.base import SplyneObject
 
+if TYPE_CHECKING:
+    import pydeck
+
 
 class BaseLayer(SplyneObject):
 
@@ -11,5 +14,5 @@ class BaseLayer(SplyneObject):
         super().__init__()
 
     @abc.abstractmethod
-    def make_pydeck_layer() -> pydeck.Layer:
+    def make_pydeck_layer() -> 'pydeck.Layer':
         raise NotImplementedError()
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from splyne.common.coloring import ColorGenerator
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.aggregation import mercator_y
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.lod import pixel_size_degrees
+from splyne.mapping.common.simplification import simplify_polylines
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.base import BaseLayer
+
+if TYPE_CHECKING:
+    import pydeck
+
+
+def group_tracks(keys: np.ndarray, time: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group points by track, keeping tracks in order of their first points.
+    Returns order of points, grouped by track and sorted by `time` within every track, if it is given,
+    indices of first point of every track in that order, and ids of tracks.
+    >>> order, starts, track_ids = group_tracks(np.array(['b', 'a', 'b', 'a']), time=np.array([2, 1, 1, 2]))
+    >>> order.tolist(), starts.tolist(), track_ids.tolist()
+    ([2, 0, 1, 3], [0, 2], ['b', 'a'])
+    """
+    codes, uniques = pd.factorize(keys)
+    if time is None:
+        order = np.argsort(codes, kind='stable')
+    else:
+        order = np.lexsort((time, codes))
+    starts = np.flatnonzero(np.diff(codes[order], prepend=-1))
+    return order, starts, np.asarray(uniques)
+
+
+class PathLayer(BaseLayer):
+
+    # Max distance between simplified and original paths in screen pixels at initial zoom level
+    DEFAULT_TOLERANCE_PIXELS = 1.0
+    # Precision of coordinates of shipped vertices, 1e-6 degree is about 0.1 meter
+    COORDINATES_DECIMALS = 6
+
+    DEFAULT_PARAMS = {
+        'pickable': True,
+        'width_min_pixels': 2,
+        'get_path': 'path',
+        'get_color': 'color',
+        'get_width': 1,
+    }
+
+    def __init__(
+        self,
+        data: PointColumns,
+        view_state: ViewState,
+        track: str = 'track',
+        time: Optional[str] = None,
+        tolerance_pixels: float = DEFAULT_TOLERANCE_PIXELS,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ):
+        """
+        Paths of tracks, e.g. of vehicles, made of points, grouped by track id.
+        Paths are simplified with Douglas-Peucker algorithm in web mercator coordinates, with tolerance of
+        `tolerance_pixels` screen pixels at initial zoom level of view state, which covers points of this
+        and all previously added layers. So vertices, which do not change rendered paths, are not shipped.
+        Paths are painted by colors of their first points, or by track ids, if points have no colors.
+        :param data: points of tracks
+        :param view_state: view state to update with points
+        :param track: name of field with track ids
+        :param time: optional name of field to order points of every track by, by default points are in order of input
+        :param tolerance_pixels: max distance between simplified and original paths, 0 keeps all vertices
+        :param profiler: optional profiler to record stages of layer in
+        :param kwargs: extra pydeck layer parameters
+        >>> tracks = pd.DataFrame({'track': [1, 1, 1, 2]})
+        >>> data = PointColumns([55.70, 55.71, 55.72, 55.80], [37.60, 37.60001, 37.60, 37.90], attributes=tracks)
+        >>> [len(path) for path in PathLayer(data, ViewState()).paths()]
+        [2, 1]
+        """
+        super().__init__()
+        if tolerance_pixels < 0:
+            raise ValueError("`tolerance_pixels` must not be negative")
+        self.pydeck_kwargs = dict(PathLayer.DEFAULT_PARAMS)
+        self.pydeck_kwargs.update(kwargs)
+        self.binary = False
+        self.profiler = profiler
+        self._payload = None
+
+        self.bbox = BBox.from_arrays(data.lat, data.lon)
+        view_state.update_with_bbox(self.bbox)
+        self.tolerance = tolerance_pixels * pixel_size_degrees(view_state.get_zoom_level())
+        with self._stage('group_tracks', rows=len(data)):
+            order, starts, self.track_ids = group_tracks(
+                data.column(track), time=None if time is None else data.column(time),
+            )
+        with self._stage('simplify', rows=len(data)):
+            lat, lon = data.lat[order], data.lon[order]
+            keep = simplify_polylines(lon, mercator_y(lat), starts, self.tolerance)
+        self.lat, self.lon = lat[keep], lon[keep]
+        # First vertices of tracks are always kept
+        self.starts = np.cumsum(keep)[starts] - 1
+        if data.color is not None:
+            self.colors = np.asarray(data.color)[order[starts]]
+        else:
+            self.colors = ColorGenerator().get_colors(self.track_ids)
+        self.logger.info(f'{len(data)} points of {len(self.track_ids)} tracks are simplified into {len(self.lat)} vertices')
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    @staticmethod
+    def from_chunks(
+        chunks: Iterable[PointColumns],
+        view_state: ViewState,
+        track: str = 'track',
+        time: Optional[str] = None,
+        tolerance_pixels: float = DEFAULT_TOLERANCE_PIXELS,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ) -> 'PathLayer':
+        """
+        Make layer from stream of chunks of points, e.g. pings of fleet, ordered by time across chunks.
+        Every chunk is simplified at zoom level of points seen so far, continuing paths from last kept vertex
+        of every track, so only kept vertices are held in memory. Zoom level can only decrease as more points are seen,
+        and kept vertices are simplified once more at final zoom level, so dropped points of early chunks
+        may be up to twice the tolerance away from final paths.
+        """
+        kept = []
+        anchors = {}
+        for chunk in chunks:
+            with profile_stage(profiler, 'process_chunk', layer=kwargs.get('id'), rows=len(chunk)):
+                view_state.update_with_arrays(chunk.lat, chunk.lon)
+                tolerance = tolerance_pixels * pixel_size_degrees(view_state.get_zoom_level())
+                order, starts, track_ids = group_tracks(
+                    chunk.column(track), time=None if time is None else chunk.column(time),
+                )
+                # Paths continue from the last kept vertex of every track, which is put before its points of the chunk
+                lengths = np.diff(np.append(starts, len(order)))
+                anchored = np.array([key in anchors for key in track_ids.tolist()], dtype=bool)
+                sizes = lengths + anchored
+                path_starts = np.cumsum(sizes) - sizes
+                tracks = np.repeat(np.arange(len(starts)), lengths)
+                index = path_starts[tracks] + anchored[tracks] + np.arange(len(order)) - starts[tracks]
+                lat, lon = np.empty(sizes.sum()), np.empty(sizes.sum())
+                lat[index], lon[index] = chunk.lat[order], chunk.lon[order]
+                for position, key in zip(path_starts[anchored].tolist(), track_ids[anchored].tolist()):
+                    lat[position], lon[position] = anchors[key]
+
+                keep = simplify_polylines(lon, mercator_y(lat), path_starts, tolerance)
+                kept.append(chunk.take(order[keep[index]]))
+                ends = path_starts + sizes - 1
+                anchors.update(zip(track_ids.tolist(), zip(lat[ends].tolist(), lon[ends].tolist())))
+        data = PointColumns.concat(kept)
+        return PathLayer(data, view_state, track=track, tolerance_pixels=tolerance_pixels, profiler=profiler, **kwargs)
+
+    def _stage(self, name: str, rows: Optional[int] = None):
+        return profile_stage(self.profiler, name, layer=self.pydeck_kwargs.get('id'), rows=rows)
+
+    def paths(self) -> List[np.ndarray]:
+        """
+        Vertices of every path as array of shape (N, 2) of `[lon, lat]`.
+        """
+        return np.split(np.column_stack([self.lon, self.lat]), self.starts[1:])
+
+    def payload(self) -> List[Dict[str, Any]]:
+        """
+        Paths as list of records. Computed once and cached.
+        """
+        if self._payload is None:
+            with self._stage('encode_payload', rows=len(self.lat)):
+                vertices = np.column_stack([self.lon, self.lat]).round(PathLayer.COORDINATES_DECIMALS).tolist()
+                ends = np.append(self.starts[1:], len(vertices)).tolist()
+                self._payload = [
+                    {'track': track_id, 'path': vertices[start:end], 'color': color}
+                    for track_id, start, end, color in zip(
+                        self.track_ids.tolist(), self.starts.tolist(), ends, self.colors.tolist(),
+                    )
+                ]
+        return self._payload
+
+    def make_pydeck_layer(self, data_url: Optional[str] = None) -> 'pydeck.Layer':
+        """
+        :param data_url: if set, layer loads data from this url instead of embedding the payload
+        """
+        import pydeck
+
+        data = self.payload() if data_url is None else data_url
+        with self._stage('pydeck_layer'):
+            return pydeck.Layer('PathLayer', data=data, **self.pydeck_kwargs)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from typing import Any, Dict, Optional, Union
+
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.playback import TimeBuckets
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.scatterplot import ScatterplotLayer
+
+
+class PlaybackLayer(ScatterplotLayer):
+
+    # Time between frames, when playback is running, in milliseconds
+    DEFAULT_INTERVAL = 200
+
+    def __init__(
+        self,
+        data: PointColumns,
+        view_state: ViewState,
+        time: str = 'time',
+        bucket: Optional[Union[float, str, pd.Timedelta]] = None,
+        buckets: int = TimeBuckets.DEFAULT_BUCKETS,
+        window: int = 1,
+        interval: int = DEFAULT_INTERVAL,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ):
+        """
+        Scatterplot, replayed in time. Points are sorted by time once and bucketed, see `TimeBuckets`,
+        and are shipped as a single binary payload with offsets of buckets. Page gets a time slider,
+        which shows `window` buckets at once, taking them as views of the payload, without python or copying.
+        All playback layers of map share the slider, so they should be bucketed the same way.
+        :param data: points to replay
+        :param view_state: view state to update with points, it covers all points, not a single frame
+        :param time: name of field with timestamps of points, numbers or datetimes
+        :param bucket: duration of bucket, see `TimeBuckets`
+        :param buckets: number of buckets, if `bucket` is not given
+        :param window: number of consecutive buckets, shown at once, e.g. to keep trails of moving points
+        :param interval: time between frames of playback in milliseconds
+        :param profiler: optional profiler to record stages of layer in
+        :param kwargs: extra pydeck layer parameters
+        >>> data = PointColumns([55.7, 55.8, 55.9], [37.6, 37.7, 37.8], attributes=pd.DataFrame({'time': [3, 1, 2]}))
+        >>> layer = PlaybackLayer(data, ViewState(), bucket=1)
+        >>> layer.frame(0).lat.tolist(), layer.payload()['frames']['offsets']
+        ([55.8], [0, 1, 2, 3])
+        """
+        if window < 1:
+            raise ValueError("`window` must be positive")
+        for name in ('lod', 'precision', 'binary'):
+            if name in kwargs:
+                raise ValueError(f"`{name}` is not supported by playback layer, points are shipped in order of time")
+        with profile_stage(profiler, 'time_buckets', layer=kwargs.get('id'), rows=len(data)):
+            self.buckets = TimeBuckets(data.column(time), bucket=bucket, buckets=buckets)
+            data = data.take(self.buckets.order)
+        self.window = window
+        self.interval = interval
+        super().__init__(data, view_state, binary=True, profiler=profiler, **kwargs)
+
+    def frame(self, index: int) -> PointColumns:
+        """
+        Points of window of buckets, starting at `index`, as shown by the slider.
+        """
+        last = min(index + self.window, len(self.buckets))
+        return self.data.take(np.arange(self.buckets.offsets[index], self.buckets.offsets[last]))
+
+    def payload(self) -> Dict[str, Any]:
+        """
+        Binary attributes of points in order of time, with offsets and labels of buckets.
+        Computed once and cached.
+        """
+        if self._payload is None:
+            payload = super().payload()
+            payload['frames'] = {
+                'offsets': self.buckets.offsets.tolist(),
+                'labels': self.buckets.labels(),
+                'window': self.window,
+                'interval': self.interval,
+            }
+        return self._payload
@@ -1,15 +1,25 @@
-import copy
 import functools
 
-import pydeck
+import haversine
 
-from typing import Iterable, Any
+from typing import TYPE_CHECKING, Iterable, Any, Dict, List, Optional, Union
 
-from splyne.mapping.common.common import GeoPoint
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.cache import LayerCache
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox, GeoPoint
+from splyne.mapping.common.encoding import encode_point_columns
+from splyne.mapping.common.lod import LevelOfDetail, StreamSample
+from splyne.mapping.common.quantization import Quantization
+from splyne.mapping.common.sources import ColumnSource
+from splyne.mapping.common.spatial_index import GridIndex
 from splyne.mapping.common.view_state import ViewState
 from splyne.mapping.layers.base import BaseLayer
 from splyne.utils.transformers import make_pipe
 
+if TYPE_CHECKING:
+    import pydeck
+
 
 class ScatterplotLayer(BaseLayer):
 
@@ -31,23 +41,218 @@ class ScatterplotLayer(BaseLayer):
         'get_color': DEFAULT_COLOR,
     }
 
+    # Accessors, which are replaced by binary attributes in binary mode
+    BINARY_ACCESSORS = {
+        'getPosition': ['get_position'],
+        'getFillColor': ['get_color', 'get_fill_color'],
+        'getRadius': ['get_radius', 'get_size'],
+    }
+
     def __init__(
         self,
-        data: Iterable[Any],
+        data: Union[PointColumns, Iterable[Any]],
         view_state: ViewState,
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        profiler: Optional[Profiler] = None,
+        precision: Optional[Union[float, str]] = None,
         **kwargs,
     ):
+        """
+        :param data: points as `PointColumns` or iterable of dicts
+        :param view_state: view state to update with points
+        :param binary: ship positions, colors and sizes as typed binary buffers instead of json records.
+            Other fields of points are not shipped in this mode.
+        :param lod: optional decimation of points, which can not be distinguished at initial zoom level
+        :param profiler: optional profiler to record stages of layer in. Iterables of dicts are processed lazily,
+            so their transforms are recorded as a part of `encode_payload` stage.
+        :param precision: optional max error of positions in meters, or width of offsets, `int16` or `int32`,
+            see `Quantization`. Positions are quantized relative to bounding box of layer: in binary mode they are
+            shipped as deltas of fixed-point offsets of points, reordered along Morton curve,
+            in json mode coordinates are rounded. Declared error is kept in `max_error_meters`.
+        :param kwargs: extra pydeck layer parameters
+        """
         super().__init__()
-        self.pydeck_kwargs = ScatterplotLayer.DEFAULT_PARAMS
+        self.pydeck_kwargs = dict(ScatterplotLayer.DEFAULT_PARAMS)
         self.pydeck_kwargs.update(kwargs)
+        self.binary = binary
+        self.profiler = profiler
+        self.source = None
+        # Bounding box of points of this layer only, complete once data is consumed
+        self.bbox = BBox()
+        self.quantization = None
+        self._spatial_index = None
+        self._payload = None
+
+        if (binary or lod is not None or precision is not None) and not isinstance(data, PointColumns):
+            with self._stage('records_to_columns'):
+                data = PointColumns.from_records(data)
+        if isinstance(data, PointColumns):
+            self._update_kwargs_from_columns(data)
+            with self._stage('view_state', rows=len(data)):
+                self._update_view_state_from_columns(data, view_state)
+            if precision is not None and self.bbox.initialized:
+                self.quantization = Quantization(self.bbox, precision)
+            self.source = data
+            if lod is not None:
+                with self._stage('level_of_detail', rows=len(data)):
+                    data = lod.apply(data, view_state.get_zoom_level())
+            self.data = data
+            return
 
         data_tranformer = make_pipe(
-            copy.deepcopy,
             functools.partial(self._update_view_state, view_state=view_state),
             self._update_kwargs,
         )
         self.data = data_tranformer(data)
 
+    @staticmethod
+    def from_chunks(
+        chunks: Iterable[Union[PointColumns, Iterable[Any]]],
+        view_state: ViewState,
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ) -> 'ScatterplotLayer':
+        """
+        Make layer from stream of chunks, without materializing all of them at once.
+        View state is updated chunk by chunk, and if `lod` is set, points are decimated after every chunk
+        at zoom level of data seen so far, so only decimated points are kept in memory.
+        Zoom level can only decrease as more points are seen, and final decimation is made at final zoom level.
+        `sample` method keeps a uniform sample of the whole stream, see `StreamSample`.
+        Without `lod` all points are kept, since all of them are shipped, so memory grows with their number.
+        In binary mode only coordinates, colors and sizes are shipped, so other fields of chunks are not kept.
+        Note, that spatial index of such layer contains only points, kept after decimation,
+        while `bbox` covers all of them.
+        """
+        kept = []
+        bbox = BBox()
+        sample = StreamSample(lod.max_points, seed=lod.seed) if lod is not None and lod.method == 'sample' else None
+        for chunk in chunks:
+            if not isinstance(chunk, PointColumns):
+                chunk = PointColumns.from_records(chunk)
+            if binary:
+                chunk = PointColumns(chunk.lat, chunk.lon, color=chunk.color, size=chunk.size)
+            with profile_stage(profiler, 'process_chunk', layer=kwargs.get('id'), rows=len(chunk)):
+                view_state.update_with_arrays(chunk.lat, chunk.lon)
+                bbox.update_with_arrays(chunk.lat, chunk.lon)
+                if sample is not None:
+                    sample.update(chunk)
+                elif lod is None:
+                    kept.append(chunk)
+                else:
+                    kept = [lod.apply(PointColumns.concat(kept + [chunk]), view_state.get_zoom_level())]
+        if sample is not None and sample.data is not None:
+            kept = [sample.data]
+        layer = ScatterplotLayer(PointColumns.concat(kept), view_state, binary=binary, lod=lod, profiler=profiler, **kwargs)
+        # Bounding box covers all streamed points, not only kept ones
+        layer.bbox = bbox
+        return layer
+
+    @staticmethod
+    def from_source(
+        source: ColumnSource,
+        view_state: ViewState,
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ) -> 'ScatterplotLayer':
+        """
+        Make layer from on-disk columns, reading them twice chunk by chunk.
+        Bounds of points are streamed first, so `lod` decimates every chunk at final zoom level,
+        and only points, kept after decimation, are loaded into memory.
+        Without `lod` all points are loaded, since all of them are shipped.
+        """
+        with profile_stage(profiler, 'source_bbox', layer=kwargs.get('id'), rows=len(source)):
+            view_state.update_with_bbox(source.bbox())
+        return ScatterplotLayer.from_chunks(
+            source.chunks(), view_state, binary=binary, lod=lod, profiler=profiler, **kwargs
+        )
+
+    @staticmethod
+    def cached(
+        cache: LayerCache,
+        data: Union[PointColumns, Iterable[Any]],
+        view_state: ViewState,
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        profiler: Optional[Profiler] = None,
+        precision: Optional[Union[float, str]] = None,
+        **kwargs,
+    ) -> 'ScatterplotLayer':
+        """
+        Make layer, loading encoded payload and bounding box from `cache`, if the same data was already
+        processed with the same parameters. Otherwise layer is made as usual and stored in `cache`.
+        Layer id is not a part of the key, so cached payload is shared by layers with different ids.
+        """
+        if (binary or lod is not None or precision is not None) and not isinstance(data, PointColumns):
+            data = PointColumns.from_records(data)
+        elif not isinstance(data, PointColumns):
+            data = list(data)
+        params = {
+            'binary': binary,
+            'precision': precision,
+            'kwargs': {key: value for key, value in kwargs.items() if key != 'id'},
+        }
+        if lod is not None:
+            # Decimation depends on zoom level, which covers points of all layers
+            lod_view_state = ViewState()
+            lod_view_state.update_with_bbox(view_state.bbox)
+            lod_view_state.update_with_arrays(data.lat, data.lon)
+            params['lod'] = dict(vars(lod), zoom=lod_view_state.get_zoom_level())
+        with profile_stage(profiler, 'cache_lookup', layer=kwargs.get('id'), rows=len(data)):
+            key = cache.make_key(data, params)
+            entry = cache.get(key)
+        if entry is None:
+            layer = ScatterplotLayer(data, view_state, binary=binary, lod=lod, profiler=profiler, precision=precision, **kwargs)
+            payload = layer.payload()
+            pydeck_kwargs = {key: value for key, value in layer.pydeck_kwargs.items() if key != 'id'}
+            with layer._stage('cache_store'):
+                cache.put(key, payload, layer.bbox, pydeck_kwargs)
+            return layer
+
+        pydeck_kwargs = dict(entry['kwargs'])
+        if 'id' in kwargs:
+            pydeck_kwargs['id'] = kwargs['id']
+        layer = ScatterplotLayer.from_payload(
+            entry['payload'], entry['bbox'], pydeck_kwargs,
+            source=data if isinstance(data, PointColumns) else None, binary=binary, profiler=profiler, precision=precision,
+        )
+        view_state.update_with_bbox(layer.bbox)
+        return layer
+
+    @staticmethod
+    def from_payload(
+        payload: Union[List[Dict[str, Any]], Dict[str, Any]],
+        bbox: BBox,
+        pydeck_kwargs: Dict[str, Any],
+        source: Optional[PointColumns] = None,
+        binary: bool = False,
+        profiler: Optional[Profiler] = None,
+        precision: Optional[Union[float, str]] = None,
+    ) -> 'ScatterplotLayer':
+        """
+        Make layer of already encoded payload, e.g. loaded from cache or encoded in another process.
+        :param payload: encoded data of layer, see `payload`
+        :param bbox: bounding box of points of layer
+        :param pydeck_kwargs: parameters of pydeck layer
+        :param source: points of layer, used by spatial queries
+        """
+        layer = ScatterplotLayer(PointColumns([], []), ViewState(), binary=binary, profiler=profiler)
+        layer.pydeck_kwargs = dict(pydeck_kwargs)
+        layer.bbox = bbox
+        if precision is not None and layer.bbox.initialized:
+            layer.quantization = Quantization(layer.bbox, precision)
+        layer.source = source
+        layer.data = None
+        layer._payload = payload
+        return layer
+
+    def _stage(self, name: str, rows: Optional[int] = None):
+        return profile_stage(self.profiler, name, layer=self.pydeck_kwargs.get('id'), rows=rows)
+
     def _update_kwargs(self, item: Any) -> Any:
         if 'color' in item:
             self.pydeck_kwargs['get_color'] = 'color'
@@ -55,13 +260,102 @@ class ScatterplotLayer(BaseLayer):
             self.pydeck_kwargs['get_size'] = 'size'
         return item
 
+    def _update_kwargs_from_columns(self, data: PointColumns):
+        if data.color is not None:
+            self.pydeck_kwargs['get_color'] = 'color'
+        if data.size is not None:
+            self.pydeck_kwargs['get_size'] = 'size'
+
     def _update_view_state(self, item: Any, view_state: ViewState) -> Any:
-        view_state.update(GeoPoint(item['lat'], item['lon']))
+        point = GeoPoint(item['lat'], item['lon'])
+        self.bbox.update_with_point(point)
+        view_state.update(point)
         return item
 
     def _update_view_state_from_iter(self, data: Iterable[Any], view_state: ViewState):
         for item in data:
             yield self._update_view_state(item, view_state)
 
-    def make_pydeck_layer(self) -> pydeck.Layer:
-        return pydeck.Layer("ScatterplotLayer", data=list(self.data), **self.pydeck_kwargs)
+    def _update_view_state_from_columns(self, data: PointColumns, view_state: ViewState):
+        self.bbox = BBox.from_arrays(data.lat, data.lon)
+        view_state.update_with_bbox(self.bbox)
+
+    @property
+    def max_error_meters(self) -> Optional[float]:
+        """
+        Max distance between every point and its shipped position, if positions are quantized.
+        """
+        return None if self.quantization is None else self.quantization.max_error_meters
+
+    @property
+    def spatial_index(self) -> GridIndex:
+        """
+        Spatial index over all points of layer, before level of detail is applied.
+        Built once, on first access. Points of row-based layers are converted to columns of their payload,
+        the same way they are consumed for shipping.
+        """
+        if self._spatial_index is None:
+            if self.source is None:
+                records = self.payload()
+                self.source = PointColumns.from_records(records) if records else PointColumns([], [])
+            self._spatial_index = GridIndex(self.source.lat, self.source.lon)
+        return self._spatial_index
+
+    def query_bbox(self, bbox: BBox) -> PointColumns:
+        indices = self.spatial_index.query_bbox(bbox)
+        return self.source.take(indices)
+
+    def query_radius(
+        self,
+        lat: float, lon: float,
+        radius: float,
+        k: Optional[int] = None,
+        unit: haversine.Unit = haversine.Unit.KILOMETERS,
+    ) -> PointColumns:
+        indices = self.spatial_index.query_radius(lat, lon, radius, k=k, unit=unit)
+        return self.source.take(indices)
+
+    def query_tile(self, z: int, x: int, y: int) -> PointColumns:
+        indices = self.spatial_index.query_tile(z, x, y)
+        return self.source.take(indices)
+
+    def payload(self) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Encoded data of layer: list of records, or binary attributes in binary mode.
+        Computed once and cached.
+        """
+        if self._payload is None:
+            with self._stage('encode_payload', rows=len(self.data) if isinstance(self.data, PointColumns) else None):
+                if self.binary:
+                    self._payload = encode_point_columns(self.data, quantization=self.quantization)
+                elif self.quantization is not None:
+                    self._payload = self.quantization.round(self.data).to_records()
+                elif isinstance(self.data, PointColumns):
+                    self._payload = self.data.to_records()
+                else:
+                    self._payload = list(self.data)
+        return self._payload
+
+    def layer_kwargs(self) -> Dict[str, Any]:
+        """
+        Parameters of pydeck layer, except data.
+        """
+        payload = self.payload()
+        if not self.binary:
+            return dict(self.pydeck_kwargs)
+        replaced = {
+            name
+            for attribute, names in ScatterplotLayer.BINARY_ACCESSORS.items() if attribute in payload['attributes']
+            for name in names
+        }
+        return {key: value for key, value in self.pydeck_kwargs.items() if key not in replaced}
+
+    def make_pydeck_layer(self, data_url: Optional[str] = None) -> 'pydeck.Layer':
+        """
+        :param data_url: if set, layer loads data from this url instead of embedding the payload
+        """
+        import pydeck
+
+        data = self.payload() if data_url is None else data_url
+        with self._stage('pydeck_layer'):
+            return pydeck.Layer("ScatterplotLayer", data=data, **self.layer_kwargs())
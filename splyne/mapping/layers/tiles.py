@@ -0,0 +1,72 @@
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from splyne.mapping.common.common import BBox, GeoPoint
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.base import BaseLayer
+
+if TYPE_CHECKING:
+    import pydeck
+
+
+class VectorTileLayer(BaseLayer):
+
+    DEFAULT_RADIUS = 3
+    DEFAULT_COLOR = [50, 20, 200]
+
+    DEFAULT_PARAMS = {
+        'pickable': True,
+        'stroked': False,
+        'filled': True,
+        'point_radius_units': 'pixels',
+        'get_point_radius': DEFAULT_RADIUS,
+        'get_fill_color': DEFAULT_COLOR,
+    }
+
+    def __init__(
+        self,
+        url: str,
+        metadata: Dict[str, Any],
+        view_state: ViewState,
+        **kwargs,
+    ):
+        """
+        Layer, which loads vector tiles of `TilePyramid` from static file server, as the map is moved and zoomed.
+        Colors and sizes of points are read from properties of tile features.
+        :param url: template of tile urls with `{z}`, `{x}` and `{y}` placeholders, relative to html page
+        :param metadata: metadata of pyramid, returned by `TilePyramid.write`
+        :param view_state: view state to update with bounds of tiles
+        :param kwargs: extra pydeck layer parameters
+        >>> metadata = {'min_zoom': 0, 'max_zoom': 10, 'bounds': [37.5, 55.6, 37.7, 55.8], 'color': True, 'size': False}
+        >>> layer = VectorTileLayer('tiles/{z}/{x}/{y}.pbf', metadata, ViewState())
+        >>> layer.pydeck_kwargs['get_fill_color']
+        '@@=[properties.r, properties.g, properties.b]'
+        """
+        super().__init__()
+        self.url = url
+        self.metadata = metadata
+        self.binary = False
+        self.pydeck_kwargs = dict(VectorTileLayer.DEFAULT_PARAMS)
+        self.pydeck_kwargs.update(min_zoom=metadata['min_zoom'], max_zoom=metadata['max_zoom'])
+        if metadata['color']:
+            self.pydeck_kwargs['get_fill_color'] = '@@=[properties.r, properties.g, properties.b]'
+        if metadata['size']:
+            self.pydeck_kwargs['get_point_radius'] = '@@=properties.size'
+        self.bbox = BBox()
+        if metadata['bounds'] is not None:
+            west, south, east, north = metadata['bounds']
+            self.bbox = BBox(GeoPoint(south, west), GeoPoint(north, east))
+            # Tiles outside of bounds are not requested
+            self.pydeck_kwargs['extent'] = metadata['bounds']
+        self.pydeck_kwargs.update(kwargs)
+        view_state.update_with_bbox(self.bbox)
+
+    def payload(self) -> str:
+        return self.url
+
+    def make_pydeck_layer(self, data_url: Optional[str] = None) -> 'pydeck.Layer':
+        """
+        Tiles are always loaded from `url`, so `data_url` is ignored.
+        """
+        import pydeck
+
+        return pydeck.Layer('MVTLayer', data=self.url, **self.pydeck_kwargs)
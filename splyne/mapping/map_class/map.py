@@ -1,19 +1,120 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import itertools
+import json
+import os
+
+import haversine
 import pandas as pd
-import pydeck
 
-from typing import Dict, Any, Union, Iterable
+from copy import deepcopy
+from typing import IO, TYPE_CHECKING, AsyncIterator, Callable, Dict, Any, Iterator, List, Optional, Tuple, Union, Iterable
 
 from splyne.common.base import SplyneObject
+from splyne.common.profiling import Profiler, profile_stage
+from splyne.mapping.common.cache import LayerCache
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.encoding import inject_binary_decoder
+from splyne.mapping.common.lod import LevelOfDetail
+from splyne.mapping.common.playback import TimeBuckets, inject_playback_controls
+from splyne.mapping.common.sources import ColumnSource
+from splyne.mapping.common.tiles import TilePyramid, read_metadata
+from splyne.mapping.common.validation import CoordinateValidator, ValidatedSource
 from splyne.mapping.common.view_state import ViewState
 from splyne.mapping.layers import scatterplot
+from splyne.mapping.layers.aggregation import GridLayer, HeatmapLayer, HexagonLayer
+from splyne.mapping.layers.base import BaseLayer
+from splyne.mapping.layers.path import PathLayer
+from splyne.mapping.layers.playback import PlaybackLayer
+from splyne.mapping.layers.tiles import VectorTileLayer
+
+if TYPE_CHECKING:
+    import pydeck
+
+
+def _encode_scatterplot_layer(
+    data: PointColumns,
+    bbox: BBox,
+    kwargs: Dict[str, Any],
+) -> Tuple[Union[List[Dict[str, Any]], Dict[str, Any]], Dict[str, Any], BBox]:
+    """
+    Build layer in a worker and return only its encoded payload, pydeck parameters and bounding box,
+    so neither points, nor pydeck layer are sent back.
+    """
+    view_state = ViewState()
+    view_state.update_with_bbox(bbox)
+    kwargs = dict(kwargs)
+    cache = kwargs.pop('cache', None)
+    if cache is not None:
+        layer = scatterplot.ScatterplotLayer.cached(cache, data, view_state, **kwargs)
+    else:
+        layer = scatterplot.ScatterplotLayer(data, view_state, **kwargs)
+    return layer.payload(), layer.pydeck_kwargs, layer.bbox
 
 
 class Map(SplyneObject):
 
-    def __init__(self):
+    HTML_FILENAME = '.splyne-tmp.html'
+    EXPORT_HTML_FILENAME = 'index.html'
+    EXPORT_LAYERS_DIRECTORY = 'layers'
+
+    # Placeholder of layers in deck json, which is replaced with already encoded layers
+    LAYERS_PLACEHOLDER = '@@splyne-layers'
+
+    def __init__(self, profiler: Optional[Profiler] = None):
+        """
+        :param profiler: optional profiler to record stages of map building in, see also `profile`
+        """
         super().__init__()
+        self.profiler = profiler
         self.viewState = ViewState()
+        # pydeck layers, splyne layers they are made of and their ids are aligned with each other
         self.layers = []
+        self.splyne_layers = []
+        self.layer_ids = []
+        self.has_binary_layers = False
+        self._layers_created = 0
+        self._version_counter = itertools.count()
+        # Version of every layer, changed on every update. Used to find layers, changed since last diff or export
+        self._versions = {}
+        self._diffed_versions = {}
+        self._diffed_view_state = None
+        self._exported_versions = {}
+        self._export_fragments = {}
+        self._exported_html = None
+        # Summaries of coordinates validation of layers, added with `validate`
+        self.validation_reports = {}
+
+    @property
+    def scatterplot_layers(self) -> List[scatterplot.ScatterplotLayer]:
+        return [layer for layer in self.splyne_layers if isinstance(layer, scatterplot.ScatterplotLayer)]
+
+    @contextlib.contextmanager
+    def profile(
+        self,
+        trace_memory: bool = False,
+        callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Iterator[Profiler]:
+        """
+        Record wall time, rows count and allocated memory of every stage of every layer,
+        added, displayed or exported inside of `with` block.
+        >>> map = Map()
+        >>> with map.profile() as profiler:
+        ...     _ = map.add_scatterplot_layer(PointColumns([55.7, 55.8], [37.8, 37.9]))
+        >>> [record['stage'] for record in profiler.records]
+        ['layer_data', 'view_state', 'encode_payload', 'pydeck_layer']
+        """
+        profiler = Profiler(trace_memory=trace_memory, callback=callback)
+        previous, self.profiler = self.profiler, profiler
+        try:
+            yield profiler
+        finally:
+            self.profiler = previous
+
+    def _stage(self, name: str, layer: Optional[str] = None, rows: Optional[int] = None):
+        return profile_stage(self.profiler, name, layer=layer, rows=rows)
 
     def make_iterable_of_dicts(
         self,
@@ -29,21 +130,641 @@ class Map(SplyneObject):
                 f'got `{type(data)}`, `{data}`'
             )
 
+    def make_layer_data(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+    ) -> Union[PointColumns, Iterable[Dict[str, Any]]]:
+        """
+        Keep columnar inputs columnar, fall back to iterable of dicts for everything else.
+        """
+        if isinstance(data, PointColumns):
+            return data
+        elif isinstance(data, pd.DataFrame):
+            return PointColumns.from_dataframe(data)
+        return self.make_iterable_of_dicts(data)
+
     def add_scatterplot_layer(
         self,
-        data: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+        data: Union[pd.DataFrame, PointColumns, ColumnSource, Iterable[Dict[str, Any]]],
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        copy: bool = False,
+        cache: Optional[LayerCache] = None,
+        validate: Optional[Union[str, CoordinateValidator]] = None,
         **kwargs,
-    ):
-        data = self.make_iterable_of_dicts(data)
-        layer = scatterplot.ScatterplotLayer(
-            data, self.viewState, **kwargs
+    ) -> scatterplot.ScatterplotLayer:
+        """
+        Add scatterplot layer to the map.
+        With `binary=True` points are shipped as typed binary buffers,
+        with `lod` points are decimated to initial zoom level, see `ScatterplotLayer`.
+        Layer references columns of input data without modifying it,
+        with `copy=True` it keeps own copy instead, so input may be modified later.
+        On-disk columns, e.g. `MappedColumns` or `ArrowColumns`, are processed chunk by chunk,
+        see `ScatterplotLayer.from_source`.
+        With `cache`, encoded layer is loaded from it, if the same data was already added with the same parameters,
+        see `ScatterplotLayer.cached`.
+        With `validate`, coordinates are validated at once with given `CoordinateValidator` or its policy,
+        e.g. `drop`, and summary of invalid rows is kept in `validation_reports` by layer id.
+        Policy `report` is rejected, since it keeps invalid rows.
+        With `precision`, e.g. `precision=1.0` meter, positions are quantized, see `ScatterplotLayer`.
+        """
+        kwargs.setdefault('id', self._next_layer_id())
+        return self._add_layer(self._make_scatterplot_layer(
+            data, binary=binary, lod=lod, copy=copy, cache=cache, validate=validate, **kwargs
+        ))
+
+    def update_scatterplot_layer(
+        self,
+        layer_id: str,
+        data: Union[pd.DataFrame, PointColumns, ColumnSource, Iterable[Dict[str, Any]]],
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        copy: bool = False,
+        cache: Optional[LayerCache] = None,
+        validate: Optional[Union[str, CoordinateValidator]] = None,
+        **kwargs,
+    ) -> scatterplot.ScatterplotLayer:
+        """
+        Replace data and parameters of existing scatterplot layer, marking it as changed.
+        Only changed layers are encoded again by `diff` and `export`.
+        View state is rebuilt from other layers and the new data, so it does not cover replaced data.
+        """
+        index = self._layer_index(layer_id)
+        previous_bbox = self.viewState.bbox
+        self._rebuild_view_state(exclude=index)
+        try:
+            layer = self._make_scatterplot_layer(
+                data, binary=binary, lod=lod, copy=copy, cache=cache, validate=validate, id=layer_id, **kwargs
+            )
+        except Exception:
+            self.viewState.bbox = previous_bbox
+            raise
+        self.layers[index] = layer.make_pydeck_layer()
+        self.splyne_layers[index] = layer
+        self.has_binary_layers = any(layer.binary for layer in self.splyne_layers)
+        self._versions[layer_id] = next(self._version_counter)
+        return layer
+
+    def remove_layer(self, layer_id: str):
+        index = self._layer_index(layer_id)
+        for layers in (self.layers, self.splyne_layers, self.layer_ids):
+            layers.pop(index)
+        self.has_binary_layers = any(layer.binary for layer in self.splyne_layers)
+        self._versions.pop(layer_id)
+        self.validation_reports.pop(layer_id, None)
+        self._rebuild_view_state()
+
+    def _rebuild_view_state(self, exclude: Optional[int] = None):
+        """
+        Make view state cover bounding boxes of layers, except for layer at index `exclude`.
+        View state is changed in place, since lazy layers update it, when their data is consumed.
+        """
+        self.viewState.bbox = BBox()
+        for index, layer in enumerate(self.splyne_layers):
+            if index != exclude:
+                self.viewState.update_with_bbox(layer.bbox)
+
+    def _make_scatterplot_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, ColumnSource, Iterable[Dict[str, Any]]],
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        copy: bool = False,
+        cache: Optional[LayerCache] = None,
+        validate: Optional[Union[str, CoordinateValidator]] = None,
+        **kwargs,
+    ) -> scatterplot.ScatterplotLayer:
+        layer_id = kwargs.get('id')
+        self.validation_reports.pop(layer_id, None)
+        if isinstance(data, ColumnSource):
+            if cache is not None:
+                raise ValueError("Cache is not supported for on-disk columns")
+            if validate is not None:
+                data = ValidatedSource(data, self._make_validator(validate))
+            # Chunks are loaded into memory anyway, so `copy` is not needed
+            layer = scatterplot.ScatterplotLayer.from_source(
+                data, self.viewState, binary=binary, lod=lod, profiler=self.profiler, **kwargs
+            )
+            if validate is not None:
+                self.validation_reports[layer_id] = data.report
+            return layer
+        with self._stage('layer_data', layer=layer_id):
+            data = self.make_layer_data(data)
+            if copy:
+                data = data.copy() if isinstance(data, PointColumns) else deepcopy(data)
+        if validate is not None:
+            data = self._validate(data, self._make_validator(validate), layer_id)
+        if cache is not None:
+            return scatterplot.ScatterplotLayer.cached(
+                cache, data, self.viewState, binary=binary, lod=lod, profiler=self.profiler, **kwargs
+            )
+        return scatterplot.ScatterplotLayer(
+            data, self.viewState, binary=binary, lod=lod, profiler=self.profiler, **kwargs
+        )
+
+    @staticmethod
+    def _make_validator(validate: Union[str, CoordinateValidator]) -> CoordinateValidator:
+        validator = validate if isinstance(validate, CoordinateValidator) else CoordinateValidator(policy=validate)
+        if validator.policy == 'report':
+            raise ValueError("Policy `report` keeps invalid rows, which layers can not be made of, "
+                             "use `raise`, `drop` or `clip` policy")
+        return validator
+
+    def _validate(
+        self,
+        data: Union[PointColumns, Iterable[Dict[str, Any]]],
+        validator: CoordinateValidator,
+        layer_id: str,
+    ) -> PointColumns:
+        """
+        Validate coordinates of layer data, merging summary into report of the layer.
+        Iterables of dicts are converted to `PointColumns` first.
+        """
+        if not isinstance(data, PointColumns):
+            data = PointColumns.from_records(data)
+        with self._stage('validate', layer=layer_id, rows=len(data)):
+            data, report = validator.apply(data)
+        previous = self.validation_reports.get(layer_id)
+        self.validation_reports[layer_id] = report if previous is None else previous.merge(report)
+        return data
+
+    def _next_layer_id(self) -> str:
+        self._layers_created += 1
+        return f'layer-{self._layers_created}'
+
+    def _layer_index(self, layer_id: str) -> int:
+        if layer_id not in self._versions:
+            raise ValueError(f"Layer `{layer_id}` does not exist")
+        return self.layer_ids.index(layer_id)
+
+    def add_scatterplot_layer_from_chunks(
+        self,
+        chunks: Iterable[Union[pd.DataFrame, PointColumns]],
+        binary: bool = False,
+        lod: Optional[LevelOfDetail] = None,
+        validate: Optional[Union[str, CoordinateValidator]] = None,
+        **kwargs,
+    ) -> scatterplot.ScatterplotLayer:
+        """
+        Add scatterplot layer, made from stream of DataFrames, `PointColumns` or iterables of dicts,
+        processing them chunk by chunk, see `ScatterplotLayer.from_chunks`.
+        With `validate`, every chunk is validated, see `add_scatterplot_layer`.
+        """
+        kwargs.setdefault('id', self._next_layer_id())
+        chunks = (self.make_layer_data(chunk) for chunk in chunks)
+        if validate is not None:
+            validator = self._make_validator(validate)
+            chunks = (self._validate(chunk, validator, kwargs['id']) for chunk in chunks)
+        layer = scatterplot.ScatterplotLayer.from_chunks(
+            chunks,
+            self.viewState, binary=binary, lod=lod, profiler=self.profiler, **kwargs
+        )
+        return self._add_layer(layer)
+
+    def add_scatterplot_layers(
+        self,
+        layers: Iterable[Dict[str, Any]],
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> List[scatterplot.ScatterplotLayer]:
+        """
+        Add several scatterplot layers, building and encoding them concurrently.
+        Every item of `layers` is a dict of `add_scatterplot_layer` arguments, e.g. `{'data': df, 'binary': True}`.
+        Iterables of dicts are converted to `PointColumns` first.
+        Bounding boxes of layers are computed first in this process, so every layer is built with the same view state,
+        as if layers were added one by one, and the result is identical to serial path.
+        Workers return only encoded payloads, and pydeck layers are made here.
+        :param layers: arguments of every layer
+        :param executor: executor to run on, by default process pool is used.
+            Stages inside of workers are not profiled, only total time of building layers is recorded.
+        """
+        specs = []
+        for spec in layers:
+            spec = dict(spec)
+            data = self.make_layer_data(spec.pop('data'))
+            if not isinstance(data, PointColumns):
+                data = PointColumns.from_records(data)
+            if spec.pop('copy', False):
+                data = data.copy()
+            spec.setdefault('id', self._next_layer_id())
+            validate = spec.pop('validate', None)
+            if validate is not None:
+                data = self._validate(data, self._make_validator(validate), spec['id'])
+            specs.append((data, spec))
+
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ProcessPoolExecutor()
+        rows = sum(len(data) for data, _ in specs)
+        try:
+            with self._stage('layers_bboxes', rows=rows):
+                prefix_bboxes = []
+                for data, _ in specs:
+                    # `update_with_bbox` replaces bbox of view state, so earlier prefixes are kept as they are
+                    self.viewState.update_with_bbox(BBox.from_arrays(data.lat, data.lon))
+                    prefix_bboxes.append(self.viewState.bbox)
+            with self._stage('build_layers', rows=rows):
+                results = list(executor.map(
+                    _encode_scatterplot_layer,
+                    [data for data, _ in specs], prefix_bboxes, [spec for _, spec in specs],
+                ))
+        finally:
+            if own_executor:
+                executor.shutdown()
+        return [
+            self._add_layer(scatterplot.ScatterplotLayer.from_payload(
+                payload, bbox, pydeck_kwargs,
+                source=data, binary=spec.get('binary', False), profiler=self.profiler, precision=spec.get('precision'),
+            ))
+            for (data, spec), (payload, pydeck_kwargs, bbox) in zip(specs, results)
+        ]
+
+    def add_hexagon_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        weight: Optional[Union[str, Iterable[float]]] = None,
+        aggregation: str = 'count',
+        cell_size_pixels: Optional[float] = None,
+        **kwargs,
+    ) -> HexagonLayer:
+        """
+        Add layer of hexagonal cells, aggregated from points, see `AggregationLayer`.
+        """
+        return self._add_columns_layer(
+            HexagonLayer, data,
+            weight=weight, aggregation=aggregation, cell_size_pixels=cell_size_pixels, **kwargs
+        )
+
+    def add_grid_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        weight: Optional[Union[str, Iterable[float]]] = None,
+        aggregation: str = 'count',
+        cell_size_pixels: Optional[float] = None,
+        **kwargs,
+    ) -> GridLayer:
+        """
+        Add layer of square cells, aggregated from points, see `AggregationLayer`.
+        """
+        return self._add_columns_layer(
+            GridLayer, data,
+            weight=weight, aggregation=aggregation, cell_size_pixels=cell_size_pixels, **kwargs
+        )
+
+    def add_heatmap_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        weight: Optional[Union[str, Iterable[float]]] = None,
+        aggregation: str = 'count',
+        cell_size_pixels: Optional[float] = None,
+        **kwargs,
+    ) -> HeatmapLayer:
+        """
+        Add density heatmap of points, aggregated into fine grid, see `HeatmapLayer`.
+        """
+        return self._add_columns_layer(
+            HeatmapLayer, data,
+            weight=weight, aggregation=aggregation, cell_size_pixels=cell_size_pixels, **kwargs
+        )
+
+    def add_path_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        track: str = 'track',
+        time: Optional[str] = None,
+        tolerance_pixels: float = PathLayer.DEFAULT_TOLERANCE_PIXELS,
+        **kwargs,
+    ) -> PathLayer:
+        """
+        Add paths of tracks, made of points, grouped by `track` field and simplified at initial zoom level, see `PathLayer`.
+        """
+        return self._add_columns_layer(
+            PathLayer, data, track=track, time=time, tolerance_pixels=tolerance_pixels, **kwargs
+        )
+
+    def add_path_layer_from_chunks(
+        self,
+        chunks: Iterable[Union[pd.DataFrame, PointColumns]],
+        track: str = 'track',
+        time: Optional[str] = None,
+        tolerance_pixels: float = PathLayer.DEFAULT_TOLERANCE_PIXELS,
+        **kwargs,
+    ) -> PathLayer:
+        """
+        Add paths of tracks, made from stream of chunks of points, ordered by time across chunks,
+        simplifying them chunk by chunk, see `PathLayer.from_chunks`.
+        """
+        kwargs.setdefault('id', self._next_layer_id())
+        chunks = (self.make_layer_data(chunk) for chunk in chunks)
+        chunks = (chunk if isinstance(chunk, PointColumns) else PointColumns.from_records(chunk) for chunk in chunks)
+        layer = PathLayer.from_chunks(
+            chunks, self.viewState,
+            track=track, time=time, tolerance_pixels=tolerance_pixels, profiler=self.profiler, **kwargs
+        )
+        return self._add_layer(layer)
+
+    def add_playback_layer(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        time: str = 'time',
+        bucket: Optional[Union[float, str, pd.Timedelta]] = None,
+        buckets: int = TimeBuckets.DEFAULT_BUCKETS,
+        window: int = 1,
+        **kwargs,
+    ) -> PlaybackLayer:
+        """
+        Add scatterplot, replayed in time with a slider on the page, see `PlaybackLayer`.
+        """
+        return self._add_columns_layer(
+            PlaybackLayer, data, time=time, bucket=bucket, buckets=buckets, window=window, **kwargs
         )
-        self.layers.append(layer.make_pydeck_layer())
 
-    def display(self):
-        chart = pydeck.Deck(
-            layers=self.layers,
+    def add_scatterplot_tiles(
+        self,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        directory: str,
+        pyramid: Optional[TilePyramid] = None,
+        url: Optional[str] = None,
+        **kwargs,
+    ) -> VectorTileLayer:
+        """
+        Cut points into pyramid of vector tiles in `directory`, and add layer, which loads them on demand,
+        so only tiles in view are loaded by browser. See `add_vector_tile_layer`.
+        :param pyramid: zoom levels and budget of tiles, by default `TilePyramid()`
+        """
+        with self._stage('layer_data', layer=kwargs.get('id')):
+            data = self.make_layer_data(data)
+            if not isinstance(data, PointColumns):
+                data = PointColumns.from_records(data)
+        if pyramid is None:
+            pyramid = TilePyramid()
+        with self._stage('write_tiles', layer=kwargs.get('id'), rows=len(data)):
+            pyramid.write(data, directory)
+        return self.add_vector_tile_layer(directory, url=url, **kwargs)
+
+    def add_vector_tile_layer(
+        self,
+        directory: str,
+        url: Optional[str] = None,
+        **kwargs,
+    ) -> VectorTileLayer:
+        """
+        Add layer of tiles, already written by `TilePyramid` into `directory`.
+        Browsers do not load tiles from local file system, so page and tiles should be served by a static file server,
+        e.g. `python -m http.server` or `splyne.mapping.common.tiles.serve`.
+        :param url: template of tile urls, by default path of `directory`, relative to working directory,
+            where `display` writes html page
+        """
+        metadata = read_metadata(directory)
+        if url is None:
+            url = '/'.join([os.path.relpath(directory).replace(os.sep, '/'), metadata['tile_url']])
+        kwargs.setdefault('id', self._next_layer_id())
+        return self._add_layer(VectorTileLayer(url, metadata, self.viewState, **kwargs))
+
+    def _add_columns_layer(
+        self,
+        layer_class: type,
+        data: Union[pd.DataFrame, PointColumns, Iterable[Dict[str, Any]]],
+        **kwargs,
+    ) -> BaseLayer:
+        kwargs.setdefault('id', self._next_layer_id())
+        with self._stage('layer_data', layer=kwargs['id']):
+            data = self.make_layer_data(data)
+            if not isinstance(data, PointColumns):
+                data = PointColumns.from_records(data)
+        return self._add_layer(layer_class(data, self.viewState, profiler=self.profiler, **kwargs))
+
+    def _add_layer(
+        self,
+        layer: BaseLayer,
+        pydeck_layer: Optional['pydeck.Layer'] = None,
+    ) -> BaseLayer:
+        layer_id = layer.pydeck_kwargs['id']
+        if layer_id in self._versions:
+            raise ValueError(f"Layer `{layer_id}` already exists")
+        if pydeck_layer is None:
+            pydeck_layer = layer.make_pydeck_layer()
+        self.layers.append(pydeck_layer)
+        self.splyne_layers.append(layer)
+        self.layer_ids.append(layer_id)
+        self.has_binary_layers = self.has_binary_layers or layer.binary
+        self._versions[layer_id] = next(self._version_counter)
+        return layer
+
+    def _changes_since(self, versions: Dict[str, int]) -> Tuple[List[str], List[str]]:
+        changed = [layer_id for layer_id in self.layer_ids if versions.get(layer_id) != self._versions[layer_id]]
+        removed = [layer_id for layer_id in versions if layer_id not in self._versions]
+        return changed, removed
+
+    def diff(self) -> str:
+        """
+        Get json with layers, added or changed since previous call, and ids of removed layers:
+        `{"layers": [...], "removed": [...]}`. Only changed layers are encoded,
+        so live updating maps can send it to the viewer in time proportional to what changed.
+        If view state has changed, e.g. added points moved bounds of the map, it is included as `initialViewState`.
+        """
+        changed, removed = self._changes_since(self._diffed_versions)
+        self._diffed_versions = dict(self._versions)
+        layers = [self.layers[self.layer_ids.index(layer_id)].to_json() for layer_id in changed]
+        diff = '{"layers": [' + ', '.join(layers) + '], "removed": ' + json.dumps(removed)
+        view_state = self.viewState.get_view_state().to_json() if self.viewState.bbox.initialized else None
+        if view_state is not None and view_state != self._diffed_view_state:
+            self._diffed_view_state = view_state
+            diff += ', "initialViewState": ' + view_state
+        return diff + '}'
+
+    def export(self, directory: str) -> List[str]:
+        """
+        Write map into `directory`, as `index.html` and a data file per layer in `layers` subdirectory.
+        On repeated calls only files of changed layers are written, and `index.html` is written only
+        if layers were added, removed or their parameters or view state have changed.
+        Binary and vector tile layers are embedded into `index.html`, urls of tiles are kept as is.
+        Since browsers do not load data files from local file system, directory should be served
+        by a static file server, e.g. `python -m http.server`.
+        :return: paths of written files
+        """
+        layers_directory = os.path.join(directory, Map.EXPORT_LAYERS_DIRECTORY)
+        os.makedirs(layers_directory, exist_ok=True)
+        changed, removed = self._changes_since(self._exported_versions)
+        self._exported_versions = dict(self._versions)
+
+        written = []
+        for layer_id in removed:
+            self._export_fragments.pop(layer_id, None)
+            path = os.path.join(layers_directory, f'{layer_id}.json')
+            if os.path.exists(path):
+                os.remove(path)
+        for layer_id in changed:
+            layer = self.splyne_layers[self.layer_ids.index(layer_id)]
+            if layer.binary or isinstance(layer, VectorTileLayer):
+                self._export_fragments[layer_id] = self.layers[self.layer_ids.index(layer_id)].to_json()
+                continue
+            payload = layer.payload()
+            path = os.path.join(layers_directory, f'{layer_id}.json')
+            with self._stage('write_layer_data', layer=layer_id, rows=len(payload)):
+                with open(path, 'w', encoding='utf-8') as file:
+                    json.dump(payload, file)
+            written.append(path)
+            data_url = f'{Map.EXPORT_LAYERS_DIRECTORY}/{layer_id}.json'
+            self._export_fragments[layer_id] = layer.make_pydeck_layer(data_url=data_url).to_json()
+
+        with self._stage('render_html'):
+            html = self._render_html([self._export_fragments[layer_id] for layer_id in self.layer_ids])
+        if html != self._exported_html:
+            path = os.path.join(directory, Map.EXPORT_HTML_FILENAME)
+            with self._stage('write_html'), open(path, 'w', encoding='utf-8') as file:
+                file.write(html)
+            written.append(path)
+            self._exported_html = html
+        return written
+
+    def _make_deck(self, layers: List['pydeck.Layer']) -> 'pydeck.Deck':
+        import pydeck
+
+        return pydeck.Deck(
+            layers=layers,
             initial_view_state=self.viewState.get_view_state(),
             map_style=pydeck.map_styles.LIGHT,
         )
-        return chart.to_html('.splyne-tmp.html')
+
+    def _render_shell(self) -> Tuple[str, str]:
+        """
+        Render html page without layers, and split it into parts before and after json array of layers.
+        """
+        import pydeck.io.html
+
+        deck = json.loads(self._make_deck([]).to_json())
+        deck['layers'] = Map.LAYERS_PLACEHOLDER
+        html = self._inject_scripts(pydeck.io.html.render_json_to_html(json.dumps(deck)))
+        prefix, suffix = html.split(json.dumps(Map.LAYERS_PLACEHOLDER), 1)
+        return prefix, suffix
+
+    def _inject_scripts(self, html: str) -> str:
+        """
+        Add scripts, needed by layers, to html page: decoder of binary attributes and time slider of playback layers.
+        """
+        if self.has_binary_layers:
+            html = inject_binary_decoder(html)
+        if any(isinstance(layer, PlaybackLayer) for layer in self.splyne_layers):
+            html = inject_playback_controls(html)
+        return html
+
+    def _render_html(self, layers_json: List[str]) -> str:
+        """
+        Render html page with already encoded layers, without encoding them again.
+        """
+        prefix, suffix = self._render_shell()
+        return prefix + '[' + ', '.join(layers_json) + ']' + suffix
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Render html page piece by piece: page before layers, every encoded layer and page after them,
+        so large pages are written or sent without being joined into a single string.
+        """
+        with self._stage('render_html'):
+            prefix, suffix = self._render_shell()
+        yield prefix + '['
+        for i, (layer_id, layer) in enumerate(zip(self.layer_ids, self.layers)):
+            with self._stage('encode_layer', layer=layer_id):
+                fragment = layer.to_json()
+            yield (', ' if i else '') + fragment
+        yield ']' + suffix
+
+    def render(self) -> str:
+        """
+        Render html page into string, without writing any files.
+        """
+        return ''.join(self.iter_html())
+
+    def write(self, target: Union[str, os.PathLike, IO[str]]):
+        """
+        Write html page piece by piece into file at path `target`, or into text buffer, e.g. `io.StringIO`.
+        """
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, 'w', encoding='utf-8') as file:
+                self.write(file)
+            return
+        for chunk in self.iter_html():
+            target.write(chunk)
+
+    async def render_async(self, executor: Optional[concurrent.futures.Executor] = None) -> str:
+        """
+        Version of `render`, which encodes layers in `executor`, without blocking event loop.
+        By default, default executor of the loop is used.
+        Many maps may be rendered concurrently, but every map should be rendered or changed by one task at a time.
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, self.render)
+
+    async def write_async(
+        self,
+        target: Union[str, os.PathLike, IO[str]],
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        """
+        Version of `write`, which encodes layers and writes them in `executor`, see `render_async`.
+        """
+        await asyncio.get_running_loop().run_in_executor(executor, self.write, target)
+
+    async def export_async(
+        self,
+        directory: str,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> List[str]:
+        """
+        Version of `export`, which runs in `executor`, see `render_async`.
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, self.export, directory)
+
+    async def aiter_html(self, executor: Optional[concurrent.futures.Executor] = None) -> AsyncIterator[str]:
+        """
+        Version of `iter_html`, which produces every piece in `executor`, e.g. to stream page in http response.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = self.iter_html()
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def query_bbox(self, bbox: BBox) -> List[PointColumns]:
+        """
+        Get points of every scatterplot layer inside of `bbox`, using spatial index of layers.
+        Row-based layers are indexed by points of their payload, see `ScatterplotLayer.spatial_index`.
+        """
+        return [layer.query_bbox(bbox) for layer in self.scatterplot_layers]
+
+    def query_radius(
+        self,
+        lat: float, lon: float,
+        radius: float,
+        k: Optional[int] = None,
+        unit: haversine.Unit = haversine.Unit.KILOMETERS,
+    ) -> List[PointColumns]:
+        """
+        Get points of every scatterplot layer within `radius` from given point, ordered by distance.
+        """
+        return [layer.query_radius(lat, lon, radius, k=k, unit=unit) for layer in self.scatterplot_layers]
+
+    def query_tile(self, z: int, x: int, y: int) -> List[PointColumns]:
+        """
+        Get points of every scatterplot layer inside of web mercator tile `z/x/y`.
+        """
+        return [layer.query_tile(z, x, y) for layer in self.scatterplot_layers]
+
+    def display(self, filename: Optional[str] = None):
+        """
+        Render map with pydeck and write it into `filename`, by default `HTML_FILENAME` in working directory.
+        Concurrent renders should use distinct filenames, or `render` and `write`, which do not use shared files.
+        """
+        if filename is None:
+            filename = Map.HTML_FILENAME
+        chart = self._make_deck(self.layers)
+        if not self.has_binary_layers:
+            # pydeck encodes and writes page at once
+            with self._stage('render_html'):
+                return chart.to_html(filename)
+        with self._stage('render_html'):
+            html = self._inject_scripts(chart.to_html(as_string=True, notebook_display=False))
+        with self._stage('write_html'), open(filename, 'w', encoding='utf-8') as file:
+            file.write(html)
+        return html
@@ -1,6 +1,311 @@
+"""
+Transformations of dict items and of batches of columns.
+Stages of `Pipeline` operate on batches, dicts of arrays or DataFrame chunks, and are composed lazily:
+adjacent stages, which can be, are fused into one, e.g. consecutive renames into a single rename.
+Row-wise functions, e.g. `rename` or `zip_into`, are thin adapters, which run the same stages item by item,
+and extend pipeline of their input instead of wrapping it, so chained adapters are fused as well.
+"""
+
+import abc
 import itertools
 
-from typing import Iterable, Callable, Any, Dict
+from typing import Iterable, Iterator, Callable, Any, Dict, List, Optional, Tuple
+
+from splyne.common.base import SplyneObject
+
+# Batch is a dict of column name to array-like, or a DataFrame
+Batch = Any
+
+# Marks end of exhausted sequences, so `None` stays a legitimate value
+_MISSING = object()
+
+
+def batch_length(batch: Batch) -> int:
+    """
+    >>> batch_length({'a': [1, 2, 3]})
+    3
+    """
+    if hasattr(batch, 'columns'):
+        return len(batch)
+    return len(next(iter(batch.values()))) if batch else 0
+
+
+class Stage(SplyneObject):
+    """
+    Transformation of batches of columns, which also applies to single dict items.
+    """
+
+    @abc.abstractmethod
+    def __call__(self, batch: Batch) -> Batch:
+        raise NotImplementedError()
+
+    def batches(self, batches: Iterable[Batch]) -> Iterator[Batch]:
+        return map(self, batches)
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        return map(self, items)
+
+    def fuse(self, other: 'Stage') -> Optional['Stage']:
+        """
+        Get single stage, equivalent to this stage followed by `other`, or None, if they can not be fused.
+        """
+        return None
+
+
+class Apply(Stage):
+
+    def __init__(self, *functions: Callable[[Any], Any]):
+        """
+        Apply functions to every batch or item in turn.
+        """
+        super().__init__()
+        self.functions = functions
+
+    def __repr__(self):
+        return 'Apply({})'.format(len(self.functions))
+
+    def __call__(self, batch: Batch) -> Batch:
+        for func in self.functions:
+            batch = func(batch)
+        return batch
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for func in self.functions:
+            items = map(func, items)
+        return items
+
+    def fuse(self, other: Stage) -> Optional[Stage]:
+        if isinstance(other, Apply):
+            return Apply(*self.functions, *other.functions)
+        return None
+
+
+class Copy(Stage):
+    """
+    Shallow copy of every batch or item, so following in-place transformations do not modify input.
+    """
+
+    def __repr__(self):
+        return 'Copy()'
+
+    def __call__(self, batch: Batch) -> Batch:
+        if hasattr(batch, 'columns'):
+            return batch.copy(deep=False)
+        return dict(batch)
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        return map(dict, items)
+
+    def fuse(self, other: Stage) -> Optional[Stage]:
+        return self if isinstance(other, Copy) else None
+
+
+class Rename(Stage):
+
+    def __init__(self, names: Dict[str, str], ignore_missing: bool = False):
+        """
+        Rename columns or keys of items.
+        :param names: new name of every old one
+        :param ignore_missing: skip missing names instead of raising ValueError
+        """
+        super().__init__()
+        self.names = dict(names)
+        self.ignore_missing = ignore_missing
+
+    def __repr__(self):
+        return 'Rename({})'.format(self.names)
+
+    def __call__(self, batch: Batch) -> Batch:
+        for old_name in self.names:
+            if old_name not in batch and not self.ignore_missing:
+                raise ValueError(f"Key `{old_name}` does not exist")
+        if hasattr(batch, 'columns'):
+            return batch.rename(columns=self.names)
+        for old_name, new_name in self.names.items():
+            if old_name in batch:
+                batch[new_name] = batch.pop(old_name)
+        return batch
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        names = list(self.names.items())
+        for item in items:
+            for old_name, new_name in names:
+                if old_name in item:
+                    item[new_name] = item.pop(old_name)
+                elif not self.ignore_missing:
+                    raise ValueError(f"Key `{old_name}` does not exist")
+            yield item
+
+    def fuse(self, other: Stage) -> Optional[Stage]:
+        # Renames are fused only if they do not touch the same names, so their order does not matter
+        if not isinstance(other, Rename) or other.ignore_missing != self.ignore_missing:
+            return None
+        names = set(self.names) | set(self.names.values())
+        if names & (set(other.names) | set(other.names.values())):
+            return None
+        return Rename(dict(self.names, **other.names), ignore_missing=self.ignore_missing)
+
+
+class Assign(Stage):
+
+    def __init__(self, key: str, func: Callable[[Any], Any]):
+        """
+        Set column `key` of every batch to `func(batch)`, or key of every item to `func(item)`.
+        """
+        super().__init__()
+        self.columns: List[Tuple[str, Callable[[Any], Any]]] = [(key, func)]
+
+    def __repr__(self):
+        return 'Assign({})'.format(', '.join(key for key, _ in self.columns))
+
+    def __call__(self, batch: Batch) -> Batch:
+        for key, func in self.columns:
+            batch[key] = func(batch)
+        return batch
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        if len(self.columns) > 1:
+            yield from map(self, items)
+            return
+        (key, func), = self.columns
+        for item in items:
+            item[key] = func(item)
+            yield item
+
+    def fuse(self, other: Stage) -> Optional[Stage]:
+        if not isinstance(other, Assign):
+            return None
+        fused = Assign(*self.columns[0])
+        fused.columns = self.columns + other.columns
+        return fused
+
+
+class ZipInto(Stage):
+
+    def __init__(self, key: str, values: Iterable[Any]):
+        """
+        Set column `key` of consecutive batches to consecutive slices of `values`, or key of items to values.
+        Sequences are sliced, other iterables are consumed lazily, in both cases lengths must be equal.
+        """
+        super().__init__()
+        self.key = key
+        self.values = values
+
+    def __repr__(self):
+        return 'ZipInto({})'.format(self.key)
+
+    def __call__(self, batch: Batch) -> Batch:
+        return next(self.batches([batch]))
+
+    def batches(self, batches: Iterable[Batch]) -> Iterator[Batch]:
+        is_sequence = hasattr(self.values, '__getitem__') and hasattr(self.values, '__len__')
+        sequence = getattr(self.values, 'iloc', self.values)
+        iterator = None if is_sequence else iter(self.values)
+        offset = 0
+        for batch in batches:
+            count = batch_length(batch)
+            if is_sequence:
+                values = sequence[offset:offset + count]
+            else:
+                values = list(itertools.islice(iterator, count))
+            offset += count
+            if len(values) != count:
+                raise ValueError("Items and Values must be of equal lengths")
+            # Slices of Series keep their index, which DataFrame batches would align to, so values are positional
+            batch[self.key] = values.to_numpy() if hasattr(values, 'to_numpy') else values
+            yield batch
+        if (offset < len(self.values)) if is_sequence else (next(iterator, _MISSING) is not _MISSING):
+            raise ValueError("Items and Values must be of equal lengths")
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        key = self.key
+        for item, value in itertools.zip_longest(items, self.values, fillvalue=_MISSING):
+            if item is _MISSING or value is _MISSING:
+                raise ValueError("Items and Values must be of equal lengths")
+            item[key] = value
+            yield item
+
+
+def fuse_stages(stages: Iterable[Stage]) -> List[Stage]:
+    """
+    Fuse adjacent stages, which can be fused.
+    >>> fuse_stages([Rename({'a': 'b'}), Rename({'c': 'd'}), Copy(), Rename({'b': 'e'})])
+    [Rename({'a': 'b', 'c': 'd'}), Copy(), Rename({'b': 'e'})]
+    """
+    fused = []
+    for stage in stages:
+        merged = fused[-1].fuse(stage) if fused else None
+        if merged is None:
+            fused.append(stage)
+        else:
+            fused[-1] = merged
+    return fused
+
+
+class Pipeline(SplyneObject):
+
+    def __init__(self, *stages: Stage):
+        """
+        Lazy composition of stages, see `Stage`. Adjacent stages are fused, when pipeline is made.
+        >>> pipeline = Pipeline(Rename({'a': 'lat'})).then(Assign('size', lambda batch: [x * 2 for x in batch['lat']]))
+        >>> list(pipeline([{'a': [1, 2]}, {'a': [3]}]))
+        [{'lat': [1, 2], 'size': [2, 4]}, {'lat': [3], 'size': [6]}]
+        >>> rows = Pipeline(Rename({'a': 'lat'}), Assign('size', lambda item: item['lat'] * 2))
+        >>> list(rows.rows([{'a': 1}, {'a': 2}]))
+        [{'lat': 1, 'size': 2}, {'lat': 2, 'size': 4}]
+        """
+        super().__init__()
+        self.stages = fuse_stages(stages)
+
+    def __repr__(self):
+        return 'Pipeline({})'.format(', '.join(map(repr, self.stages)))
+
+    def then(self, *stages: Stage) -> 'Pipeline':
+        return Pipeline(*self.stages, *stages)
+
+    def __call__(self, batches: Iterable[Batch]) -> Iterator[Batch]:
+        """
+        Transform batches of columns, lazily.
+        """
+        for stage in self.stages:
+            batches = stage.batches(batches)
+        return iter(batches)
+
+    def rows(self, items: Iterable[Dict[str, Any]]) -> 'Rows':
+        """
+        Transform dict items one by one, lazily. If `items` are rows of another pipeline, which are not iterated yet,
+        pipelines are joined, so their stages are fused.
+        """
+        if isinstance(items, Rows) and not items.started:
+            return Rows(items.items, items.pipeline.then(*self.stages))
+        return Rows(items, self)
+
+
+class Rows(SplyneObject):
+    """
+    Lazy iterator of items, transformed by pipeline.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]], pipeline: Pipeline):
+        super().__init__()
+        self.items = items
+        self.pipeline = pipeline
+        self._iterator = None
+
+    @property
+    def started(self) -> bool:
+        return self._iterator is not None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._iterator is None:
+            items = self.items
+            for stage in self.pipeline.stages:
+                items = stage.rows(items)
+            self._iterator = iter(items)
+        return self._iterator
+
+    def __next__(self) -> Dict[str, Any]:
+        return next(iter(self))
 
 
 def make_pipe(*functions: Iterable[Callable[[Any], Any]]):
@@ -17,10 +322,7 @@ def make_pipe(*functions: Iterable[Callable[[Any], Any]]):
     [4, 9, 16, 25]
     """
     def wrapper(data: Iterable[Any]):
-        for item in data:
-            for func in functions:
-                item = func(item)
-            yield item
+        return Pipeline(Apply(*functions)).rows(data)
     return wrapper
 
 
@@ -42,26 +344,54 @@ def zip_into(
     >>> data = [{'a': 1}, {'a': 2, 'b': 4}, {'a': 3, 'c': 4}]
     >>> list(zip_into(data, 'c', [0, 1, 2]))
     [{'a': 1, 'c': 0}, {'a': 2, 'b': 4, 'c': 1}, {'a': 3, 'c': 2}]
+    >>> list(zip_into([{'a': 1}], 'b', [None]))
+    [{'a': 1, 'b': None}]
     """
-    for item, value in itertools.zip_longest(items, values):
-        if item is None or value is None:
-            raise ValueError("Items and Values must be of equal lengths")
-        item.update({key: value})
-        yield item
+    return Pipeline(ZipInto(key, values)).rows(items)
+
+
+def apply_into(
+    items: Iterable[Dict[str, Any]],
+    key: str,
+    func: Callable[[Dict[str, Any]], Any],
+) -> Iterable[Dict[str, Any]]:
+    """
+    Make iterator, that sequentially inserts `func(item)` into items on given key.
+    Unlike `zip_into` with values computed from the same items, iterates items only once.
+    >>> data = [{'a': 1}, {'a': 2}]
+    >>> list(apply_into(data, 'b', lambda item: item['a'] * 10))
+    [{'a': 1, 'b': 10}, {'a': 2, 'b': 20}]
+    """
+    return Pipeline(Assign(key, func)).rows(items)
+
+
+def copy_items(items: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """
+    Make shallow copy of every item, so following in-place transformations do not modify input.
+    >>> data = [{'a': 1}]
+    >>> list(rename(copy_items(data), 'a', 'b'))
+    [{'b': 1}]
+    >>> data
+    [{'a': 1}]
+    """
+    return Pipeline(Copy()).rows(items)
 
 
 def merge(
     **kwargs: Dict[str, Iterable[Any]]
 ) -> Iterable[Dict[str, Any]]:
     """
-    >>> list(merge(a=[1, 2, 3], b=[3, 4, 5]))
-    [{'a': 1, 'b': 3}, {'a': 2, 'b': 4}, {'a': 3, 'b': 5}]
+    >>> list(merge(a=[1, 2, 3], b=[3, 4, None]))
+    [{'a': 1, 'b': 3}, {'a': 2, 'b': 4}, {'a': 3, 'b': None}]
     """
-    keys = list(kwargs.keys())
-    for items in itertools.zip_longest(*kwargs.values()):
-        if any(item is None for item in items):
-            raise ValueError("Items sequences must be of equal lengths")
-        yield dict(zip(keys, items))
+    if not kwargs:
+        return Pipeline().rows([])
+    (first_key, first_values), *other = kwargs.items()
+    # Items are made of the first sequence, and other ones are zipped into them, which checks their lengths
+    return Pipeline(
+        Apply(lambda value: {first_key: value}),
+        *(ZipInto(key, values) for key, values in other),
+    ).rows(first_values)
 
 
 def rename(
@@ -78,10 +408,4 @@ def rename(
     >>> list(rename(data, 'b', 'c', ignore_missing=True))
     [{'a': 1}, {'a': 2}, {'a': 3}]
     """
-    for item in items:
-        if old_name not in item:
-            if not ignore_missing:
-                raise ValueError(f"Key `{old_name}` does not exist")
-        else:
-            item[new_name] = item.pop(old_name)
-        yield item
+    return Pipeline(Rename({old_name: new_name}, ignore_missing=ignore_missing)).rows(items)
@@ -6,7 +6,7 @@ DEFAULT_SKKIPPED_KEYS = ['id']
 
 
 def mock_prepare_deck_class() -> None:
-    def deck_to_json_mock(self: Deck, _, **kwargs) -> str:
+    def deck_to_json_mock(self: Deck, _=None, **kwargs) -> str:
         return self.to_json()
     Deck.to_html = deck_to_json_mock
 
@@ -1,9 +1,14 @@
 import enum
 import json
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from splyne import scatterplot
+from splyne import scatterplot, scatterplot_chunks
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.encoding import decode_array
+from splyne.mapping.common.lod import LevelOfDetail
 
 import tests.common as common
 
@@ -94,3 +99,62 @@ def test_scatterplot_formatted_medium(points_example_medium):
         data=points_example_medium, color='key',
     )
     common.assert_equal_jsons(json.loads(result), expected_result)
+
+
+def test_scatterplot_binary(points_example_medium, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = json.loads(scatterplot(data=points_example_medium, size='key', binary=True))
+    layer = result['layers'][0]
+    assert layer['data']['length'] == len(points_example_medium)
+    assert sorted(layer['data']['attributes']) == ['getPosition', 'getRadius']
+    assert 'getPosition' not in layer and 'getRadius' not in layer
+    positions = decode_array(layer['data']['attributes']['getPosition'])
+    expected_positions = [[point['lon'], point['lat']] for point in points_example_medium]
+    np.testing.assert_allclose(positions, expected_positions, atol=1e-5)
+    assert decode_array(layer['data']['attributes']['getRadius']).tolist() == [point['key'] for point in points_example_medium]
+
+
+def test_scatterplot_lod_budget():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.normal(55.7, 0.1, 10000), rng.normal(37.6, 0.2, 10000)
+    result = json.loads(scatterplot(lat=lat, lon=lon, lod=LevelOfDetail(max_points=500)))
+    data = result['layers'][0]['data']
+    assert 0 < len(data) <= 500
+    assert {(item['lat'], item['lon']) for item in data} <= set(zip(lat.tolist(), lon.tolist()))
+
+
+def test_scatterplot_chunks_same_as_whole(points_example_medium):
+    df = pd.DataFrame(points_example_medium)
+    whole = json.loads(scatterplot(data=df, size='key'))
+    chunked = json.loads(scatterplot_chunks((df.iloc[start:start + 3] for start in range(0, len(df), 3)), size='key'))
+    common.assert_equal_jsons(chunked, whole)
+
+
+def test_scatterplot_chunks_lod_budget():
+    rng = np.random.default_rng(0)
+    chunks = (
+        {'lat': rng.normal(55.7, 0.1, 5000), 'lon': rng.normal(37.6, 0.2, 5000)}
+        for _ in range(10)
+    )
+    result = json.loads(scatterplot_chunks(chunks, lod=LevelOfDetail(max_points=300)))
+    assert 0 < len(result['layers'][0]['data']) <= 300
+
+
+def test_scatterplot_does_not_modify_input(points_example_medium):
+    records = [{'a': point['lat'], 'b': point['lon'], 'key': point['key']} for point in points_example_medium]
+    expected_records = [dict(record) for record in records]
+    df = pd.DataFrame(records)
+    expected_df = df.copy()
+    scatterplot(data=records, lat='a', lon='b', color='key', size='key')
+    scatterplot(data=df, lat='a', lon='b', color='key', size='key')
+    assert records == expected_records
+    pd.testing.assert_frame_equal(df, expected_df)
+    columns = PointColumns.from_dataframe(df, lat='a', lon='b')
+    scatterplot(data=columns, color='key', size='key')
+    assert columns.color is None and columns.size is None
+
+
+def test_scatterplot_colormap(points_example_medium):
+    result = json.loads(scatterplot(data=points_example_medium, color='key', colormap='blue_red'))
+    colors = {item['key']: item['color'] for item in result['layers'][0]['data']}
+    assert colors == {1: [0, 0, 255], 2: [128, 0, 128], 3: [255, 0, 0]}
@@ -0,0 +1,66 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.cache import LayerCache
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.lod import LevelOfDetail
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+def make_columns(seed: int, count: int = 500) -> PointColumns:
+    rng = np.random.default_rng(seed)
+    return PointColumns(rng.normal(55.7, 0.05, count), rng.normal(37.6, 0.05, count), size=rng.uniform(1, 5, count))
+
+
+@pytest.mark.parametrize('params', [
+    {'binary': False},
+    {'binary': True},
+    {'binary': False, 'lod': LevelOfDetail(max_points=100)},
+])
+def test_cached_map_same_as_uncached(params, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = LayerCache(str(tmp_path / 'cache'))
+    uncached = Map()
+    uncached.add_scatterplot_layer(make_columns(0), **params)
+    expected = json.loads(uncached.display())
+
+    for _ in range(2):
+        cached = Map()
+        layer = cached.add_scatterplot_layer(make_columns(0), cache=cache, **params)
+        common.assert_equal_jsons(json.loads(cached.display()), expected)
+    # Second layer was loaded from cache
+    assert layer.data is None
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+
+def test_cached_records(tmp_path):
+    cache = LayerCache(str(tmp_path))
+    records = [{'lat': 55.7, 'lon': 37.6, 'key': 'a'}, {'lat': 55.8, 'lon': 37.7, 'key': 'b'}]
+    first, second = Map(), Map()
+    first.add_scatterplot_layer(records, cache=cache)
+    layer = second.add_scatterplot_layer(iter(records), cache=cache)
+    assert layer.payload() == records
+    assert second.viewState.bbox.ur_point.lat == 55.8
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LayerCache(str(tmp_path))
+    map = Map()
+    map.add_scatterplot_layer(make_columns(0), cache=cache)
+    entry_size = os.path.getsize(os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0]))
+    cache.max_bytes = int(2.5 * entry_size)
+
+    for seed in range(1, 3):
+        map.add_scatterplot_layer(make_columns(seed), cache=cache)
+    assert len(os.listdir(str(tmp_path))) == 2
+    assert map.add_scatterplot_layer(make_columns(2), cache=cache).data is None
+    assert map.add_scatterplot_layer(make_columns(0), cache=cache).data is not None
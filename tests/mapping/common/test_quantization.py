@@ -0,0 +1,85 @@
+import json
+
+import haversine
+import numpy as np
+import pytest
+
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.distance import haversine_distance
+from splyne.mapping.common.encoding import decode_array
+from splyne.mapping.common.quantization import Quantization
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.scatterplot import ScatterplotLayer
+from splyne.mapping.map_class.map import Map
+
+
+@pytest.fixture
+def city():
+    rng = np.random.default_rng(0)
+    count = 200_000
+    lat = np.clip(rng.normal(55.75, 0.08, count), 55.5, 56.0)
+    lon = np.clip(rng.normal(37.62, 0.12, count), 37.3, 37.9)
+    color = rng.integers(0, 256, (count, 3))
+    return PointColumns(lat, lon, color=color, size=rng.uniform(1.0, 5.0, count))
+
+
+def payload_size(layer: ScatterplotLayer) -> int:
+    return len(json.dumps(layer.payload()))
+
+
+@pytest.mark.parametrize('precision', [0.1, 1.0, 10.0, 'int16', 'int32'])
+def test_error_within_declared_bound(city, precision):
+    layer = ScatterplotLayer(city, ViewState(), binary=True, precision=precision)
+    encoded = layer.payload()['attributes']['getPosition']
+    positions = Quantization.decode(encoded)
+    order = layer.quantization.encode(city)[1]
+    errors = haversine_distance(
+        city.lat[order], city.lon[order], positions[:, 1], positions[:, 0], unit=haversine.Unit.METERS,
+    )
+    assert errors.max() <= layer.max_error_meters * (1 + 1e-6)
+    if not isinstance(precision, str):
+        assert layer.max_error_meters <= precision * (1 + 1e-9)
+    # Colors and sizes follow reordered points
+    assert np.array_equal(decode_array(layer.payload()['attributes']['getFillColor']), city.color[order])
+
+
+def test_payload_size(city):
+    plain = payload_size(ScatterplotLayer(city.take(np.arange(len(city))), ViewState(), binary=True))
+    binary = ScatterplotLayer(city, ViewState(), binary=True, precision=1.0)
+    assert binary.quantization.dtype == 'int16'
+    quantized = len(binary.payload()['attributes']['getPosition']['value'])
+    positions = len(json.dumps(ScatterplotLayer(city, ViewState(), binary=True).payload()['attributes']['getPosition']))
+    assert positions > 2.5 * quantized
+    assert plain > payload_size(binary)
+
+    coordinates = PointColumns(city.lat, city.lon)
+    records = payload_size(ScatterplotLayer(coordinates, ViewState()))
+    rounded = ScatterplotLayer(coordinates, ViewState(), precision=10.0)
+    assert records > 1.5 * payload_size(rounded)
+    lat = np.array([record['lat'] for record in rounded.payload()])
+    lon = np.array([record['lon'] for record in rounded.payload()])
+    errors = haversine_distance(city.lat, city.lon, lat, lon, unit=haversine.Unit.METERS)
+    assert errors.max() <= rounded.max_error_meters
+
+
+def test_precision_errors():
+    bbox = BBox.from_arrays([-60.0, 60.0], [-170.0, 170.0])
+    with pytest.raises(ValueError, match='too fine'):
+        Quantization(bbox, 0.0001)
+    with pytest.raises(ValueError, match='Unknown precision'):
+        Quantization(bbox, 'int8')
+    with pytest.raises(ValueError, match='positive'):
+        Quantization(bbox, 0.0)
+    assert Quantization(BBox.from_arrays([55.7], [37.6]), 1.0).dtype == 'int16'
+
+
+def test_map_with_precision(city, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    layer = map.add_scatterplot_layer(city.take(np.arange(1000)), binary=True, precision='int16')
+    assert map.has_binary_layers
+    assert '@@quantized' in map.layers[0].to_json()
+    assert 'get_position' not in layer.layer_kwargs()
+    html = map.render()
+    assert 'decodeQuantized' in html
@@ -0,0 +1,85 @@
+import json
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from splyne.mapping.api.scatterplot import scatterplot
+from splyne.mapping.common.common import BBox
+from splyne.mapping.common.lod import LevelOfDetail
+from splyne.mapping.common.sources import ArrowColumns, MappedColumns
+from splyne.mapping.map_class.map import Map
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+@pytest.fixture
+def columns(tmp_path):
+    rng = np.random.default_rng(0)
+    count = 1_000_000
+    frame = pd.DataFrame({
+        'lat': rng.normal(55.7, 0.1, count),
+        'lon': rng.normal(37.6, 0.2, count),
+        'key': rng.integers(0, 5, count),
+    })
+    for name in frame.columns:
+        np.save(tmp_path / f'{name}.npy', frame[name].to_numpy())
+    return frame
+
+
+def test_mapped_columns(columns, tmp_path):
+    source = MappedColumns(tmp_path / 'lat.npy', tmp_path / 'lon.npy', color=tmp_path / 'key.npy', chunk_size=300_000)
+    assert isinstance(source.lat, np.memmap)
+    assert [len(chunk) for chunk in source.chunks()] == [300_000, 300_000, 300_000, 100_000]
+    assert repr(source.bbox()) == repr(BBox.from_arrays(columns['lat'], columns['lon']))
+    with pytest.raises(ValueError):
+        MappedColumns(source.lat, source.lon[:10])
+
+
+def test_layer_from_mapped_columns_is_streamed(columns, tmp_path):
+    source = MappedColumns(tmp_path / 'lat.npy', tmp_path / 'lon.npy', color=tmp_path / 'key.npy', chunk_size=20_000)
+    map = Map()
+    tracemalloc.start()
+    layer = map.add_scatterplot_layer(source, binary=True, lod=LevelOfDetail(max_points=10_000))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(layer.data) <= 10_000
+    # Coordinates alone take 16 MB, only current chunk and decimated points are kept in memory
+    assert peak < columns[['lat', 'lon']].to_numpy().nbytes / 4
+    assert repr(map.viewState.bbox) == repr(BBox.from_arrays(columns['lat'], columns['lon']))
+
+
+def test_scatterplot_of_npy_paths(columns, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = json.loads(scatterplot(lat='lat.npy', lon='lon.npy', lod=LevelOfDetail(max_points=1000)))
+    assert len(result['layers'][0]['data']) <= 1000
+    with pytest.raises(ValueError):
+        scatterplot(data=MappedColumns('lat.npy', 'lon.npy'), color='key')
+
+
+@pytest.mark.parametrize('filename', ['points.parquet', 'points.arrow'])
+def test_arrow_columns(columns, tmp_path, filename):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    table = pyarrow.Table.from_pandas(columns, preserve_index=False)
+    path = tmp_path / filename
+    if filename.endswith('.parquet'):
+        pyarrow.parquet.write_table(table, path, row_group_size=250_000)
+    else:
+        pyarrow.feather.write_feather(table, path, compression='uncompressed', chunksize=250_000)
+    source = ArrowColumns(path, color='key', chunk_size=250_000)
+    assert len(source) == len(columns)
+    assert repr(source.bbox()) == repr(BBox.from_arrays(columns['lat'], columns['lon']))
+    chunks = list(source.chunks())
+    assert [len(chunk) for chunk in chunks] == [250_000] * 4
+    assert np.array_equal(np.concatenate([chunk.lat for chunk in chunks]), columns['lat'].to_numpy())
+
+    layer = Map().add_scatterplot_layer(source, binary=True, lod=LevelOfDetail(max_points=10_000))
+    assert 0 < len(layer.data) <= 10_000
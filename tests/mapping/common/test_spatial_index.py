@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from splyne.mapping.common.common import BBox, GeoPoint
+from splyne.mapping.common.distance import distances_to
+from splyne.mapping.common.spatial_index import GridIndex, tile_bbox
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.normal(55.7, 0.5, 20000), rng.normal(37.6, 1.0, 20000)
+
+
+@pytest.mark.parametrize('cell_size', [None, 0.01, 1.0])
+def test_query_bbox_matches_full_scan(points, cell_size):
+    lat, lon = points
+    index = GridIndex(lat, lon, cell_size=cell_size)
+    bbox = BBox(GeoPoint(55.5, 37.0), GeoPoint(56.0, 38.5))
+    expected = np.flatnonzero((lat >= 55.5) & (lat <= 56.0) & (lon >= 37.0) & (lon <= 38.5))
+    np.testing.assert_array_equal(index.query_bbox(bbox), expected)
+
+
+def test_query_radius_matches_full_scan(points):
+    lat, lon = points
+    index = GridIndex(lat, lon)
+    distances = distances_to(55.7, 37.6, lat, lon)
+    expected = np.flatnonzero(distances <= 20.0)
+    expected = expected[np.argsort(distances[expected], kind='stable')]
+    np.testing.assert_array_equal(index.query_radius(55.7, 37.6, 20.0), expected)
+    np.testing.assert_array_equal(index.query_radius(55.7, 37.6, 20.0, k=10), expected[:10])
+
+
+def test_query_tile_matches_full_scan(points):
+    lat, lon = points
+    index = GridIndex(lat, lon)
+    bbox = tile_bbox(8, 154, 80)
+    expected = np.flatnonzero(
+        (lat >= bbox.ll_point.lat) & (lat <= bbox.ur_point.lat) & (lon >= bbox.ll_point.lon) & (lon <= bbox.ur_point.lon)
+    )
+    assert len(expected) > 0
+    np.testing.assert_array_equal(index.query_tile(8, 154, 80), expected)
+
+
+def test_single_point():
+    index = GridIndex(np.array([55.7]), np.array([37.6]))
+    assert index.query_bbox(BBox(GeoPoint(-90.0, -180.0), GeoPoint(90.0, 180.0))).tolist() == [0]
+    assert index.query_bbox(BBox(GeoPoint(55.0, 37.0), GeoPoint(55.5, 38.0))).tolist() == []
+    assert index.query_radius(55.7, 37.6, 1.0).tolist() == [0]
+
+
+@pytest.mark.parametrize('cell_size', [None, 1e-9])
+def test_collinear_points(cell_size):
+    lat = np.linspace(55.0, 56.0, 1000)
+    index = GridIndex(lat, np.full(1000, 37.6), cell_size=cell_size)
+    assert index.rows_count <= GridIndex.MAX_CELLS_PER_AXIS and index.cols_count == 1
+    everything = BBox(GeoPoint(-90.0, -180.0), GeoPoint(90.0, 180.0))
+    np.testing.assert_array_equal(index.query_bbox(everything), np.arange(1000))
+    expected = np.flatnonzero((lat >= 55.5) & (lat <= 55.51))
+    assert len(expected) == 10
+    np.testing.assert_array_equal(index.query_bbox(BBox(GeoPoint(55.5, 37.0), GeoPoint(55.51, 38.0))), expected)
+    # Points along a parallel are indexed the same way
+    index = GridIndex(np.full(1000, 55.7), lat - 18.0, cell_size=cell_size)
+    np.testing.assert_array_equal(index.query_bbox(everything), np.arange(1000))
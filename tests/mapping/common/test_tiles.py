@@ -0,0 +1,132 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.mvt import encode_points_tile
+from splyne.mapping.common.tiles import TilePyramid, tile_coordinates
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+def read_varint(data, position):
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, position
+
+
+def parse_message(data):
+    position, fields = 0, []
+    while position < len(data):
+        key, position = read_varint(data, position)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, position = read_varint(data, position)
+        elif wire_type == 1:
+            value = struct.unpack('<d', data[position:position + 8])[0]
+            position += 8
+        elif wire_type == 2:
+            length, position = read_varint(data, position)
+            value = data[position:position + length]
+            position += length
+        else:
+            raise ValueError(f'Unexpected wire type {wire_type}')
+        fields.append((field, value))
+    return fields
+
+
+def parse_packed(data):
+    position, values = 0, []
+    while position < len(data):
+        value, position = read_varint(data, position)
+        values.append(value)
+    return values
+
+
+def decode_points_tile(tile):
+    """
+    Minimal vector tile decoder, which supports points, encoded by `encode_points_tile`.
+    """
+    (_, layer), = parse_message(tile)
+    fields = parse_message(layer)
+    keys = [value.decode() for field, value in fields if field == 3]
+    values = [parse_message(value)[0][1] for field, value in fields if field == 4]
+    points = []
+    for field, value in fields:
+        if field != 2:
+            continue
+        feature = dict(parse_message(value))
+        assert feature[3] == 1
+        tags = parse_packed(feature.get(2, b''))
+        command, x, y = parse_packed(feature[4])
+        assert command == 9
+        properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+        points.append(((x >> 1) ^ -(x & 1), (y >> 1) ^ -(y & 1), properties))
+    return dict(fields)[1].decode(), dict(fields)[5], points
+
+
+def test_points_tile_roundtrip():
+    rng = np.random.default_rng(0)
+    count = 5000
+    x, y = rng.integers(0, 4096, count), rng.integers(0, 4096, count)
+    color, size = rng.integers(0, 256, (count, 3)), rng.uniform(0.0, 10.0, count)
+    name, extent, points = decode_points_tile(encode_points_tile(x, y, color=color, size=size))
+    assert (name, extent) == ('points', 4096)
+    assert [point[:2] for point in points] == list(zip(x.tolist(), y.tolist()))
+    assert [[point[2][channel] for channel in 'rgb'] for point in points] == color.tolist()
+    assert [point[2]['size'] for point in points] == size.tolist()
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    count = 50_000
+    return PointColumns(
+        rng.normal(55.7, 0.05, count), rng.normal(37.6, 0.1, count),
+        color=rng.integers(0, 256, (count, 3)), size=rng.uniform(1.0, 5.0, count),
+    )
+
+
+def test_pyramid_budget_and_coverage(points, tmp_path):
+    metadata = TilePyramid(min_zoom=4, max_zoom=12, max_points_per_tile=1000).write(points, str(tmp_path))
+    assert json.loads((tmp_path / 'tiles.json').read_text()) == metadata
+
+    for zoom in (4, 12):
+        tile_x, tile_y, local_x, local_y = tile_coordinates(points.lat, points.lon, zoom)
+        expected_tiles = set(zip(tile_x.tolist(), tile_y.tolist()))
+        written_tiles = {
+            (int(x), int(name[:-len('.pbf')]))
+            for x in os.listdir(tmp_path / str(zoom)) for name in os.listdir(tmp_path / str(zoom) / x)
+        }
+        assert written_tiles == expected_tiles
+        tiles, counts = np.unique(np.column_stack([tile_x, tile_y]), axis=0, return_counts=True)
+        for (x, y), count in zip(tiles.tolist(), counts.tolist()):
+            _, _, decoded = decode_points_tile((tmp_path / str(zoom) / str(x) / f'{y}.pbf').read_bytes())
+            assert 0 < len(decoded) <= 1000
+            if zoom == 12 and count <= 1000:
+                # Finest level keeps all points of tiles, which fit into budget
+                assert len(decoded) == count
+
+
+def test_map_references_tiles(points, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    map.add_scatterplot_tiles(points, 'tiles', pyramid=TilePyramid(max_zoom=8))
+    layer, = json.loads(map.display())['layers']
+    assert layer['@@type'] == 'MVTLayer'
+    assert layer['data'] == 'tiles/{z}/{x}/{y}.pbf'
+    assert layer['maxZoom'] == 8
+    assert map.viewState.bbox.initialized
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.sources import MappedColumns
+from splyne.mapping.common.validation import CoordinateValidator, ValidationReport
+from splyne.mapping.map_class.map import Map
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    count = 1_000_000
+    lat, lon = rng.uniform(-80.0, 80.0, count), rng.uniform(-170.0, 170.0, count)
+    lat[::1000] = np.nan
+    lon[1::1000] = np.inf
+    lat[2::1000] = 100.0
+    lon[2::1000] = 150.0
+    lon[3::1000] = -190.0
+    lat[4::1000], lon[4::1000] = lon[4::1000].clip(-175.0, 175.0), 45.0
+    return lat, lon
+
+
+def test_report_counts(points):
+    lat, lon = points
+    masks, report = CoordinateValidator().check(lat, lon)
+    assert report.to_dict() == {
+        'not_finite': 2000, 'lat_out_of_range': 1000, 'lon_out_of_range': 1000,
+        'swapped': int((np.abs(lat[4::1000]) > 90).sum()),
+        'total': len(lat), 'rejected': report.rejected,
+    }
+    valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    assert report.rejected == (~valid).sum()
+    assert CoordinateValidator().check(lat[valid], lon[valid])[0] is None
+
+
+def test_policies(points):
+    data = PointColumns(*points)
+    lat_before = data.lat.copy()
+    with pytest.raises(ValueError, match='Invalid coordinates'):
+        CoordinateValidator().apply(data)
+
+    dropped, report = CoordinateValidator('drop').apply(data)
+    assert len(dropped) == len(data) - report.rejected
+
+    clipped, _ = CoordinateValidator('clip').apply(data)
+    assert len(clipped) == len(data) - report.counts['not_finite']
+    assert CoordinateValidator().check(clipped.lat, clipped.lon)[0] is None
+
+    kept, _ = CoordinateValidator('report').apply(data)
+    assert kept is data
+    np.testing.assert_array_equal(data.lat, lat_before)
+
+
+def test_map_validation(points, tmp_path):
+    lat, lon = points
+    map = Map()
+    layer = map.add_scatterplot_layer(PointColumns(lat, lon), binary=True, validate='drop', id='points')
+    assert map.validation_reports['points'].rejected == len(lat) - len(layer.data)
+
+    records = [{'lat': 55.7, 'lon': 37.6, 'name': 'a'}, {'lat': 95.0, 'lon': 155.7, 'name': 'b'}]
+    layer = map.add_scatterplot_layer(records, validate='clip', id='records')
+    assert layer.data.to_records()[1] == {'name': 'b', 'lat': 90.0, 'lon': 155.7}
+    with pytest.raises(ValueError, match='lat_out_of_range=1'):
+        map.add_scatterplot_layer(records, validate='raise')
+
+    chunks = [PointColumns(lat[:500_000], lon[:500_000]), PointColumns(lat[500_000:], lon[500_000:])]
+    map.add_scatterplot_layer_from_chunks(chunks, binary=True, validate='drop', id='chunks')
+    assert repr(map.validation_reports['chunks']) == repr(map.validation_reports['points'])
+
+    np.save(tmp_path / 'lat.npy', lat)
+    np.save(tmp_path / 'lon.npy', lon)
+    source = MappedColumns(tmp_path / 'lat.npy', tmp_path / 'lon.npy', chunk_size=300_000)
+    map.add_scatterplot_layer(source, binary=True, validate=CoordinateValidator('drop'), id='source')
+    assert repr(map.validation_reports['source']) == repr(map.validation_reports['points'])
+
+    map.remove_layer('source')
+    assert 'source' not in map.validation_reports
+
+
+def test_merge_of_empty_report():
+    assert ValidationReport(0).merge(ValidationReport(3, {'swapped': 1})).rejected == 1
+
+
+def test_layers_reject_report_policy(tmp_path):
+    map = Map()
+    data = PointColumns([55.7, np.nan, 95.0], [37.6, 37.6, 37.6])
+    assert CoordinateValidator('report').apply(data)[0] is data
+    for validate in ('report', CoordinateValidator('report')):
+        with pytest.raises(ValueError, match='Policy `report` keeps invalid rows'):
+            map.add_scatterplot_layer(PointColumns([55.7, 55.8], [37.6, 37.6]), validate=validate)
+    np.save(tmp_path / 'lat.npy', data.lat)
+    np.save(tmp_path / 'lon.npy', data.lon)
+    with pytest.raises(ValueError, match='Policy `report` keeps invalid rows'):
+        map.add_scatterplot_layer(MappedColumns(tmp_path / 'lat.npy', tmp_path / 'lon.npy'), validate='report')
+    assert not map.layers and not map.validation_reports
@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.aggregation import GridLayer, HeatmapLayer, HexagonLayer
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    count = 100_000
+    return pd.DataFrame({
+        'lat': rng.normal(55.7, 0.05, count),
+        'lon': rng.normal(37.6, 0.1, count),
+        'speed': rng.uniform(0.0, 100.0, count),
+    })
+
+
+@pytest.mark.parametrize('layer_class', [GridLayer, HexagonLayer, HeatmapLayer])
+def test_cells_keep_all_points(points, layer_class):
+    layer = layer_class(PointColumns.from_dataframe(points), ViewState(), weight='speed', aggregation='sum')
+    assert len(layer) < len(points) / 10
+    assert layer.counts.sum() == len(points)
+    assert layer.values.sum() == pytest.approx(points['speed'].sum())
+
+
+def test_grid_cells_match_points_inside(points):
+    layer = GridLayer(PointColumns.from_dataframe(points), ViewState(), weight='speed', aggregation='mean', cell_size_pixels=50)
+    for record in layer.payload()[:10]:
+        lon_low, lat_low = record['polygon'][0]
+        lon_high, lat_high = record['polygon'][2]
+        inside = points[
+            points['lon'].between(lon_low, lon_high, inclusive='left')
+            & points['lat'].between(lat_low, lat_high, inclusive='left')
+        ]
+        assert record['count'] == len(inside)
+        assert record['value'] == pytest.approx(inside['speed'].mean(), rel=1e-6)
+
+
+def test_map_with_aggregation_layers(points, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    map.add_scatterplot_layer(points.head(10))
+    map.add_hexagon_layer(points)
+    map.add_heatmap_layer(points.to_dict('records'), weight='speed', aggregation='mean')
+    deck = json.loads(map.display())
+    assert [layer['@@type'] for layer in deck['layers']] == ['ScatterplotLayer', 'PolygonLayer', 'HeatmapLayer']
+    assert len(map.scatterplot_layers) == 1
+    assert len(map.query_bbox(map.viewState.bbox)[0]) == 10
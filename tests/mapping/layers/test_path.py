@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.aggregation import mercator_y
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.simplification import segment_distances, simplify_polylines
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.path import PathLayer
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+@pytest.fixture
+def fleet():
+    rng = np.random.default_rng(0)
+    vehicles, pings = 100, 2_000
+    # Vehicles keep their heading for a while, and pings are about 10 meters apart
+    heading = np.cumsum(rng.normal(0.0, 0.05, (vehicles, pings)), axis=1) + rng.uniform(0.0, 2 * np.pi, (vehicles, 1))
+    lat = 55.75 + np.cumsum(1e-4 * np.sin(heading), axis=1) + rng.normal(0.0, 1e-6, (vehicles, pings))
+    lon = 37.62 + np.cumsum(1.8e-4 * np.cos(heading), axis=1) + rng.normal(0.0, 1e-6, (vehicles, pings))
+    # Pings are ordered by time across vehicles, as they come from a fleet
+    return pd.DataFrame({
+        'lat': lat.T.ravel(),
+        'lon': lon.T.ravel(),
+        'vehicle': np.tile(np.arange(vehicles), pings),
+        'time': np.repeat(np.arange(pings), vehicles),
+    })
+
+
+def path_errors(points: pd.DataFrame, layer: PathLayer) -> np.ndarray:
+    """
+    Distance from every point to simplified path of its track, in web mercator degrees.
+    """
+    errors = []
+    for track_id, path in zip(layer.track_ids.tolist(), layer.paths()):
+        track = points[points['vehicle'] == track_id]
+        x, y = track['lon'].to_numpy(), mercator_y(track['lat'].to_numpy())
+        path_x, path_y = path[:, 0], mercator_y(path[:, 1])
+        distances = segment_distances(
+            x[:, None], y[:, None], path_x[None, :-1], path_y[None, :-1], path_x[None, 1:], path_y[None, 1:],
+        )
+        errors.append(distances.min(axis=1))
+    return np.concatenate(errors)
+
+
+def test_simplify_polylines_matches_recursive():
+    rng = np.random.default_rng(1)
+    x, y = np.cumsum(rng.normal(size=(2, 500)), axis=1)
+
+    def recursive(first, last, keep):
+        if last - first < 2:
+            return
+        distances = segment_distances(x[first + 1:last], y[first + 1:last], x[first], y[first], x[last], y[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > 2.0:
+            keep[first + 1 + farthest] = True
+            recursive(first, first + 1 + farthest, keep)
+            recursive(first + 1 + farthest, last, keep)
+
+    expected = np.zeros(500, dtype=bool)
+    expected[[0, 199, 200, 499]] = True
+    recursive(0, 199, expected)
+    recursive(200, 499, expected)
+    assert np.array_equal(simplify_polylines(x, y, np.array([0, 200]), 2.0), expected)
+
+
+def test_path_layer_simplifies_within_tolerance(fleet):
+    layer = PathLayer(PointColumns.from_dataframe(fleet), ViewState(), track='vehicle', time='time')
+    assert len(layer) == 100
+    assert len(layer.lat) < len(fleet) / 5
+    assert path_errors(fleet, layer).max() <= layer.tolerance * (1 + 1e-9)
+    assert all(record['path'][0] == [round(lon, 6), round(lat, 6)] for record, lat, lon in zip(
+        layer.payload(), fleet.groupby('vehicle')['lat'].first(), fleet.groupby('vehicle')['lon'].first(),
+    ))
+
+
+def test_path_layer_from_chunks(fleet):
+    chunks = (PointColumns.from_dataframe(chunk) for _, chunk in fleet.groupby(fleet['time'] // 100))
+    layer = PathLayer.from_chunks(chunks, ViewState(), track='vehicle', time='time')
+    whole = PathLayer(PointColumns.from_dataframe(fleet), ViewState(), track='vehicle')
+    assert layer.tolerance == whole.tolerance
+    assert len(layer.lat) < 1.5 * len(whole.lat)
+    assert path_errors(fleet, layer).max() <= 2 * layer.tolerance
+    # Paths stay connected across chunks and keep their ends
+    for path, (_, track) in zip(layer.paths(), fleet.groupby('vehicle')):
+        assert path[-1].tolist() == [track['lon'].iloc[-1], track['lat'].iloc[-1]]
+
+
+def test_map_path_layer(fleet, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    layer = map.add_path_layer(fleet.head(1000), track='vehicle', tolerance_pixels=0)
+    assert len(layer.lat) == 1000
+    deck = json.loads(map.layers[0].to_json())
+    assert deck['@@type'] == 'PathLayer'
+    chunks = map.add_path_layer_from_chunks([fleet.head(500), fleet.iloc[500:1000]], track='vehicle')
+    assert len(chunks) == len(layer)
+    map.display()
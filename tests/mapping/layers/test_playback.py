@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.encoding import decode_array
+from splyne.mapping.common.playback import TimeBuckets
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.playback import PlaybackLayer
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+@pytest.fixture
+def pings():
+    rng = np.random.default_rng(0)
+    count = 100_000
+    seconds = rng.integers(0, 24 * 3600, count)
+    return pd.DataFrame({
+        'lat': rng.normal(55.75, 0.05, count),
+        'lon': rng.normal(37.62, 0.1, count),
+        'time': pd.Timestamp('2024-05-01') + pd.to_timedelta(seconds, unit='s'),
+        'seconds': seconds,
+    })
+
+
+def test_frames_are_contiguous_buckets(pings):
+    layer = PlaybackLayer(PointColumns.from_dataframe(pings), ViewState(), bucket='5min', window=3)
+    assert len(layer.buckets) == 288
+    assert layer.buckets.labels()[:2] == ['2024-05-01 00:00:00', '2024-05-01 00:05:00']
+    offsets = layer.payload()['frames']['offsets']
+    assert offsets[0] == 0 and offsets[-1] == len(pings)
+    for index in (0, 100, 287):
+        frame = layer.frame(index)
+        expected = pings[(pings['seconds'] >= index * 300) & (pings['seconds'] < (index + 3) * 300)]
+        assert len(frame) == len(expected)
+        assert sorted(frame.column('seconds').tolist()) == sorted(expected['seconds'].tolist())
+    # Shipped positions are in order of time, so every frame is a slice of them
+    positions = decode_array(layer.payload()['attributes']['getPosition'])
+    first = pings.sort_values('seconds', kind='stable').head(offsets[1])
+    np.testing.assert_allclose(positions[:offsets[1], 1], first['lat'], rtol=1e-6)
+
+
+def test_time_buckets():
+    buckets = TimeBuckets(np.array([0.0, 10.0, 5.0, 10.0]), buckets=2)
+    assert buckets.offsets.tolist() == [0, 1, 4]
+    assert len(TimeBuckets([7, 7, 7])) == 1
+    times = pd.Series(pd.to_datetime(['2024-05-01 10:00', '2024-05-01 11:00'])).dt.tz_localize('Europe/Moscow')
+    assert TimeBuckets(times, bucket='30min').labels() == ['2024-05-01 10:00:00', '2024-05-01 10:30:00', '2024-05-01 11:00:00']
+    with pytest.raises(ValueError, match='Too many buckets'):
+        TimeBuckets([0.0, 1e9], bucket=1.0)
+    with pytest.raises(ValueError, match='missing'):
+        TimeBuckets(pd.to_datetime(['2024-05-01', None]))
+
+
+def test_map_playback_layer(pings, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    map.add_playback_layer(pings, bucket='1h', color=None)
+    layer = json.loads(map.layers[0].to_json())
+    assert len(layer['data']['frames']['labels']) == 24
+    assert 'get_position' not in layer and 'getPosition' not in layer
+    html = map.render()
+    assert 'decodeBinary' in html and 'frameData' in html
+    assert html.index('decodeBinary') < html.index('frameData')
+    with pytest.raises(ValueError, match='not supported'):
+        map.add_playback_layer(pings, precision=1.0)
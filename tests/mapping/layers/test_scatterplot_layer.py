@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.lod import LevelOfDetail
+from splyne.mapping.common.view_state import ViewState
+from splyne.mapping.layers.scatterplot import ScatterplotLayer
+
+
+def test_from_chunks_samples_whole_stream_uniformly():
+    rng = np.random.default_rng(0)
+    chunks = [PointColumns(rng.uniform(55.0, 56.0, 1000), np.full(1000, 37.0 + index)) for index in range(10)]
+    layer = ScatterplotLayer.from_chunks(chunks, ViewState(), lod=LevelOfDetail(method='sample', max_points=300))
+    assert len(layer.data) == 300
+    counts = np.bincount(np.round(layer.data.lon - 37.0).astype(int), minlength=10)
+    # Every chunk keeps about 30 points, as a uniform sample of all of them would
+    assert counts.min() >= 15 and counts.max() <= 45
+    assert np.all(np.diff(layer.data.lon) >= 0)
+
+
+def test_binary_chunks_keep_only_shipped_columns():
+    chunks = [
+        pd.DataFrame({'lat': [55.7, 55.8], 'lon': [37.6, 37.7], 'blob': ['x' * 100] * 2}),
+        pd.DataFrame({'lat': [55.9], 'lon': [37.8], 'blob': ['y' * 100]}),
+    ]
+    layer = ScatterplotLayer.from_chunks(map(PointColumns.from_dataframe, chunks), ViewState(), binary=True)
+    assert len(layer.source) == 3 and layer.source.attribute_names == []
+    layer = ScatterplotLayer.from_chunks(map(PointColumns.from_dataframe, chunks), ViewState())
+    assert layer.source.attribute_names == ['blob']
@@ -0,0 +1,179 @@
+import asyncio
+import concurrent.futures
+import io
+import json
+import re
+
+import numpy as np
+import pytest
+
+from splyne import Map
+from splyne.mapping.common.columns import PointColumns
+from splyne.mapping.common.lod import LevelOfDetail
+
+import tests.common as common
+
+
+def setup_module(module):
+    common.mock_prepare_deck_class()
+
+
+@pytest.fixture
+def layers_specs():
+    rng = np.random.default_rng(0)
+    return [
+        {
+            'data': PointColumns(rng.normal(lat, 0.05, 2000), rng.normal(lon, 0.05, 2000), size=rng.uniform(1, 5, 2000)),
+            'binary': binary,
+            'lod': LevelOfDetail(max_points=300),
+        }
+        for lat, lon, binary in [(55.7, 37.6, False), (59.9, 30.3, True), (56.3, 44.0, False)]
+    ]
+
+
+def make_serial_map(layers_specs):
+    map = Map()
+    for spec in layers_specs:
+        map.add_scatterplot_layer(**spec)
+    return map
+
+
+@pytest.mark.parametrize('executor_class', [None, concurrent.futures.ThreadPoolExecutor])
+def test_parallel_layers_same_as_serial(layers_specs, executor_class, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    serial = make_serial_map(layers_specs)
+    parallel = Map()
+    if executor_class is None:
+        parallel.add_scatterplot_layers(layers_specs)
+    else:
+        with executor_class(max_workers=2) as executor:
+            parallel.add_scatterplot_layers(layers_specs, executor=executor)
+    assert len(parallel.scatterplot_layers) == len(layers_specs)
+    # Points stay in this process, workers send back only payloads
+    assert parallel.scatterplot_layers[0].source is layers_specs[0]['data']
+    common.assert_equal_jsons(json.loads(parallel.display()), json.loads(serial.display()))
+
+
+def test_export_writes_only_changed_layers(tmp_path):
+    map = Map()
+    map.add_scatterplot_layer([{'lat': 55.7, 'lon': 37.6}])
+    map.add_scatterplot_layer(PointColumns([55.8], [37.7]), binary=True)
+    assert sorted(map.export(str(tmp_path))) == [str(tmp_path / 'index.html'), str(tmp_path / 'layers' / 'layer-1.json')]
+    assert map.export(str(tmp_path)) == []
+
+    # Updated point moves the corner of view state, so `index.html` is written again
+    map.update_scatterplot_layer('layer-1', [{'lat': 55.71, 'lon': 37.61}])
+    assert sorted(map.export(str(tmp_path))) == [str(tmp_path / 'index.html'), str(tmp_path / 'layers' / 'layer-1.json')]
+    assert json.loads((tmp_path / 'layers' / 'layer-1.json').read_text()) == [{'lat': 55.71, 'lon': 37.61}]
+
+    map.remove_layer('layer-2')
+    assert map.export(str(tmp_path)) == [str(tmp_path / 'index.html')]
+
+
+def test_diff_contains_only_changed_layers():
+    map = Map()
+    map.add_scatterplot_layer([{'lat': 55.7, 'lon': 37.6}], id='first')
+    map.add_scatterplot_layer([{'lat': 55.8, 'lon': 37.7}], id='second')
+    assert [layer['id'] for layer in json.loads(map.diff())['layers']] == ['first', 'second']
+    map.update_scatterplot_layer('second', [{'lat': 55.9, 'lon': 37.8}])
+    map.remove_layer('first')
+    diff = json.loads(map.diff())
+    assert [layer['id'] for layer in diff['layers']] == ['second'] and diff['removed'] == ['first']
+    with pytest.raises(ValueError):
+        map.add_scatterplot_layer([{'lat': 55.8, 'lon': 37.7}], id='second')
+
+
+def test_diff_contains_changed_view_state():
+    map = Map()
+    map.add_scatterplot_layer([{'lat': 55.7, 'lon': 37.6}, {'lat': 55.8, 'lon': 37.7}], id='points')
+    view_state = json.loads(map.diff())['initialViewState']
+    assert view_state['latitude'] == pytest.approx(55.75) and view_state['longitude'] == pytest.approx(37.65)
+    map.update_scatterplot_layer('points', [{'lat': 55.7, 'lon': 37.6}, {'lat': 55.8, 'lon': 37.7}])
+    assert 'initialViewState' not in json.loads(map.diff())
+    map.add_scatterplot_layer([{'lat': 59.9, 'lon': 30.3}], id='other')
+    diff = json.loads(map.diff())
+    assert [layer['id'] for layer in diff['layers']] == ['other']
+    assert diff['initialViewState']['latitude'] > view_state['latitude']
+
+
+def test_profile_records_stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    map = Map()
+    callback_records = []
+    with map.profile(trace_memory=True, callback=callback_records.append) as profiler:
+        map.add_scatterplot_layer(PointColumns([55.7, 55.8], [37.8, 37.9]), binary=True, id='points')
+        map.display()
+    map.add_scatterplot_layer(PointColumns([55.7], [37.8]))
+
+    frame = profiler.to_frame()
+    assert frame['stage'].tolist() == ['layer_data', 'view_state', 'encode_payload', 'pydeck_layer', 'render_html', 'write_html']
+    assert set(frame['layer'].iloc[:4]) == {'points'}
+    assert frame['rows'].iloc[1] == 2
+    assert (frame['seconds'] >= 0).all() and frame['allocated_bytes'].notna().all()
+    assert callback_records == profiler.records
+
+
+def deck_json(html):
+    return json.loads(re.search(r'const jsonInput = (.*?);\n', html, flags=re.DOTALL).group(1))
+
+
+def test_render_and_write_do_not_use_shared_files(layers_specs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    map = make_serial_map(layers_specs)
+    html = map.render()
+    assert list(tmp_path.iterdir()) == []
+    assert len(list(map.iter_html())) == len(layers_specs) + 2
+    common.assert_equal_jsons(deck_json(html), json.loads(map.display()))
+    assert 'decodeBinary' in html
+
+    buffer = io.StringIO()
+    map.write(buffer)
+    map.write(tmp_path / 'map.html')
+    assert buffer.getvalue() == (tmp_path / 'map.html').read_text() == html
+
+
+def test_async_renders_are_concurrent(layers_specs, tmp_path):
+    maps = [make_serial_map(layers_specs[i:i + 1]) for i in range(len(layers_specs))]
+
+    async def render_all():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            rendered = await asyncio.gather(*[map.render_async(executor=executor) for map in maps])
+            await asyncio.gather(*[map.write_async(tmp_path / f'{i}.html') for i, map in enumerate(maps)])
+            exported = await maps[0].export_async(str(tmp_path / 'export'))
+            streamed = [chunk async for chunk in maps[1].aiter_html(executor=executor)]
+        return rendered, exported, streamed
+
+    rendered, exported, streamed = asyncio.run(render_all())
+    assert rendered == [map.render() for map in maps]
+    assert [(tmp_path / f'{i}.html').read_text() for i in range(len(maps))] == rendered
+    assert str(tmp_path / 'export' / 'index.html') in exported
+    assert ''.join(streamed) == rendered[1]
+
+
+def test_view_state_follows_updated_and_removed_layers():
+    map = Map()
+    map.add_scatterplot_layer(PointColumns([55.7, 55.71], [37.6, 37.61]), id='points')
+    zoom = map.viewState.get_zoom_level()
+    map.update_scatterplot_layer('points', PointColumns([59.9, 59.91], [30.3, 30.31]))
+    assert map.viewState.bbox.ll_point.lat == 59.9 and map.viewState.bbox.ur_point.lon == 30.31
+    assert map.viewState.get_zoom_level() == zoom
+    map.add_scatterplot_layer(PointColumns([55.7, 55.71], [37.6, 37.61]), id='moscow')
+    assert map.viewState.get_zoom_level() < zoom
+    map.remove_layer('moscow')
+    assert map.viewState.bbox.ll_point.lat == 59.9 and map.viewState.get_zoom_level() == zoom
+    # Failed update keeps view state as it was
+    bbox = map.viewState.bbox
+    with pytest.raises(ValueError):
+        map.update_scatterplot_layer('points', PointColumns([95.0], [30.3]), validate='raise')
+    assert map.viewState.bbox is bbox
+
+
+def test_query_row_based_layers():
+    map = Map()
+    map.add_scatterplot_layer([{'lat': 55.7, 'lon': 37.6, 'name': 'a'}, {'lat': 59.9, 'lon': 30.3, 'name': 'b'}])
+    map.add_scatterplot_layer(PointColumns([55.71], [37.61]))
+    map.add_scatterplot_layer([])
+    result = map.query_radius(55.7, 37.6, 5.0)
+    assert [len(points) for points in result] == [1, 1, 0]
+    assert result[0].to_records() == [{'name': 'a', 'lat': 55.7, 'lon': 37.6}]
+    assert [len(points) for points in map.query_tile(0, 0, 0)] == [2, 1, 0]
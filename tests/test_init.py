@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import splyne
+
+
+def loaded_modules(statement):
+    script = f'import json, sys\n{statement}\nprint(json.dumps([name for name in ("pandas", "pydeck") if name in sys.modules]))'
+    return json.loads(subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout)
+
+
+def test_import_is_lazy():
+    assert loaded_modules('import splyne') == []
+    assert loaded_modules('import splyne.mapping.common.common, splyne.mapping.common.spatial_index') == []
+    assert loaded_modules('from splyne import Map') == ['pandas']
+
+
+def test_lazy_attributes():
+    from splyne.mapping.api.scatterplot import scatterplot
+    from splyne.mapping.map_class.map import Map
+
+    assert splyne.Map is Map
+    assert splyne.scatterplot is scatterplot
+    assert {'Map', 'scatterplot', 'scatterplot_chunks'} <= set(dir(splyne))
+    with pytest.raises(AttributeError, match='missing'):
+        splyne.missing
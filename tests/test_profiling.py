@@ -0,0 +1,20 @@
+import concurrent.futures
+import tracemalloc
+
+from splyne.common.profiling import Profiler
+
+
+def test_concurrent_traced_stages():
+    profiler = Profiler(trace_memory=True)
+
+    def run(index):
+        for _ in range(50):
+            with profiler.stage('outer', rows=index):
+                with profiler.stage('inner', rows=index):
+                    bytearray(10 ** 4)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(run, range(8)))
+    assert len(profiler.records) == 8 * 50 * 2
+    assert all(record['allocated_bytes'] >= 0 for record in profiler.records)
+    assert not tracemalloc.is_tracing()
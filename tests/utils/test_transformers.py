@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from splyne.utils import transformers
+from splyne.utils.transformers import Apply, Assign, Copy, Pipeline, Rename, ZipInto
+
+
+def test_pipeline_batches_of_dicts_and_dataframes():
+    pipeline = Pipeline(
+        Copy(),
+        Rename({'a': 'lat'}),
+        Rename({'b': 'lon'}),
+        ZipInto('color', np.arange(5)),
+        Assign('size', lambda batch: batch['lat'] * 2),
+    )
+    assert [type(stage) for stage in pipeline.stages] == [Copy, Rename, ZipInto, Assign]
+    frame = pd.DataFrame({'a': np.arange(5.0), 'b': np.arange(5.0)})
+    result = pd.concat(pipeline(frame.iloc[start:start + 2] for start in range(0, 5, 2)))
+    assert result.columns.tolist() == ['lat', 'lon', 'color', 'size']
+    assert result['color'].tolist() == [0, 1, 2, 3, 4]
+    assert result['size'].tolist() == [0.0, 2.0, 4.0, 6.0, 8.0]
+    assert frame.columns.tolist() == ['a', 'b']
+    batches = [{'a': np.arange(3.0), 'b': np.zeros(3)}, {'a': np.arange(2.0), 'b': np.zeros(2)}]
+    result = list(pipeline(batches))
+    assert [batch['color'].tolist() for batch in result] == [[0, 1, 2], [3, 4]]
+    assert 'a' in batches[0]
+
+
+def test_values_must_be_of_equal_lengths():
+    with pytest.raises(ValueError, match='equal lengths'):
+        list(transformers.zip_into([{'a': 1}, {'a': 2}], 'b', [1]))
+    with pytest.raises(ValueError, match='equal lengths'):
+        list(transformers.zip_into([{'a': 1}], 'b', iter([1, 2])))
+    with pytest.raises(ValueError, match='equal lengths'):
+        list(Pipeline(ZipInto('b', [1, 2, 3]))([{'a': [1, 2]}]))
+    with pytest.raises(ValueError, match='equal lengths'):
+        list(transformers.merge(a=[1, 2], b=[1]))
+    assert list(transformers.merge(a=[None], b=[1])) == [{'a': None, 'b': 1}]
+
+
+def test_row_adapters_share_single_pipeline():
+    data = [{'a': 1, 'b': 2}]
+    rows = transformers.copy_items(data)
+    rows = transformers.rename(rows, 'a', 'lat')
+    rows = transformers.rename(rows, 'b', 'lon')
+    rows = transformers.apply_into(rows, 'size', lambda item: item['lat'] + 1)
+    rows = transformers.make_pipe(dict)(rows)
+    assert [type(stage) for stage in rows.pipeline.stages] == [Copy, Rename, Assign, Apply]
+    assert rows.items is data
+    assert list(rows) == [{'lat': 1, 'lon': 2, 'size': 2}]
+    assert data == [{'a': 1, 'b': 2}]
+    with pytest.raises(ValueError, match='does not exist'):
+        list(transformers.rename(data, 'c', 'd'))
+    rows = transformers.rename(transformers.merge(a=[1, 2], b=iter([3, 4])), 'a', 'lat')
+    assert [type(stage) for stage in rows.pipeline.stages] == [Apply, ZipInto, Rename]
+    assert list(rows) == [{'lat': 1, 'b': 3}, {'lat': 2, 'b': 4}]
+
+
+def test_zip_into_dataframes_is_positional():
+    values = pd.Series([1, 2, 3, 4], index=[7, 8, 9, 10])
+    frame = pd.DataFrame({'a': [0.0, 1.0, 2.0, 3.0]}, index=[10, 11, 12, 13])
+    result = next(Pipeline(ZipInto('b', values))([frame]))
+    assert result['b'].tolist() == [1, 2, 3, 4]
+    # Every chunk has its own index, starting from 0
+    chunks = [frame.iloc[:2].reset_index(drop=True), frame.iloc[2:].reset_index(drop=True)]
+    result = pd.concat(Pipeline(ZipInto('b', values))(chunks))
+    assert result['b'].tolist() == [1, 2, 3, 4]
+    result = pd.concat(Pipeline(ZipInto('b', iter(values)))(chunks))
+    assert result['b'].tolist() == [1, 2, 3, 4]